@@ -0,0 +1,194 @@
+import time
+import threading
+
+# Preview ladder, best first: (max width, JPEG quality, max fps)
+PREVIEW_LADDER = (
+    (960, 80, 15),
+    (640, 75, 10),
+    (480, 65, 8),
+    (320, 55, 5),
+    (240, 45, 2),
+)
+DEFAULT_LEVEL = 1            # 640px at quality 75, the previous fixed preview
+STEP_COOLDOWN = 2.0          # seconds between level changes for one client
+UPGRADE_STREAK = 20          # fast deliveries in a row before stepping up
+CLIENT_TIMEOUT = 60.0        # polling clients not seen for this long are forgotten
+
+
+class EncodeBudget:
+    """Global JPEG encode budget shared by every frame cache.
+
+    Measures the fraction of wall time spent encoding previews. When it goes
+    over budget, the floor of the preview ladder is raised one step per second,
+    so every viewer gets slightly smaller frames instead of all of them getting
+    fewer; it is lowered again once load drops below half the budget.
+    """
+
+    def __init__(self, max_encode_load=0.5):
+        self.max_encode_load = max_encode_load
+        self.lock = threading.Lock()
+        self.floor_level = 0
+        self.load = 0.0
+        self.degradations = 0
+        self._window_start = time.monotonic()
+        self._window_seconds = 0.0
+
+    def record_encode(self, seconds):
+        with self.lock:
+            self._window_seconds += seconds
+            self._roll_window()
+
+    def _roll_window(self):
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed < 1.0:
+            return
+        self.load = self._window_seconds / elapsed
+        self._window_start = now
+        self._window_seconds = 0.0
+
+        if self.load > self.max_encode_load and self.floor_level < len(PREVIEW_LADDER) - 1:
+            self.floor_level += 1
+            self.degradations += 1
+        elif self.load < self.max_encode_load / 2 and self.floor_level > 0:
+            self.floor_level -= 1
+
+    def current_floor(self):
+        with self.lock:
+            # Idle windows never get an encode to roll them over
+            self._roll_window()
+            return self.floor_level
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'encode_load': round(self.load, 3),
+                'max_encode_load': self.max_encode_load,
+                'floor_level': self.floor_level,
+                'degradations': self.degradations
+            }
+
+
+class AdaptiveProfile:
+    """Preview profile for one viewer, chosen from its measured delivery time"""
+
+    def __init__(self, budget, max_fps=None, level=DEFAULT_LEVEL):
+        self.budget = budget
+        self.max_fps = max_fps
+        self.level = level
+        self.delivery_seconds = 0.0
+        self.fast_streak = 0
+        self.last_change = 0.0
+        self.last_seen = time.monotonic()
+
+    def record_delivery(self, seconds, interval):
+        """Update the level after one frame took `seconds` to reach the client"""
+        self.last_seen = time.monotonic()
+        self.delivery_seconds = 0.7 * self.delivery_seconds + 0.3 * seconds
+        if self.last_seen - self.last_change < STEP_COOLDOWN:
+            return
+
+        if self.delivery_seconds > 0.8 * interval and self.level < len(PREVIEW_LADDER) - 1:
+            self.level += 1
+            self.fast_streak = 0
+            self.last_change = self.last_seen
+        elif self.delivery_seconds < 0.25 * interval:
+            self.fast_streak += 1
+            if self.fast_streak >= UPGRADE_STREAK and self.level > 0:
+                self.level -= 1
+                self.fast_streak = 0
+                self.last_change = self.last_seen
+        else:
+            self.fast_streak = 0
+
+    def effective_level(self):
+        return max(self.level, self.budget.current_floor())
+
+    def current(self):
+        """Return (encode options, fps) for the next frame"""
+        max_width, quality, fps = PREVIEW_LADDER[self.effective_level()]
+        if self.max_fps:
+            fps = min(fps, self.max_fps)
+        return {'max_width': max_width, 'quality': quality}, fps
+
+    def to_dict(self):
+        options, fps = self.current()
+        return {
+            'level': self.effective_level(),
+            'client_level': self.level,
+            'max_width': options['max_width'],
+            'quality': options['quality'],
+            'fps': fps,
+            'delivery_ms': round(self.delivery_seconds * 1000, 1)
+        }
+
+
+class ProfileRegistry:
+    """Adaptive profiles for polling clients, keyed by a client-chosen id"""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._profiles = {}
+
+    def get(self, client_id):
+        now = time.monotonic()
+        with self._lock:
+            for stale in [key for key, profile in self._profiles.items()
+                          if now - profile.last_seen > CLIENT_TIMEOUT]:
+                del self._profiles[stale]
+            profile = self._profiles.get(client_id)
+            if profile is None:
+                profile = self._profiles[client_id] = AdaptiveProfile(self.budget)
+            return profile
+
+    def to_dict(self):
+        with self._lock:
+            profiles = {key: profile.to_dict() for key, profile in self._profiles.items()}
+        return {'polling_clients': len(profiles), 'profiles': profiles}
+
+
+def fixed_profile(budget, max_width, quality):
+    """Encode options for a fixed-profile request, degraded only by the global budget"""
+    floor = budget.current_floor()
+    if floor == 0:
+        return {'max_width': max_width, 'quality': quality}
+    floor_width, floor_quality, _ = PREVIEW_LADDER[floor]
+    return {
+        'max_width': min(max_width or floor_width, floor_width),
+        'quality': min(quality, floor_quality)
+    }
+
+
+class FixedProfile:
+    """Preview profile for a viewer that asked for fixed settings.
+
+    Has AdaptiveProfile's interface so streams look it up on every frame:
+    the viewer keeps its width, quality and frame rate except while the
+    global encode budget has raised the ladder floor above them.
+    """
+
+    def __init__(self, budget, max_width, quality, max_fps):
+        self.budget = budget
+        self.max_width = max_width
+        self.quality = quality
+        self.max_fps = max_fps
+        self.delivery_seconds = 0.0
+
+    def record_delivery(self, seconds, interval):
+        self.delivery_seconds = 0.7 * self.delivery_seconds + 0.3 * seconds
+
+    def current(self):
+        """Return (encode options, fps) for the next frame"""
+        return fixed_profile(self.budget, self.max_width, self.quality), self.max_fps
+
+    def to_dict(self):
+        options, fps = self.current()
+        return {
+            'level': self.budget.current_floor(),
+            'fixed': True,
+            'max_width': options['max_width'],
+            'quality': options['quality'],
+            'fps': fps,
+            'delivery_ms': round(self.delivery_seconds * 1000, 1)
+        }
@@ -0,0 +1,303 @@
+import re
+import time
+import threading
+from collections import deque
+from datetime import datetime
+
+from anomaly_events import CRITICALITY
+
+INCIDENT_WINDOW = 180         # an incident closes when not seen again for this many seconds
+SIMILARITY_THRESHOLD = 0.4    # description word overlap (Jaccard) that counts as the same finding
+# Seconds before an ongoing incident notifies again, by criticality
+DEFAULT_COOLDOWNS = {'high': 120, 'medium': 600, 'low': 1800}
+CLOSED_KEPT = 500
+
+WORD = re.compile(r'[a-z]{3,}')
+STOP_WORDS = frozenset(
+    'the and are was were has have with from that this there their near into onto over under '
+    'appears appear seems seen visible observed detected possible possibly potential likely area '
+    'scene frame frames camera video image person people'.split())
+
+
+def description_words(text):
+    return frozenset(WORD.findall((text or '').lower())) - STOP_WORDS
+
+
+def similarity(words, other):
+    """Jaccard overlap of two word sets"""
+    if not words or not other:
+        return 0.0
+    return len(words & other) / len(words | other)
+
+
+class Incident:
+    """One ongoing anomaly on one camera, updated by every repeated finding"""
+
+    __slots__ = (
+        'id', 'camera', 'category', 'custom', 'criticality', 'description', 'words',
+        'first_seen', 'last_seen', 'occurrences', 'notified_at', 'notifications',
+        'first_report_id', 'last_report_id', 'closed'
+    )
+
+    def __init__(self, incident_id, camera, event, now):
+        self.id = incident_id
+        self.camera = camera
+        self.category = event['category']
+        self.custom = event.get('custom')
+        self.criticality = event['criticality']
+        self.description = event.get('description', '')
+        self.words = description_words(self.description)
+        self.first_seen = now
+        self.last_seen = now
+        self.occurrences = 1
+        self.notified_at = None
+        self.notifications = 0
+        self.first_report_id = None
+        self.last_report_id = None
+        self.closed = False
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'camera': self.camera,
+            'category': self.category,
+            'custom': self.custom,
+            'criticality': self.criticality,
+            'description': self.description,
+            'first_seen': datetime.fromtimestamp(self.first_seen).isoformat(),
+            'last_seen': datetime.fromtimestamp(self.last_seen).isoformat(),
+            'duration_seconds': round(self.last_seen - self.first_seen, 1),
+            'occurrences': self.occurrences,
+            'notifications': self.notifications,
+            'first_report_id': self.first_report_id,
+            'last_report_id': self.last_report_id,
+            'open': not self.closed
+        }
+
+
+class AlertCorrelator:
+    """Folds repeated anomaly findings into incidents.
+
+    The live workers and the scanner re-check the same scene every few
+    seconds, so one spill is reported again and again. observe() matches
+    each event against the camera's open incidents: same category (and
+    custom anomaly), or a description similar enough when the category
+    differs or is only 'other'. A match updates the incident; anything
+    else opens a new one. An incident closes after `window` seconds
+    without a match.
+
+    Each decision says whether to notify: always for a new incident or one
+    whose criticality rose, and again for an ongoing incident only once its
+    criticality's cooldown has passed since the last notification.
+    """
+
+    def __init__(self, window=INCIDENT_WINDOW, cooldowns=None, similarity_threshold=SIMILARITY_THRESHOLD):
+        self.window = window
+        self.cooldowns = dict(DEFAULT_COOLDOWNS)
+        self.cooldowns.update(cooldowns or {})
+        self.similarity_threshold = similarity_threshold
+        self.lock = threading.Lock()
+        self._open = {}
+        self._closed = deque(maxlen=CLOSED_KEPT)
+        self._next_id = 1
+        self.events_observed = 0
+        self.incidents_opened = 0
+        self.notified = 0
+        self.suppressed = 0
+
+    def configure(self, window=None, cooldowns=None, similarity_threshold=None):
+        """Update settings; None leaves a value unchanged. Raises ValueError on bad input"""
+        cooldowns = {level: float(seconds) for level, seconds in (cooldowns or {}).items()}
+        if any(level not in CRITICALITY for level in cooldowns):
+            raise ValueError(f'Cooldowns are per criticality: {", ".join(CRITICALITY)}')
+        with self.lock:
+            if window is not None:
+                self.window = max(1.0, float(window))
+            self.cooldowns.update({level: max(0.0, seconds) for level, seconds in cooldowns.items()})
+            if similarity_threshold is not None:
+                self.similarity_threshold = min(1.0, max(0.0, float(similarity_threshold)))
+
+    def _expire(self, camera, now):
+        """Close the camera's incidents not seen within the window; call under lock"""
+        incidents = self._open.get(camera)
+        if not incidents:
+            return []
+        expired = [incident for incident in incidents if now - incident.last_seen > self.window]
+        for incident in expired:
+            incident.closed = True
+            incidents.remove(incident)
+            self._closed.append(incident)
+        return incidents
+
+    def _match(self, incidents, event, words):
+        best, best_score = None, self.similarity_threshold
+        for incident in incidents:
+            if (incident.category, incident.custom) == (event['category'], event.get('custom')) \
+                    and event['category'] != 'other':
+                return incident
+            score = similarity(words, incident.words)
+            if score >= best_score:
+                best, best_score = incident, score
+        return best
+
+    def observe(self, camera, events, now=None):
+        """Correlate one response's events; returns a decision per incident touched.
+
+        Each decision is {'incident', 'status' ('new', 'escalated' or
+        'ongoing'), 'notify'}. Several events matching one incident count as
+        one occurrence.
+        """
+        now = time.time() if now is None else now
+        decisions = {}
+        with self.lock:
+            incidents = self._expire(camera, now)
+            self.events_observed += len(events)
+            for event in events:
+                words = description_words(event.get('description'))
+                incident = self._match(incidents, event, words)
+                if incident is None:
+                    incident = Incident(self._next_id, camera, event, now)
+                    self._next_id += 1
+                    self.incidents_opened += 1
+                    incidents = self._open.setdefault(camera, incidents)
+                    incidents.append(incident)
+                    decisions[incident.id] = {'incident': incident, 'status': 'new'}
+                    continue
+
+                decision = decisions.setdefault(incident.id, {'incident': incident, 'status': 'ongoing'})
+                if decision['status'] == 'ongoing' and incident.last_seen != now:
+                    incident.occurrences += 1
+                    incident.last_seen = now
+                if CRITICALITY.index(event['criticality']) > CRITICALITY.index(incident.criticality):
+                    incident.criticality = event['criticality']
+                    incident.description = event.get('description', incident.description)
+                    if decision['status'] != 'new':
+                        decision['status'] = 'escalated'
+                incident.words = incident.words | words
+
+            for decision in decisions.values():
+                incident = decision['incident']
+                decision['notify'] = decision['status'] != 'ongoing' or \
+                    now - incident.notified_at >= self.cooldowns[incident.criticality]
+                if decision['notify']:
+                    incident.notified_at = now
+                    incident.notifications += 1
+                    self.notified += 1
+                else:
+                    self.suppressed += 1
+        return list(decisions.values())
+
+    def link_report(self, decisions, report_id):
+        """Record the stored report that carried these decisions"""
+        with self.lock:
+            for decision in decisions:
+                incident = decision['incident']
+                if incident.first_report_id is None:
+                    incident.first_report_id = report_id
+                incident.last_report_id = report_id
+
+    def incidents(self, camera=None, state='open', limit=100):
+        """Newest-first incidents as dicts; state is 'open', 'closed' or 'all'"""
+        if state not in ('open', 'closed', 'all'):
+            raise ValueError("state must be 'open', 'closed' or 'all'")
+        now = time.time()
+        with self.lock:
+            for key in list(self._open):
+                self._expire(key, now)
+            found = []
+            if state in ('open', 'all'):
+                found += [incident for key, incidents in self._open.items()
+                          if camera is None or key == camera for incident in incidents]
+            if state in ('closed', 'all'):
+                found += [incident for incident in self._closed if camera is None or incident.camera == camera]
+            found.sort(key=lambda incident: incident.last_seen, reverse=True)
+            return [incident.to_dict() for incident in found[:limit]]
+
+    def forget(self, camera):
+        """Close a removed camera's incidents"""
+        with self.lock:
+            for incident in self._open.pop(camera, []):
+                incident.closed = True
+                self._closed.append(incident)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'window_seconds': self.window,
+                'cooldowns': dict(self.cooldowns),
+                'similarity_threshold': self.similarity_threshold,
+                'open_incidents': sum(len(incidents) for incidents in self._open.values()),
+                'events_observed': self.events_observed,
+                'incidents_opened': self.incidents_opened,
+                'notified': self.notified,
+                'suppressed': self.suppressed
+            }
+
+
+def describe_decisions(decisions):
+    """One report line naming the incidents a response belongs to"""
+    parts = []
+    for decision in decisions:
+        incident = decision['incident']
+        if decision['status'] == 'new':
+            parts.append(f"#{incident.id} {incident.category} (new)")
+        else:
+            parts.append(f"#{incident.id} {incident.category} ({decision['status']}, seen {incident.occurrences}x "
+                         f"since {datetime.fromtimestamp(incident.first_seen).strftime('%H:%M:%S')})")
+    return 'Incidents: ' + ', '.join(parts)
+
+
+def run_benchmark(minutes=60, interval=6.0, cameras=8):
+    """Reports, notifications and incidents for a scene that keeps showing the
+    same few anomalies, with and without correlation"""
+    import random
+
+    rng = random.Random(7)
+    scenes = [
+        [{'category': 'spill_damage', 'custom': None, 'criticality': 'medium',
+          'description': 'Liquid spill on the floor near aisle 4, wet patch spreading'}],
+        [{'category': 'person_fall', 'custom': None, 'criticality': 'high',
+          'description': 'A worker has fallen near the loading dock and is lying on the ground'},
+         {'category': 'crowd', 'custom': None, 'criticality': 'medium',
+          'description': 'Group gathering around the worker at the loading dock'}],
+        [{'category': 'other', 'custom': None, 'criticality': 'medium',
+          'description': 'Forklift parked across the emergency exit route'}],
+    ]
+    wordings = ['', ' still', ' again', ' continuing']
+    correlator = AlertCorrelator()
+    checks = alerts = events_seen = 0
+    now = 0.0
+    while now < minutes * 60:
+        for camera in range(cameras):
+            scene = scenes[camera % len(scenes)]
+            # The anomaly is visible for the first two thirds of every 20 minutes
+            if (now // 60) % 20 >= 13 or rng.random() < 0.15:
+                continue
+            events = [dict(event, description=event['description'] + rng.choice(wordings)) for event in scene]
+            checks += 1
+            events_seen += len(events)
+            decisions = correlator.observe(f'camera_{camera}', events, now)
+            alerts += any(decision['notify'] for decision in decisions)
+        now += interval
+    stats = correlator.to_dict()
+    started = time.perf_counter()
+    for _ in range(10000):
+        correlator.observe('camera_0', scenes[0], now)
+    observe_us = (time.perf_counter() - started) * 1e6 / 10000
+    return {
+        'checks_with_anomalies': checks,
+        'uncorrelated_notifications': checks,
+        'uncorrelated_accidents': events_seen,
+        'notifications': alerts,
+        'incidents': stats['incidents_opened'],
+        'observe_us': observe_us
+    }
+
+
+if __name__ == '__main__':
+    result = run_benchmark()
+    print("Alert correlation: 8 cameras re-checked every 6 s for an hour")
+    print(f"  anomalous checks:  {result['checks_with_anomalies']}")
+    print(f"  notifications:     {result['uncorrelated_notifications']} -> {result['notifications']}")
+    print(f"  accident counter:  {result['uncorrelated_accidents']} -> {result['incidents']}")
+    print(f"  observe():         {result['observe_us']:.1f} us")
@@ -0,0 +1,272 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from motion import MotionGate
+
+RECENT_ANOMALY_SECONDS = 300     # anomalies this recent make a camera checked twice as often
+LATENCY_HEADROOM = 2.0           # never schedule calls closer than this many VILA latencies
+
+
+class VilaUsage:
+    """VILA call latency, rate budget and concurrency limit shared by every caller"""
+
+    def __init__(self, calls_per_minute=30, max_concurrent=2):
+        self.calls_per_minute = calls_per_minute
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self._recent = deque()
+        self._latencies = deque(maxlen=500)
+        self.latency = 0.0
+        self.calls = 0
+        self.errors = 0
+        # Called with (seconds, ok) after every call, outside the lock
+        self.listeners = []
+
+    def record(self, seconds, ok=True):
+        now = time.monotonic()
+        with self.lock:
+            self._recent.append(now)
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            self._latencies.append(seconds)
+            # Exponentially weighted so one slow call does not stall every camera
+            self.latency = seconds if self.calls == 1 else 0.8 * self.latency + 0.2 * seconds
+        for listener in self.listeners:
+            listener(seconds, ok)
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the max_concurrent VILA request slots for the duration of a call"""
+        with self._slots:
+            with self.lock:
+                self.in_flight += 1
+            try:
+                yield
+            finally:
+                with self.lock:
+                    self.in_flight -= 1
+
+    def calls_last_minute(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            return len(self._recent)
+
+    def remaining_fraction(self, now=None):
+        used = self.calls_last_minute(now)
+        return max(0.0, 1.0 - used / self.calls_per_minute)
+
+    def latency_percentile(self, fraction):
+        """Latency percentile over the last 500 calls, or None before the first call"""
+        with self.lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def to_dict(self):
+        used = self.calls_last_minute()
+        p50, p95 = self.latency_percentile(0.5), self.latency_percentile(0.95)
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'calls_last_minute': used,
+            'calls_per_minute_budget': self.calls_per_minute,
+            'in_flight': self.in_flight,
+            'max_concurrent': self.max_concurrent,
+            'remaining_budget': round(max(0.0, 1.0 - used / self.calls_per_minute), 2),
+            'latency_ms': round(self.latency * 1000, 1),
+            'latency_p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'latency_p95_ms': round(p95 * 1000, 1) if p95 is not None else None
+        }
+
+
+class TimeOfDaySchedule:
+    """Interval multipliers for busy and quiet hours (local time)"""
+
+    def __init__(self, busy_start=7, busy_end=19, busy_multiplier=1.0, quiet_multiplier=2.0):
+        self.busy_start = busy_start
+        self.busy_end = busy_end
+        self.busy_multiplier = busy_multiplier
+        self.quiet_multiplier = quiet_multiplier
+
+    def configure(self, busy_start=None, busy_end=None, busy_multiplier=None, quiet_multiplier=None):
+        if busy_start is not None:
+            self.busy_start = int(busy_start) % 24
+        if busy_end is not None:
+            self.busy_end = int(busy_end) % 24
+        if busy_multiplier is not None:
+            self.busy_multiplier = max(0.1, float(busy_multiplier))
+        if quiet_multiplier is not None:
+            self.quiet_multiplier = max(0.1, float(quiet_multiplier))
+
+    def current(self, when=None):
+        """Return (period name, multiplier)"""
+        hour = (when or datetime.now()).hour
+        if self.busy_start <= self.busy_end:
+            busy = self.busy_start <= hour < self.busy_end
+        else:
+            # Busy hours that wrap past midnight, e.g. 20 -> 6 for a night shift
+            busy = hour >= self.busy_start or hour < self.busy_end
+        return ('busy', self.busy_multiplier) if busy else ('quiet', self.quiet_multiplier)
+
+    def to_dict(self):
+        return {
+            'busy_start': self.busy_start,
+            'busy_end': self.busy_end,
+            'busy_multiplier': self.busy_multiplier,
+            'quiet_multiplier': self.quiet_multiplier,
+            'period': self.current()[0]
+        }
+
+
+class ScheduledAnalysis:
+    """Adaptive interval for one periodic VILA call on one camera.
+
+    The interval starts at base_interval and is scaled by time of day, halved
+    after a recent anomaly, stretched when the VILA rate budget runs low and
+    never set below twice the current VILA latency; the result is clamped to
+    [min_interval, max_interval]. A MotionGate applies it, so static scenes
+    are still slowed (static_factor) or skipped (None) and motion still
+    triggers immediately.
+    """
+
+    def __init__(self, key, kind, detector, usage, schedule,
+                 base_interval, min_interval, max_interval, static_factor=None):
+        self.key = key
+        self.kind = kind
+        self.usage = usage
+        self.schedule = schedule
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.static_factor = static_factor
+        self.gate = MotionGate(detector, base_interval,
+                               base_interval * static_factor if static_factor else None)
+        self.last_anomaly = 0.0
+        self.anomalies = 0
+        self.decision = {}
+
+    def configure(self, base_interval=None, min_interval=None, max_interval=None):
+        if min_interval is not None:
+            self.min_interval = max(1.0, float(min_interval))
+        if max_interval is not None:
+            self.max_interval = max(self.min_interval, float(max_interval))
+        if base_interval is not None:
+            self.base_interval = float(base_interval)
+        self.base_interval = max(self.min_interval, min(self.base_interval, self.max_interval))
+
+    def effective_interval(self, now=None):
+        """Recompute the interval, apply it to the gate and keep the decision for inspection"""
+        now = time.monotonic() if now is None else now
+        period, time_factor = self.schedule.current()
+        anomaly_factor = 0.5 if self.last_anomaly and now - self.last_anomaly < RECENT_ANOMALY_SECONDS else 1.0
+
+        remaining = self.usage.remaining_fraction(now)
+        budget_factor = 1.0 if remaining >= 0.5 else 0.5 / max(remaining, 0.05)
+
+        interval = self.base_interval * time_factor * anomaly_factor * budget_factor
+        latency_floor = self.usage.latency * LATENCY_HEADROOM
+        interval = max(interval, latency_floor)
+        interval = max(self.min_interval, min(interval, self.max_interval))
+
+        self.gate.interval = interval
+        if self.static_factor:
+            self.gate.static_interval = interval * self.static_factor
+
+        self.decision = {
+            'interval': round(interval, 1),
+            'static_interval': round(self.gate.static_interval, 1) if self.gate.static_interval else None,
+            'scene_active': self.gate.detector.is_active(now),
+            'period': period,
+            'time_factor': time_factor,
+            'anomaly_factor': anomaly_factor,
+            'budget_factor': round(budget_factor, 2),
+            'latency_floor': round(latency_floor, 1)
+        }
+        return interval
+
+    def due(self, now=None):
+        """Same contract as MotionGate.due, with the interval recomputed first"""
+        now = time.monotonic() if now is None else now
+        self.effective_interval(now)
+        return self.gate.due(now)
+
+    def record_result(self, anomaly_found):
+        """Record a completed call (scheduled or manual); the next one is timed from now"""
+        self.gate.last_run = time.monotonic()
+        if anomaly_found:
+            self.last_anomaly = time.monotonic()
+            self.anomalies += 1
+
+    def seconds_until_due(self, now=None):
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.gate.last_run + self.gate.interval - now)
+
+    def to_dict(self):
+        if not self.decision:
+            self.effective_interval()
+        return {
+            'camera': self.key,
+            'kind': self.kind,
+            'base_interval': self.base_interval,
+            'min_interval': self.min_interval,
+            'max_interval': self.max_interval,
+            'decision': self.decision,
+            'anomalies': self.anomalies,
+            'seconds_until_due': round(self.seconds_until_due(), 1),
+            'gate': self.gate.to_dict()
+        }
+
+
+class AnalysisScheduler:
+    """Per-camera adaptive analysis intervals sharing one VILA budget and schedule"""
+
+    def __init__(self, usage, schedule=None):
+        self.usage = usage
+        self.schedule = schedule or TimeOfDaySchedule()
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def add(self, key, kind, detector, base_interval, min_interval, max_interval, static_factor=None):
+        """Register (or replace) the schedule for one camera and call kind"""
+        entry = ScheduledAnalysis(key, kind, detector, self.usage, self.schedule,
+                                  base_interval, min_interval, max_interval, static_factor)
+        with self._lock:
+            previous = self._entries.get((key, kind))
+            if previous is not None:
+                # Keep operator-configured bounds across restarts
+                entry.configure(previous.base_interval, previous.min_interval, previous.max_interval)
+            self._entries[(key, kind)] = entry
+        return entry
+
+    def remove(self, key):
+        """Drop every schedule of one camera"""
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] == key]:
+                del self._entries[entry_key]
+
+    def entry(self, key, kind):
+        with self._lock:
+            return self._entries.get((key, kind))
+
+    def entries(self, key=None):
+        with self._lock:
+            return [entry for (entry_key, _), entry in self._entries.items() if key is None or entry_key == key]
+
+    def to_dict(self):
+        cameras = {}
+        for entry in self.entries():
+            cameras.setdefault(entry.key, {})[entry.kind] = entry.to_dict()
+        return {
+            'vila': self.usage.to_dict(),
+            'schedule': self.schedule.to_dict(),
+            'cameras': cameras
+        }
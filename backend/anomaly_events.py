@@ -0,0 +1,369 @@
+import re
+import time
+import threading
+import numpy as np
+
+CRITICALITY = ('low', 'medium', 'high')
+CONFIDENCE = ('low', 'medium', 'high')
+
+# Standard anomaly categories from the VILA prompt, most specific first: an
+# item is filed under the first category whose pattern matches
+CATEGORIES = [
+    ('weapon', 'high', r'weapon|\bguns?\b|knife|knives|firearm|rifle'),
+    ('violence', 'high', r'\bfight|violen|altercation|assault|punch|brawl|attack'),
+    ('fire_smoke', 'high', r'\bfire\b(?! (lane|exit|door|escape|extinguisher|hydrant))|smoke|flames?\b'),
+    ('camera_tampering', 'high', r'camera\w* (is |being |was )?(block|tamper|obstruct|cover)|tamper|lens (is )?(block|cover)'),
+    ('theft', 'high', r'theft|steal|stole|shoplift|conceal|pickpocket'),
+    ('trespassing', 'high', r'trespass|climb\w* (over |up )?(the |a )?(fence|wall|gate)|fence[- ]climb'),
+    ('intrusion', 'high', r'intru|break[- ]in|forced entry|after hours|non-operational hours'),
+    ('person_fall', 'high', r'(person|people|man|woman|worker|someone|individual|pedestrian|child)\w*\s+(\w+\s+){0,3}'
+                            r'(fall|fell|falling|fallen|trip|stumbl|slip)|lying (on|motionless)'),
+    ('collision', 'high', r'collision|collid|crash|impact|hit by|struck'),
+    ('wrong_way_vehicle', 'high', r'wrong (direction|way)|against (the )?(flow of )?traffic'),
+    ('falling_object', 'medium', r'(object|box|item|equipment|pallet|load|crate)\w*\s+(\w+\s+){0,2}(fall|fell|falling|drop)'
+                                 r'|(fell|falling|dropped) (off|from)'),
+    ('vandalism', 'medium', r'vandal|graffiti|property damage|smash'),
+    ('spill_damage', 'medium', r'spill|leak|broken glass|structural damage|\bcrack'),
+    ('equipment_failure', 'medium', r'malfunction|equipment (failure|fault)|(machine|equipment)\w* (stopped|broke)'),
+    ('unattended_object', 'medium', r'unattended|abandoned (bag|package|object|item|luggage|box)|left behind'),
+    ('missing_ppe', 'medium', r'helmet|hard ?hat|hi-?vis|safety vest|protective (gear|equipment)|\bppe\b'),
+    ('speeding', 'medium', r'speeding|too fast|excessive speed|high speed'),
+    ('crowd', 'medium', r'crowd|overcrowd|large group|gathering'),
+    ('abandoned_vehicle', 'low', r'abandoned (vehicle|car|truck|van)'),
+    ('queue_jumping', 'low', r'queue|line[- ]jump|cutting in line|cut in line'),
+    ('loitering', 'low', r'loiter|lingering|hanging around'),
+    ('suspicious_movement', 'low', r'suspicious|erratic'),
+    ('safety_incident', 'medium', r'safety (incident|hazard|violation|risk)|unsafe|hazard'),
+    ('other', 'medium', None)
+]
+CATEGORY_NAMES = [name for name, _, _ in CATEGORIES]
+_CATEGORY_PATTERNS = [(CATEGORY_NAMES.index(name), CRITICALITY.index(level), re.compile(pattern, re.I))
+                      for name, level, pattern in CATEGORIES if pattern]
+OTHER = CATEGORY_NAMES.index('other')
+
+SECTION = re.compile(r'\*{0,2}\s*(STANDARD ANOMALIES DETECTED|CUSTOM ANOMALIES DETECTED|OVERALL ASSESSMENT)\s*:?\s*\*{0,2}:?', re.I)
+RESULT_MARKER = re.compile(r'(Anomaly )?Detection Results:\s*\n-*\n?', re.I)
+ERROR_PREFIXES = ('error', 'api error', 'ssl error', 'network error', 'request error', 'anomaly detection error',
+                  'analysis error', 'insufficient frames', 'live tracking not active', 'error detecting anomalies')
+NORMAL = re.compile(r'^\W*(no significant anomalies|no anomalies|none detected|normal activity observed)', re.I)
+NEGATED = re.compile(r'^\W*(no|none|not|nothing)\b|\bno (signs?|evidence|indications?) of\b|'
+                     r'\b(not|were not|was not) (observed|detected|present|visible|seen)\b|\bnone detected\b', re.I)
+ROUTINE = re.compile(r'\b(normal|routine|fine|as expected|no issues|nothing unusual)\b', re.I)
+HEDGED = re.compile(r'\b(possibl[ey]|may|might|could|appears?|appearing|seems?|potential(ly)?|suspected|unclear|'
+                    r'perhaps|likely|cannot be confirmed)\b', re.I)
+CERTAIN = re.compile(r'\b(clearly|confirmed|definitely|obvious(ly)?|visibly|in progress)\b', re.I)
+LIST_ITEM = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s+')
+
+
+def confidence_cue(text):
+    """'low' for hedged wording ('appears to', 'possibly'), 'high' for definite wording, else 'medium'"""
+    if HEDGED.search(text):
+        return 'low'
+    if CERTAIN.search(text):
+        return 'high'
+    return 'medium'
+
+
+def _items(text):
+    """List items of a response section, or its sentences when it is prose"""
+    items = []
+    for line in text.splitlines():
+        line = line.replace('**', '').strip()
+        if not line or line.endswith(':') or set(line) <= set('-=*'):
+            continue
+        if LIST_ITEM.match(line):
+            items.append(LIST_ITEM.sub('', line))
+        else:
+            items.extend(sentence for sentence in re.split(r'(?<=[.!?])\s+', line) if sentence)
+    return [item for item in items if not item.lower().startswith('overall')]
+
+
+def _classify(item):
+    for category, criticality, pattern in _CATEGORY_PATTERNS:
+        if pattern.search(item):
+            return category, criticality
+    return OTHER, CRITICALITY.index('medium')
+
+
+def _match_custom(item, custom_anomalies):
+    lowered = item.lower()
+    for anomaly in custom_anomalies:
+        name = anomaly.get('name', '').strip().lower()
+        if name and name in lowered:
+            return anomaly
+    return None
+
+
+def parse_anomaly_response(text, custom_anomalies=None):
+    """Structured events from one VILA anomaly response.
+
+    Understands the sectioned format (STANDARD / CUSTOM ANOMALIES DETECTED,
+    OVERALL ASSESSMENT) and free-text summaries. Returns a list of dicts with
+    category, custom (matched custom anomaly name or None), criticality,
+    confidence and description; empty for normal scenes and error messages.
+    At most one event per category or custom anomaly.
+    """
+    if not text:
+        return []
+    match = RESULT_MARKER.search(text)
+    body = text[match.end():] if match else text
+    stripped = body.strip().lower()
+    if stripped.startswith(ERROR_PREFIXES) or NORMAL.match(stripped):
+        return []
+    custom_anomalies = custom_anomalies or []
+
+    parts = SECTION.split(body)
+    sections = {parts[index].upper(): parts[index + 1] for index in range(1, len(parts) - 1, 2)}
+    structured = 'STANDARD ANOMALIES DETECTED' in sections or 'CUSTOM ANOMALIES DETECTED' in sections
+    if structured:
+        candidates = [(item, False) for item in _items(sections.get('STANDARD ANOMALIES DETECTED', ''))]
+        candidates += [(item, True) for item in _items(sections.get('CUSTOM ANOMALIES DETECTED', ''))]
+    else:
+        # Prose: everything before an overall assessment
+        candidates = [(item, False) for item in _items(parts[0])]
+
+    events = {}
+    for item, in_custom_section in candidates:
+        custom = _match_custom(item, custom_anomalies)
+        # A custom anomaly name may itself start with 'No' ('No helmet zone')
+        unnamed = item.lower().replace(custom['name'].strip().lower(), '') if custom else item
+        if NEGATED.search(unnamed) or NORMAL.match(unnamed):
+            continue
+        category, criticality = _classify(item)
+        if custom is not None:
+            criticality = CRITICALITY.index(custom.get('criticality', 'medium')) \
+                if custom.get('criticality') in CRITICALITY else criticality
+        elif in_custom_section:
+            # Reported as custom but naming none we know; keep the label VILA used
+            label = item.split(':', 1)[0].strip()[:60]
+            custom = {'name': label}
+        elif category == OTHER and not structured:
+            # Prose outside a list only counts when it names a known kind of anomaly
+            continue
+        key = (category, custom['name'] if custom else None)
+        event = {
+            'category': CATEGORY_NAMES[category],
+            'custom': custom['name'] if custom else None,
+            'criticality': CRITICALITY[criticality],
+            'confidence': confidence_cue(item),
+            'description': item[:200]
+        }
+        if key not in events or CONFIDENCE.index(event['confidence']) > CONFIDENCE.index(events[key]['confidence']):
+            events[key] = event
+
+    if not events and not structured:
+        # An unstructured response that did not say the scene was normal: one unclassified event
+        affirmative = [item for item, _ in candidates
+                       if not NEGATED.search(item) and not NORMAL.match(item) and not ROUTINE.search(item)]
+        if not affirmative:
+            return []
+        description = affirmative[0][:200]
+        events[(OTHER, None)] = {'category': 'other', 'custom': None, 'criticality': 'medium',
+                                 'confidence': confidence_cue(description), 'description': description}
+    return list(events.values())
+
+
+class AnomalyEventIndex:
+    """Anomaly events in columnar numpy arrays for fast aggregation.
+
+    Each column (start/end time, camera, category, custom anomaly,
+    criticality, confidence, report id) is one contiguous array, with
+    camera and custom-anomaly names interned to small integer codes, so
+    counting events by category or camera over a time window is a masked
+    bincount rather than a scan over report text. About 40 bytes per event
+    plus its description; the oldest events are dropped beyond capacity.
+    """
+
+    def __init__(self, capacity=1000000):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.size = 0
+        self.total = 0
+        self._start = np.zeros(1024, dtype=np.float64)
+        self._end = np.zeros(1024, dtype=np.float64)
+        self._camera = np.zeros(1024, dtype=np.uint16)
+        self._category = np.zeros(1024, dtype=np.uint8)
+        self._custom = np.zeros(1024, dtype=np.uint16)
+        self._criticality = np.zeros(1024, dtype=np.uint8)
+        self._confidence = np.zeros(1024, dtype=np.uint8)
+        self._report = np.zeros(1024, dtype=np.int64)
+        self._descriptions = []
+        # Code 0 means "unknown camera" (the camera table is full)
+        self.cameras = [None]
+        self._camera_codes = {}
+        # Code 0 means "no custom anomaly"
+        self.customs = [None]
+        self._custom_codes = {}
+
+    def _columns(self):
+        return ('_start', '_end', '_camera', '_category', '_custom', '_criticality', '_confidence', '_report')
+
+    def _grow(self):
+        for name in self._columns():
+            column = getattr(self, name)
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def _drop_oldest(self, count):
+        for name in self._columns():
+            column = getattr(self, name)
+            column[:self.size - count] = column[count:self.size]
+        del self._descriptions[:count]
+        self.size -= count
+
+    @staticmethod
+    def _intern(value, table, codes, limit):
+        code = codes.get(value)
+        if code is None:
+            if len(table) >= limit:
+                return None
+            code = codes[value] = len(table)
+            table.append(value)
+        return code
+
+    def add(self, camera, events, start, end, report_id=0):
+        """Index the events parsed from one report covering [start, end] (epoch seconds)"""
+        with self.lock:
+            if self.size + len(events) > self.capacity:
+                # Drop a tenth at a time so trimming is not paid on every insert
+                self._drop_oldest(min(self.size, max(len(events), self.capacity // 10)))
+            camera_code = self._intern(camera, self.cameras, self._camera_codes, 65535)
+            if camera_code is None:
+                print(f"Anomaly event index: camera table full, indexing events of {camera} as unknown")
+                camera_code = 0
+            for event in events:
+                if self.size == len(self._start):
+                    self._grow()
+                custom_code = 0
+                if event.get('custom'):
+                    custom_code = self._intern(event['custom'], self.customs, self._custom_codes, 65535) or 0
+                row = self.size
+                self._start[row] = start
+                self._end[row] = end
+                self._camera[row] = camera_code
+                self._category[row] = CATEGORY_NAMES.index(event['category'])
+                self._custom[row] = custom_code
+                self._criticality[row] = CRITICALITY.index(event['criticality'])
+                self._confidence[row] = CONFIDENCE.index(event['confidence'])
+                self._report[row] = report_id
+                self._descriptions.append(event.get('description', ''))
+                self.size += 1
+                self.total += 1
+
+    def _mask(self, camera=None, category=None, since=None, until=None, min_criticality=None):
+        size = self.size
+        mask = np.ones(size, dtype=bool)
+        if camera is not None:
+            code = self._camera_codes.get(camera)
+            if code is None:
+                return np.zeros(size, dtype=bool)
+            mask &= self._camera[:size] == code
+        if category is not None:
+            if category not in CATEGORY_NAMES:
+                raise ValueError(f'Unknown anomaly category: {category}')
+            mask &= self._category[:size] == CATEGORY_NAMES.index(category)
+        if since is not None:
+            mask &= self._end[:size] >= since
+        if until is not None:
+            mask &= self._start[:size] < until
+        if min_criticality is not None:
+            mask &= self._criticality[:size] >= CRITICALITY.index(min_criticality)
+        return mask
+
+    def counts(self, by='category', **filters):
+        """Event counts grouped by category, camera, criticality, confidence or custom"""
+        columns = {'category': ('_category', CATEGORY_NAMES), 'camera': ('_camera', self.cameras),
+                   'criticality': ('_criticality', CRITICALITY), 'confidence': ('_confidence', CONFIDENCE),
+                   'custom': ('_custom', self.customs)}
+        if by not in columns:
+            raise ValueError(f'Cannot group events by {by}')
+        column, labels = columns[by]
+        with self.lock:
+            mask = self._mask(**filters)
+            counts = np.bincount(getattr(self, column)[:self.size][mask], minlength=len(labels))
+            labels = list(labels)
+        return {labels[code]: int(count) for code, count in enumerate(counts) if count and labels[code] is not None}
+
+    def timeline(self, since, until, bucket_seconds=3600, **filters):
+        """Event counts per time bucket from since to until, by event start time"""
+        buckets = max(1, int(np.ceil((until - since) / bucket_seconds)))
+        with self.lock:
+            mask = self._mask(since=since, until=until, **filters)
+            offsets = ((self._start[:self.size][mask] - since) // bucket_seconds).astype(np.int64)
+        counts = np.bincount(np.clip(offsets, 0, buckets - 1), minlength=buckets)
+        return [{'start': since + index * bucket_seconds, 'count': int(count)} for index, count in enumerate(counts)]
+
+    def latest(self, limit=50, **filters):
+        """Newest-first events matching the filters"""
+        with self.lock:
+            rows = np.flatnonzero(self._mask(**filters))[::-1][:limit]
+            return [{
+                'camera': self.cameras[self._camera[row]],
+                'category': CATEGORY_NAMES[self._category[row]],
+                'custom': self.customs[self._custom[row]],
+                'criticality': CRITICALITY[self._criticality[row]],
+                'confidence': CONFIDENCE[self._confidence[row]],
+                'start': float(self._start[row]),
+                'end': float(self._end[row]),
+                'report_id': int(self._report[row]) or None,
+                'description': self._descriptions[row]
+            } for row in rows]
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'events': self.size,
+                'events_total': self.total,
+                'cameras': len(self.cameras) - 1,
+                'custom_anomalies': len(self.customs) - 1,
+                'memory_kb': round(sum(getattr(self, name).nbytes for name in self._columns()) / 1024, 1)
+            }
+
+
+def run_benchmark(events=1000000, cameras=32, days=365):
+    """Aggregation latency over a year of events vs. re-parsing the report text"""
+    import random
+
+    index = AnomalyEventIndex(capacity=events)
+    rng = random.Random(3)
+    now = time.time()
+    span = days * 86400.0
+    started = time.perf_counter()
+    for n in range(events):
+        end = now - span + n * span / events
+        index.add(f'camera_{n % cameras}', [{
+            'category': rng.choice(CATEGORY_NAMES), 'custom': None, 'criticality': rng.choice(CRITICALITY),
+            'confidence': rng.choice(CONFIDENCE), 'description': ''
+        }], end - 1.0, end, n + 1)
+    build = time.perf_counter() - started
+
+    def timed(fn, repeat=20):
+        t = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return round((time.perf_counter() - t) * 1000 / repeat, 2)
+
+    sample = ("**STANDARD ANOMALIES DETECTED:**\n- A person appears to be loitering near the entrance\n"
+              "- Boxes fell from a shelf in aisle 3\n\n**CUSTOM ANOMALIES DETECTED:**\nNone detected\n\n"
+              "**OVERALL ASSESSMENT:**\nMinor safety concerns.")
+    parse_ms = timed(lambda: parse_anomaly_response(sample), 1000)
+    return {
+        'events': events,
+        'index_rate_per_s': round(events / build),
+        'memory_kb': index.to_dict()['memory_kb'],
+        'counts_by_category_year_ms': timed(lambda: index.counts('category')),
+        'counts_by_camera_last_week_ms': timed(lambda: index.counts('camera', since=now - 7 * 86400)),
+        'high_criticality_one_camera_ms': timed(lambda: index.counts('category', camera='camera_3',
+                                                                     min_criticality='high')),
+        'hourly_timeline_last_day_ms': timed(lambda: index.timeline(now - 86400, now, 3600)),
+        'latest_50_ms': timed(lambda: index.latest(50, camera='camera_3')),
+        'parse_one_response_ms': parse_ms,
+        'reparse_all_reports_s': round(parse_ms * events / 1000, 1)
+    }
+
+
+if __name__ == '__main__':
+    print("Anomaly event index benchmark: 1M events over a year")
+    for key, value in run_benchmark().items():
+        print(f"  {key}: {value}")
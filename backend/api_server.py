@@ -10,14 +10,23 @@ import ssl
 import urllib3
 import threading
 from datetime import datetime
-import queue
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 import uvicorn
 import tempfile
 import os
+from frame_slot import FrameSlot
+from frame_cache import JpegFrameCache
+from adaptive_profile import EncodeBudget, AdaptiveProfile, FixedProfile
+from motion import MotionDetector
+from analysis_scheduler import VilaUsage, AnalysisScheduler
+from replay_source import ReplayCapture, resolve_replay_path
+from report_log import ReportLog
+from anomaly_events import AnomalyEventIndex, parse_anomaly_response
+from alert_correlator import AlertCorrelator, describe_decisions
+from mjpeg_stream import StreamRegistry, mjpeg_async_generator, parse_stream_fps, MIMETYPE as MJPEG_MIMETYPE
 
 # Disable SSL warnings and configure SSL context
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -42,15 +51,37 @@ print("VILA model will be used via NVIDIA API for video analysis and summarizati
 
 # Global variables for live tracking
 live_tracking_active = False
+# Set when a live recording played to its end; live tracking is then stopped
+live_finished = False
 live_cap = None
 live_frame_buffer = []
-live_analysis_queue = queue.Queue()
-live_anomaly_queue = queue.Queue()
 last_analysis_time = 0
 frame_accumulator = []
-current_live_frame = None
-live_reports_content = ""
+live_frame_slot = FrameSlot()
+encode_budget = EncodeBudget()
+live_frame_cache = JpegFrameCache('live', encode_budget)
+stream_registry = StreamRegistry()
+# Bounded report log; clients poll it with a cursor and only receive new entries
+live_reports = ReportLog()
+# Structured events parsed from live anomaly checks
+anomaly_events = AnomalyEventIndex()
+alert_correlator = AlertCorrelator()
 processing_interval_seconds = 15  # Default 15 seconds
+# Scene-change detection: static scenes are analyzed 4x less often and skip
+# anomaly checks; motion triggers both immediately
+live_motion = MotionDetector()
+# Intervals adapt within these bounds to activity, anomalies, VILA latency and budget
+vila_usage = VilaUsage()
+analysis_scheduler = AnalysisScheduler(vila_usage)
+
+def schedule_live_analysis():
+    analysis = analysis_scheduler.add("live", "analysis", live_motion, base_interval=processing_interval_seconds,
+                                      min_interval=5, max_interval=60, static_factor=4)
+    anomaly = analysis_scheduler.add("live", "anomaly", live_motion, base_interval=5,
+                                     min_interval=5, max_interval=30)
+    return analysis, anomaly
+
+analysis_schedule, anomaly_schedule = schedule_live_analysis()
 # Context storage for intelligent chat
 live_video_context = {
     "current_activity": "",
@@ -93,6 +124,8 @@ def encode_frame_to_base64(frame):
 
 def make_vila_request(payload):
     """Make request to VILA API with error handling"""
+    started = time.monotonic()
+    ok = False
     try:
         headers = {
             "Authorization": f"Bearer {NVIDIA_API_KEY}",
@@ -102,9 +135,13 @@ def make_vila_request(payload):
         session = requests.Session()
         session.verify = False
         
-        response = session.post(VILA_API_URL, headers=headers, json=payload, timeout=120)
+        # Global limit on concurrent VILA calls (live workers, scanner, manual requests)
+        with vila_usage.slot():
+            started = time.monotonic()
+            response = session.post(VILA_API_URL, headers=headers, json=payload, timeout=120)
         
         if response.status_code == 200:
+            ok = True
             result = response.json()
             return result['choices'][0]['message']['content'].strip()
         else:
@@ -120,6 +157,9 @@ def make_vila_request(payload):
     except Exception as e:
         print(f"Error in VILA request: {e}")
         return f"Request Error: {str(e)}"
+    finally:
+        # Latency and call rate feed the adaptive analysis scheduler
+        vila_usage.record(time.monotonic() - started, ok)
 
 def update_live_context(analysis_result, context_type="analysis"):
     """Update live video context for intelligent chat"""
@@ -455,13 +495,16 @@ def extract_key_frames(cap, total_frames, num_frames=12):
 # ---- Live Video Functions ----
 def live_frame_capture_worker():
     """Background worker to continuously capture frames and update display"""
-    global current_live_frame, frame_accumulator, live_cap, processing_interval_seconds
+    global frame_accumulator, live_cap, processing_interval_seconds, live_tracking_active, live_finished
     
     while live_tracking_active:
         try:
             if live_cap is not None:
                 ret, frame = live_cap.read()
                 if ret and frame is not None:
+                    # Sampled at most every 0.2 s by the detector itself
+                    live_motion.update(frame)
+                    
                     # Add frame to accumulator for analysis
                     frame_accumulator.append(frame.copy())
                     
@@ -480,24 +523,34 @@ def live_frame_capture_worker():
                     cv2.putText(display_frame, f"Analysis every {processing_interval_seconds}s | Anomaly check every 5s | Chat Available", 
                                (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 0), 1)
                     
-                    # Convert BGR to RGB for display
-                    current_live_frame = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-                    
-            time.sleep(0.033)  # ~30 FPS
+                    # Publish for /api/live-frame; it is JPEG-encoded once per frame
+                    live_frame_slot.publish(display_frame, time.monotonic())
+                elif isinstance(live_cap, ReplayCapture) and live_cap.finished:
+                    # Stop tracking so the workers exit instead of analyzing stale frames
+                    print("Live recording finished")
+                    live_finished = True
+                    live_tracking_active = False
+                    frame_accumulator = []
+                    live_cap.release()
+                    break
+            
+            # Replays pace themselves at the recording's (possibly accelerated) rate
+            if not isinstance(live_cap, ReplayCapture):
+                time.sleep(0.033)  # ~30 FPS
             
         except Exception as e:
             print(f"Error in frame capture worker: {e}")
             time.sleep(1)
 def live_analysis_worker():
     """Background worker for periodic live video analysis (configurable interval)"""
-    global frame_accumulator, last_analysis_time, live_analysis_queue, live_reports_content, processing_interval_seconds
+    global frame_accumulator, last_analysis_time, processing_interval_seconds
     
     while live_tracking_active:
         try:
             current_time = time.time()
             
-            # Check if the configured interval has passed since last analysis
-            if current_time - last_analysis_time >= processing_interval_seconds and len(frame_accumulator) >= 5:
+            # The gate runs at the configured interval while the scene is active
+            if len(frame_accumulator) >= 5 and analysis_schedule.due()[0]:
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] Starting {processing_interval_seconds}-second analysis...")
                 
                 # Select frames from accumulator
@@ -507,6 +560,7 @@ def live_analysis_worker():
                 if analysis_frames:
                     # Perform analysis
                     analysis_result = analyze_video_with_vila(analysis_frames, float(processing_interval_seconds))
+                    analysis_schedule.record_result(False)
                     
                     # Create timestamped report
                     timestamp = datetime.now().strftime('%H:%M:%S')
@@ -516,16 +570,12 @@ def live_analysis_worker():
                     report += f"Time period: {processing_interval_seconds} seconds\n\n"
                     report += analysis_result + "\n\n"
                     
-                    # Update global reports content
-                    live_reports_content = report + live_reports_content
-                    
-                    # Send to queue for UI update
-                    live_analysis_queue.put(("analysis", report))
+                    live_reports.append("analysis", report)
                 
                 # Reset timer
                 last_analysis_time = current_time
             
-            time.sleep(1)
+            time.sleep(0.5)
             
         except Exception as e:
             print(f"Error in live analysis worker: {e}")
@@ -533,16 +583,13 @@ def live_analysis_worker():
 
 def live_anomaly_worker():
     """Background worker for real-time anomaly detection"""
-    global frame_accumulator, live_anomaly_queue, live_reports_content
-    
-    last_anomaly_check = time.time()
+    global frame_accumulator
     
     while live_tracking_active:
         try:
-            current_time = time.time()
-            
-            # Check for anomalies every 5 seconds
-            if current_time - last_anomaly_check >= 5 and len(frame_accumulator) >= 3:
+            # Every 5 seconds while the scene is active, immediately on motion
+            run, _, trigger_time = anomaly_schedule.due() if len(frame_accumulator) >= 3 else (False, None, None)
+            if run:
                 # Take last 5 frames for anomaly detection
                 recent_frames = frame_accumulator[-5:] if len(frame_accumulator) >= 5 else frame_accumulator
                 
@@ -551,23 +598,27 @@ def live_anomaly_worker():
                     
                     # Detect anomalies
                     anomaly_result = detect_anomalies_with_vila(recent_frames, 5.0)
+                    events = parse_anomaly_response(anomaly_result, get_custom_anomalies())
+                    anomaly_found = bool(events)
+                    anomaly_schedule.record_result(anomaly_found)
                     
-                    # Only report if anomalies detected
-                    if "No significant anomalies detected" not in anomaly_result and "normal activity observed" not in anomaly_result.lower():
-                        timestamp = datetime.now().strftime('%H:%M:%S')
-                        alert = f"🚨 ANOMALY ALERT [{timestamp}]\n"
-                        alert += "=" * 40 + "\n"
-                        alert += anomaly_result + "\n\n"
-                        
-                        # Update global reports content
-                        live_reports_content = alert + live_reports_content
-                        
-                        # Send to queue for UI update
-                        live_anomaly_queue.put(("anomaly", alert))
-                
-                last_anomaly_check = current_time
+                    # Only report new incidents, escalations and ongoing ones past their cooldown
+                    if anomaly_found:
+                        decisions = alert_correlator.observe("live", events)
+                        if any(decision["notify"] for decision in decisions):
+                            timestamp = datetime.now().strftime('%H:%M:%S')
+                            alert = f"🚨 ANOMALY ALERT [{timestamp}]\n"
+                            alert += "=" * 40 + "\n"
+                            alert += anomaly_result + "\n\n"
+                            alert += describe_decisions(decisions) + "\n\n"
+                            
+                            entry = live_reports.append("anomaly", alert)
+                            alert_correlator.link_report(decisions, entry["id"])
+                        anomaly_events.add("live", events, time.time() - 5.0, time.time(),
+                                           decisions[0]["incident"].last_report_id)
+                        anomaly_schedule.gate.record_alert(trigger_time)
             
-            time.sleep(1)
+            time.sleep(0.5)
             
         except Exception as e:
             print(f"Error in live anomaly worker: {e}")
@@ -588,6 +639,7 @@ async def set_processing_interval(data: dict):
             raise HTTPException(status_code=400, detail="Interval must be between 5 and 60 seconds")
         
         processing_interval_seconds = int(interval)
+        analysis_schedule.configure(base_interval=processing_interval_seconds)
         
         print(f"Processing interval updated to {processing_interval_seconds} seconds")
         
@@ -775,13 +827,14 @@ async def upload_video_anomalies(file: UploadFile = File(...)):
         }, status_code=500)
 
 @app.post("/api/start-live-tracking")
-async def start_live_tracking():
-    """Start live video tracking with camera"""
-    global live_tracking_active, live_cap, last_analysis_time, frame_accumulator, current_live_frame, live_reports_content, live_video_context
+async def start_live_tracking(request: Request):
+    """Start live video tracking with camera, or {"replay": "file.mp4", "speed": 4, "loop": false}"""
+    global live_tracking_active, live_cap, last_analysis_time, frame_accumulator, live_frame_slot, live_video_context
+    global analysis_schedule, anomaly_schedule, live_finished
     
     try:
         # Reset reports and context
-        live_reports_content = ""
+        live_reports.clear()
         live_video_context = {
             "current_activity": "",
             "recent_analysis": "",
@@ -793,9 +846,29 @@ async def start_live_tracking():
             "last_updated": None
         }
         
-        # Try different camera indices
-        camera_indices = [0, 1, 2]
+        try:
+            data = await request.json()
+        except ValueError:
+            data = {}
+        
         live_cap = None
+        if isinstance(data, dict) and data.get("replay"):
+            # Play a recording through the same capture path instead of a camera
+            try:
+                live_cap = ReplayCapture(resolve_replay_path(data["replay"]),
+                                         float(data.get("speed", 1.0)), bool(data.get("loop", False)))
+            except (TypeError, ValueError) as e:
+                return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+            if not live_cap.isOpened():
+                # Never fall back to a webcam when a specific recording was asked for
+                live_cap.release()
+                live_cap = None
+                return JSONResponse({"success": False,
+                                     "error": f"Could not open recording {os.path.basename(str(data['replay']))}"},
+                                    status_code=400)
+        
+        # Try different camera indices
+        camera_indices = [] if live_cap is not None else [0, 1, 2]
         
         for idx in camera_indices:
             test_cap = cv2.VideoCapture(idx)
@@ -822,9 +895,12 @@ async def start_live_tracking():
         live_cap.set(cv2.CAP_PROP_FPS, 30)
         
         live_tracking_active = True
+        live_finished = False
         last_analysis_time = time.time()
         frame_accumulator = []
-        current_live_frame = None
+        live_frame_slot = FrameSlot()
+        live_motion.reset()
+        analysis_schedule, anomaly_schedule = schedule_live_analysis()
         
         # Start background workers
         capture_thread = threading.Thread(target=live_frame_capture_worker, daemon=True)
@@ -905,7 +981,7 @@ async def get_custom_anomalies_api():
 @app.post("/api/stop-live-tracking")
 async def stop_live_tracking():
     """Stop live video tracking"""
-    global live_tracking_active, live_cap, current_live_frame
+    global live_tracking_active, live_cap, live_frame_slot
     
     live_tracking_active = False
     
@@ -913,7 +989,7 @@ async def stop_live_tracking():
         live_cap.release()
         live_cap = None
     
-    current_live_frame = None
+    live_frame_slot = FrameSlot()
     
     return JSONResponse({
         "success": True,
@@ -921,77 +997,148 @@ async def stop_live_tracking():
     })
 
 @app.get("/api/live-frame")
-async def get_live_frame():
-    """Get current frame from live camera"""
-    global current_live_frame
-    
-    if not live_tracking_active or current_live_frame is None:
+async def get_live_frame(request: Request):
+    """Get current frame from live camera (encoded once, shared by all pollers)"""
+    if not live_tracking_active:
         return JSONResponse({
             "success": False,
             "error": "Live tracking not active or no frame available"
         })
     
     try:
-        # Convert frame to base64 for transmission
-        pil_image = Image.fromarray(current_live_frame)
-        buffer = BytesIO()
-        pil_image.save(buffer, format="JPEG", quality=90)
-        img_str = base64.b64encode(buffer.getvalue()).decode()
+        encoded = live_frame_cache.get(live_frame_slot, max_width=None, quality=90)
+        if encoded is None:
+            return JSONResponse({
+                "success": False,
+                "error": "Live tracking not active or no frame available"
+            })
+        
+        headers = {"ETag": f'"{encoded.etag}"', "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            live_frame_cache.record_not_modified()
+            return Response(status_code=304, headers=headers)
         
         return JSONResponse({
             "success": True,
-            "frame": f"data:image/jpeg;base64,{img_str}"
-        })
+            "frame": encoded.data_url
+        }, headers=headers)
     except Exception as e:
         return JSONResponse({
             "success": False,
             "error": str(e)
         })
 
-@app.get("/api/live-reports")
-async def get_live_reports():
-    """Get live analysis and anomaly updates"""
-    global live_reports_content, processing_interval_seconds
-    
-    # Get new updates from queues
-    new_updates = []
-    
-    # Get analysis updates
-    while not live_analysis_queue.empty():
-        try:
-            update_type, content = live_analysis_queue.get_nowait()
-            new_updates.append(content)
-        except queue.Empty:
-            break
-    
-    # Get anomaly updates
-    while not live_anomaly_queue.empty():
-        try:
-            update_type, content = live_anomaly_queue.get_nowait()
-            new_updates.append(content)
-        except queue.Empty:
-            break
-    
-    # If there are new updates, add them to the global content
-    if new_updates:
-        for update in new_updates:
-            live_reports_content = update + live_reports_content
+@app.get("/api/live-stream")
+async def get_live_stream(fps: float = 10, profile: str = "adaptive"):
+    """MJPEG (multipart/x-mixed-replace) stream of the live camera"""
+    if not live_tracking_active:
+        return JSONResponse({
+            "success": False,
+            "error": "Live tracking not active"
+        }, status_code=400)
     
-    # Return the current reports content
-    if live_reports_content:
-        content = live_reports_content
+    max_fps = parse_stream_fps(fps)
+    if profile == "fixed":
+        adaptive = FixedProfile(encode_budget, None, 90, max_fps)
     else:
-        content = f"📋 Live analysis reports will appear here...\n\n🔄 Automatic reports every {processing_interval_seconds} seconds\n🚨 Anomaly alerts as they happen\n📊 Manual analysis reports on demand\n💬 Chat available for contextual queries"
-    
+        adaptive = AdaptiveProfile(encode_budget, max_fps=max_fps)
+    frames = mjpeg_async_generator(
+        stream_registry,
+        "live",
+        lambda: live_frame_slot,
+        live_frame_cache,
+        lambda: live_tracking_active,
+        max_fps=max_fps,
+        adaptive=adaptive,
+        max_width=None,
+        quality=90
+    )
+    return StreamingResponse(frames, media_type=MJPEG_MIMETYPE, headers={"Cache-Control": "no-cache"})
+
+@app.get("/api/motion-stats")
+async def get_motion_stats():
+    """Scene activity and VILA calls made/skipped by the live motion gates"""
+    return JSONResponse({
+        "success": True,
+        "motion": live_motion.to_dict(),
+        "gates": {
+            "analysis": analysis_schedule.gate.to_dict(),
+            "anomaly": anomaly_schedule.gate.to_dict()
+        }
+    })
+
+@app.get("/api/scheduler-status")
+async def get_scheduler_status():
+    """Effective analysis intervals and the factors behind them"""
+    return JSONResponse({
+        "success": True,
+        "scheduler": analysis_scheduler.to_dict()
+    })
+
+@app.post("/api/motion-config")
+async def set_motion_config(data: dict):
+    """Set motion thresholds for the live camera"""
+    try:
+        live_motion.configure(
+            threshold=data.get("threshold"),
+            pixel_delta=data.get("pixel_delta"),
+            spike_factor=data.get("spike_factor"),
+            hold_seconds=data.get("hold_seconds")
+        )
+        return JSONResponse({"success": True, "motion": live_motion.to_dict()})
+    except (TypeError, ValueError) as e:
+        return JSONResponse({"success": False, "error": f"Invalid motion settings: {e}"}, status_code=400)
+
+@app.get("/api/stream-stats")
+async def get_stream_stats():
+    """Per-viewer frame rate and bandwidth for MJPEG streams"""
     return JSONResponse({
         "success": True,
-        "reports": content
+        "streams": stream_registry.to_dict()
     })
 
+@app.get("/api/frame-cache-stats")
+async def get_frame_cache_stats():
+    """Encodes per second vs. requests per second for the live frame cache"""
+    return JSONResponse({
+        "success": True,
+        "live": live_frame_cache.to_dict(),
+        "encode_budget": encode_budget.to_dict()
+    })
+
+@app.get("/api/live-reports")
+async def get_live_reports(after: int = None, limit: int = 50):
+    """Live analysis and anomaly reports with id > after, oldest first.
+
+    Clients pass back the returned cursor; without one (or with a cursor
+    from before a restart) they get the latest page and reset=true.
+    """
+    page = live_reports.page(after, limit)
+    return JSONResponse({
+        "success": True,
+        **page,
+        "interval_seconds": processing_interval_seconds
+    })
+
+@app.get("/api/anomaly-events")
+async def get_anomaly_events(by: str = "category", hours: float = 24, limit: int = 50):
+    """Latest live anomaly events and their counts over the last `hours`"""
+    try:
+        since = time.time() - hours * 3600
+        return JSONResponse({
+            "success": True,
+            "events": anomaly_events.latest(max(1, min(limit, 500)), since=since),
+            "counts": anomaly_events.counts(by, since=since),
+            "index": anomaly_events.to_dict(),
+            "incidents": alert_correlator.incidents(state="all", limit=50)
+        })
+    except ValueError as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+
 @app.post("/api/live-analysis")
 async def process_live_analysis():
     """Process analysis for live video"""
-    global frame_accumulator, live_reports_content
+    global frame_accumulator
     
     if not live_tracking_active:
         return JSONResponse({
@@ -1021,12 +1168,12 @@ async def process_live_analysis():
         report += analysis_result + "\n\n"
         report += "💬 Context updated - Chat now available for queries\n\n"
         
-        # Add to global reports
-        live_reports_content = report + live_reports_content
+        entry = live_reports.append("analysis", report)
         
         return JSONResponse({
             "success": True,
-            "analysis": live_reports_content
+            "analysis": report,
+            "id": entry["id"]
         })
         
     except Exception as e:
@@ -1038,7 +1185,7 @@ async def process_live_analysis():
 @app.post("/api/live-anomaly")
 async def process_live_anomaly():
     """Process anomaly detection for live video"""
-    global frame_accumulator, live_reports_content
+    global frame_accumulator
     
     if not live_tracking_active:
         return JSONResponse({
@@ -1068,12 +1215,16 @@ async def process_live_anomaly():
         report += anomaly_result + "\n\n"
         report += "💬 Context updated - Ask chat about detected anomalies\n\n"
         
-        # Add to global reports
-        live_reports_content = report + live_reports_content
+        entry = live_reports.append("anomaly", report)
+        events = parse_anomaly_response(anomaly_result, get_custom_anomalies())
+        if events:
+            anomaly_events.add("live", events, time.time() - len(recent_frames) / 30.0, time.time(), entry["id"])
         
         return JSONResponse({
             "success": True,
-            "analysis": live_reports_content
+            "analysis": report,
+            "id": entry["id"],
+            "events": events
         })
         
     except Exception as e:
@@ -1227,6 +1378,7 @@ async def get_context_status():
     try:
         status = {
             "live_tracking_active": live_tracking_active,
+            "live_finished": live_finished,
             "live_context_available": live_video_context.get("last_updated") is not None,
             "uploaded_context_available": uploaded_video_context.get("last_analyzed") is not None,
             "live_frames_count": len(frame_accumulator) if live_tracking_active else 0,
@@ -1,5 +1,6 @@
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, jsonify, request, send_file, Response, stream_with_context
 from flask_cors import CORS
+from flask_sock import Sock
 import os
 import threading
 import time
@@ -7,13 +8,32 @@ from datetime import datetime
 import json
 import cv2
 import queue
-import base64
-from io import BytesIO
-from PIL import Image
 import requests
 import ssl
 import urllib3
 from video_processor import VideoProcessor
+from camera_capture import CameraCapture, CaptureStats
+from capture_pool import CapturePool, PooledConnection, OPEN_TIMEOUT as POOL_OPEN_TIMEOUT
+from camera_connection import CameraConnection, CONNECTED
+from synthetic_camera import open_capture
+from replay_source import resolve_replay_path
+from frame_slot import FrameSlot
+from frame_cache import JpegFrameCache
+from adaptive_profile import EncodeBudget, AdaptiveProfile, FixedProfile, ProfileRegistry, fixed_profile
+from mosaic import MosaicRegistry, parse_camera_ids
+from analysis_scheduler import AnalysisScheduler
+from camera_registry import CameraRegistry
+from report_store import ReportStore, camera_key, parse_time
+from anomaly_events import AnomalyEventIndex, parse_anomaly_response, CATEGORY_NAMES, CRITICALITY
+from notification_store import NotificationStore
+from alert_correlator import AlertCorrelator, describe_decisions
+from metrics import MetricsStore
+from dashboard_snapshot import DashboardSnapshot
+from evidence_clips import EvidenceRecorder
+from dvr import ContinuousRecorder
+from surveillance_scanner import SurveillanceScanner
+from push_channel import PushHub, LIVE_FEED_ID
+from mjpeg_stream import StreamRegistry, mjpeg_generator, parse_stream_fps, MIMETYPE as MJPEG_MIMETYPE
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -21,6 +41,7 @@ ssl._create_default_https_context = ssl._create_unverified_context
 
 app = Flask(__name__)
 CORS(app)
+sock = Sock(app)
 
 # Initialize video processor
 video_processor = VideoProcessor()
@@ -28,142 +49,318 @@ video_processor = VideoProcessor()
 # Global state management
 app_state = {
     'live_tracking_active': False,
+    # True once a live recording played to its end (or the camera stopped delivering)
+    'live_finished': False,
     'live_cap': None,
     'current_live_frame': None,
     'frame_accumulator': [],
-    'live_reports': [],
     'video_context': None,
     'live_video_context': None,
     'last_processed_context': None,  # NEW: Store the last processed context (live or uploaded)
     'chat_history': [],
-    'anomaly_notifications': [],
     'system_stats': {
-        'accidents': 0,
-        'active_cameras': 24,
-        'ai_scanned': 4294,
-        'uptime': 99.8
+        'accidents': 0
     },
     # Background worker control
     'workers_active': False,
     'worker_threads': []
 }
 
-# FIXED: Enhanced surveillance state management
-surveillance_state = {
-    'cameras': {
-        1: {
-            'active': False, 
-            'url': '', 
-            'cap': None, 
-            'frame_buffer': [], 
-            'reports': [],
-            'last_frame': None,
-            'connection_attempts': 0,
-            'last_analysis': None,
-            'frame_thread': None,
-            'frame_thread_active': False
-        },
-        2: {
-            'active': False, 
-            'url': '', 
-            'cap': None, 
-            'frame_buffer': [], 
-            'reports': [],
-            'last_frame': None,
-            'connection_attempts': 0,
-            'last_analysis': None,
-            'frame_thread': None,
-            'frame_thread_active': False
-        },
-        3: {
-            'active': False, 
-            'url': '', 
-            'cap': None, 
-            'frame_buffer': [], 
-            'reports': [],
-            'last_frame': None,
-            'connection_attempts': 0,
-            'last_analysis': None,
-            'frame_thread': None,
-            'frame_thread_active': False
-        }
-    },
-    'total_cameras': 3,
-    'active_count': 0
-}
+# Global JPEG encode budget; preview quality degrades when encoding gets too expensive
+encode_budget = EncodeBudget()
+
+# Surveillance cameras; more can be added and removed at runtime via /api/surveillance/cameras
+camera_registry = CameraRegistry(encode_budget)
+for _cam_id in (1, 2, 3):
+    camera_registry.add(_cam_id)
+
+# Analysis reports of every camera and the live feed, persisted across restarts
+report_store = ReportStore()
+
+# Anomaly notifications: newest in memory, all of them in the report database
+notification_store = NotificationStore()
+
+# Scans, anomalies, VILA latency, camera uptime and frames, rolled up per minute/hour/day
+metrics = MetricsStore()
+METRICS_SAMPLE_SECONDS = 10
+
+# Pre-event JPEG rings per camera; anomalies get a clip from before to after the alert
+evidence_recorder = EvidenceRecorder()
+
+# Continuous segmented recording of the cameras it is turned on for, seekable by time
+continuous_recorder = ContinuousRecorder()
+
+# Structured events parsed from anomaly reports, for dashboards and alerting
+anomaly_events = AnomalyEventIndex()
+ANOMALY_REPORT_TYPES = ('Anomaly Detection', 'Automatic Anomaly Scan', 'anomaly', 'auto_anomaly')
+ANOMALY_EVENT_HISTORY_DAYS = 30
+# Repeated findings of the same anomaly update one incident instead of alerting again
+alert_correlator = AlertCorrelator()
+LIVE_ANOMALY_WINDOW = 1.5   # seconds of live video in one anomaly check (9 frames sampled at 6 fps)
+CAMERA_ANOMALY_WINDOW = 0.8  # at most 8 surveillance frames, counted as 10 fps
+
+def record_anomaly_events(camera, events, report_id, duration):
+    """Index the events of an anomaly report covering the last `duration` seconds"""
+    end = time.time()
+    anomaly_events.add(camera, events, end - duration, end, report_id)
+
+def new_incident_count(decisions):
+    """Incidents a correlated response opened; only these count as accidents"""
+    return sum(1 for decision in decisions if decision['status'] == 'new')
+
+def count_anomalies(source, count):
+    """Add new incidents of a camera, 'live' or 'upload' to the accident counter and metrics"""
+    app_state['system_stats']['accidents'] += count
+    if count:
+        metrics.record('anomalies', count, source)
+
+def rebuild_anomaly_events():
+    """Re-index recent anomaly reports after a restart; runs in the background"""
+    started = time.time()
+    count = 0
+    try:
+        for report in report_store.scan(started - ANOMALY_EVENT_HISTORY_DAYS * 86400, ANOMALY_REPORT_TYPES):
+            events = parse_anomaly_response(report['content'])
+            if events:
+                duration = LIVE_ANOMALY_WINDOW if report['camera'] == 'live' else CAMERA_ANOMALY_WINDOW
+                anomaly_events.add(report['camera'], events, report['ts'] - duration, report['ts'], report['id'])
+                count += len(events)
+        print(f"Indexed {count} anomaly events from stored reports in {time.time() - started:.1f}s")
+    except Exception as e:
+        print(f"Error rebuilding anomaly events: {e}")
+
+threading.Thread(target=rebuild_anomaly_events, daemon=True).start()
+
+# Where surveillance capture and decode run: 'thread' (in this process) or 'process'
+# (worker processes publishing through shared memory, for many cameras)
+capture_settings = {'mode': os.environ.get('SURVEILLANCE_CAPTURE_MODE', 'thread')}
+capture_pool = CapturePool()
 
 # Thread-safe queues
 live_analysis_queue = queue.Queue()
 live_anomaly_queue = queue.Queue()
 
+# Encode-once JPEG cache for the live feed (surveillance cameras keep their own)
+live_frame_cache = JpegFrameCache('live', encode_budget)
+
+# Adaptive preview profiles for polling clients that send ?client=<id>
+polling_profiles = ProfileRegistry(encode_budget)
+
+# Connected MJPEG stream viewers
+stream_registry = StreamRegistry()
+
+# Server-side multi-camera mosaics, composed once per camera-set change
+mosaic_registry = MosaicRegistry(encode_budget)
+
+# WebSocket push channel for frames and report/notification/status events
+push_hub = PushHub(encode_budget)
+
+# Adaptive per-camera analysis intervals sharing the VILA rate budget
+analysis_scheduler = AnalysisScheduler(video_processor.vila_usage)
+
+def schedule_camera_analysis(camera):
+    """Register a camera's analysis and anomaly intervals from its analysis profile"""
+    for kind, bounds in camera.analysis_profile.items():
+        analysis_scheduler.add(f'camera_{camera.id}', kind, camera.motion, static_factor=4, **bounds)
+
+def record_camera_evidence(camera):
+    """Keep a pre-event ring of a camera's frames while it runs, and record it when recording is on"""
+    slot_getter = lambda: camera.frame_slot if camera.active else None
+    evidence_recorder.add_source(camera_key(camera.id), slot_getter)
+    continuous_recorder.add_source(camera_key(camera.id), slot_getter)
+
+for _camera in camera_registry.values():
+    schedule_camera_analysis(_camera)
+    record_camera_evidence(_camera)
+
+evidence_recorder.add_source('live', lambda: video_processor.live_slot if app_state['live_tracking_active'] else None)
+
+def record_evidence(source, decisions, report_id):
+    """Start an evidence clip when a response opened or escalated an incident; returns the clip id"""
+    if any(decision['status'] != 'ongoing' for decision in decisions):
+        return evidence_recorder.trigger(source, report_id)
+    return None
+
+def record_vila_call(seconds, ok):
+    metrics.record('vila_latency', seconds)
+    if not ok:
+        metrics.record('vila_errors', 1)
+
+video_processor.vila_usage.listeners.append(record_vila_call)
+
+def camera_online(camera):
+    return camera.active and camera.connection is not None and camera.connection.state == CONNECTED
+
+def sample_camera_metrics():
+    """Every METRICS_SAMPLE_SECONDS: frames decoded per camera and whether each started camera is online"""
+    decoded = {}
+    while True:
+        time.sleep(METRICS_SAMPLE_SECONDS)
+        try:
+            for camera in list(camera_registry.values()):
+                key = camera_key(camera.id)
+                stats = camera.capture_stats
+                # A restarted camera gets fresh stats; count from zero again
+                previous_stats, previous = decoded.get(camera.id, (None, 0))
+                frames = stats.retrieved - previous if stats is previous_stats else stats.retrieved
+                decoded[camera.id] = (stats, stats.retrieved)
+                if frames > 0:
+                    metrics.record('frames', frames, key)
+                if camera.active:
+                    metrics.record('camera_up', 1 if camera_online(camera) else 0, key)
+        except Exception as e:
+            print(f"Error sampling camera metrics: {e}")
+
+threading.Thread(target=sample_camera_metrics, daemon=True).start()
+
+def add_anomaly_notification(message, details, source=None, events=None):
+    """Store an anomaly notification and push it to connected clients"""
+    severity = max((event['criticality'] for event in events), key=CRITICALITY.index) if events else None
+    notification = notification_store.add(message, details, source, severity)
+    push_hub.publish('notification', {**notification, 'unread': notification_store.unread})
+    return notification
+
+def preview_options(source, max_width, quality):
+    """Encode options for a polled preview and the client's AdaptiveProfile, if any.
+
+    Clients that pass ?client=<id>&delivery_ms=<time the previous fetch took>
+    get a per-client profile; everyone else gets the fixed profile, degraded
+    only when the global encode budget is exceeded.
+    """
+    client_id = request.args.get('client')
+    if not client_id:
+        return fixed_profile(encode_budget, max_width, quality), None
+    
+    profile = polling_profiles.get(f'{source}:{client_id}')
+    try:
+        delivery_ms = float(request.args.get('delivery_ms', ''))
+    except ValueError:
+        delivery_ms = None
+    if delivery_ms is not None:
+        _, fps = profile.current()
+        profile.record_delivery(delivery_ms / 1000.0, 1.0 / fps)
+    options, _ = profile.current()
+    return options, profile
+
+def encoded_frame_response(frame_cache, encoded, profile=None):
+    """JSON frame response carrying an ETag; answers 304 when the client already has it"""
+    if request.if_none_match.contains(encoded.etag):
+        frame_cache.record_not_modified()
+        response = app.response_class(status=304)
+    else:
+        response = jsonify({
+            'success': True,
+            'frame': encoded.data_url,
+            'profile': profile.to_dict() if profile else None,
+            'timestamp': datetime.now().isoformat()
+        })
+    response.set_etag(encoded.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def draw_fast_live_overlay(frame):
+    """Minimal overlay for the fast live endpoint"""
+    cv2.putText(frame, f"LIVE {datetime.now().strftime('%H:%M:%S')}", 
+               (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 1)
+
 # ===== SYSTEM STATUS ENDPOINTS =====
 
+def system_status():
+    """Headline numbers for /api/status and the dashboard snapshot"""
+    uptime_samples, online = metrics.total('camera_up', seconds=86400)
+    return {
+        'live_tracking_active': app_state['live_tracking_active'],
+        'live_finished': app_state['live_finished'],
+        'live_source': (video_processor.live_source_status()
+                        if app_state['live_tracking_active'] or app_state['live_finished'] else None),
+        'accidents': app_state['system_stats']['accidents'],
+        'active_cameras': camera_registry.active_count + (1 if app_state['live_tracking_active'] else 0),
+        'ai_scanned': int(metrics.total('scans', seconds=365 * 86400)[1]),
+        'uptime': round(100.0 * online / uptime_samples, 1) if uptime_samples else None,
+        'surveillance_active_count': camera_registry.active_count,
+        'total_cameras': len(camera_registry),
+        'open_incidents': alert_correlator.to_dict()['open_incidents']
+    }
+
 @app.route('/api/status', methods=['GET'])
 def get_system_status():
     """Get current system status"""
-    return jsonify({
-        'live_tracking_active': app_state['live_tracking_active'],
-        'accidents': app_state['system_stats']['accidents'],
-        'active_cameras': app_state['system_stats']['active_cameras'],
-        'ai_scanned': app_state['system_stats']['ai_scanned'],
-        'uptime': app_state['system_stats']['uptime'],
-        'surveillance_active_count': surveillance_state['active_count'],
-        'timestamp': datetime.now().isoformat()
-    })
+    return jsonify({**system_status(), 'timestamp': datetime.now().isoformat()})
 
-@app.route('/api/activity', methods=['GET'])
-def get_recent_activity():
-    """Get recent activity for dashboard"""
-    activities = [
-        {
-            'id': 1,
-            'type': 'accident',
-            'icon': 'fas fa-exclamation-triangle',
-            'title': 'New incident detected',
-            'message': 'Crowd on camera M2',
-            'timestamp': '2 minutes ago',
-            'read': False
-        },
-        {
-            'id': 2,
-            'type': 'camera',
-            'icon': 'fas fa-video-slash',
-            'title': 'Connection renewed',
-            'message': 'camera M25',
-            'timestamp': '5 minutes ago',
-            'read': False
-        },
-        {
-            'id': 3,
+def recent_activity(limit=5):
+    """Latest notifications as dashboard activity items; ids are notification ids"""
+    now = datetime.now()
+    items = []
+    for notification in notification_store.page(limit=limit)['notifications']:
+        minutes = int((now - datetime.fromisoformat(notification['timestamp'])).total_seconds() // 60)
+        if minutes < 1:
+            when = 'just now'
+        elif minutes < 60:
+            when = f"{minutes} minute{'s' if minutes > 1 else ''} ago"
+        else:
+            when = notification['timestamp'][:16].replace('T', ' ')
+        items.append({
+            'id': notification['id'],
             'type': 'accident',
             'icon': 'fas fa-exclamation-triangle',
-            'title': 'New incident detected',
-            'message': 'Smoke on camera M17',
-            'timestamp': '12 minutes ago',
-            'read': False
-        },
-        {
-            'id': 4,
-            'type': 'camera',
-            'icon': 'fas fa-video-slash',
-            'title': 'Lost connection',
-            'message': 'camera M25',
-            'timestamp': '18 minutes ago',
-            'read': True
-        },
-        {
-            'id': 5,
-            'type': 'camera',
-            'icon': 'fas fa-video-slash',
-            'title': 'Lost connection',
-            'message': 'camera M17',
-            'timestamp': '25 minutes ago',
-            'read': True
-        }
-    ]
-    
+            'title': notification['message'],
+            'message': notification['details'],
+            'timestamp': when,
+            'read': notification['read']
+        })
+    return items
+
+@app.route('/api/activity', methods=['GET'])
+def get_recent_activity():
+    """Get recent activity for dashboard: ?limit= (1-100, default 5)"""
+    try:
+        limit = max(1, min(int(request.args.get('limit', 5)), 100))
+        return jsonify({
+            'items': recent_activity(limit),
+            'timestamp': datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid activity query: {str(e)}'}), 400
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """One metric's rollup buckets: ?name=scans|anomalies|vila_latency|vila_errors|frames|camera_up
+    &camera=<id>|live|upload&resolution=minute|hour|day&since=&until= (default: the last 24 buckets)"""
+    try:
+        name = request.args.get('name')
+        if not name:
+            return jsonify({'error': 'Metric name is required', 'names': metrics.names()}), 400
+        camera = request.args.get('camera')
+        key = camera if camera in ('live', 'upload') else report_camera_arg()
+        return jsonify({
+            'name': name,
+            'camera': key,
+            'resolution': request.args.get('resolution', 'hour'),
+            'buckets': metrics.series(name, key, request.args.get('resolution', 'hour'),
+                                      parse_time(request.args.get('since')), parse_time(request.args.get('until'))),
+            'timestamp': datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid metrics query: {str(e)}'}), 400
+
+@app.route('/api/metrics/summary', methods=['GET'])
+def get_metrics_summary():
+    """Last hour and last 24 hours of every metric, overall and per camera"""
+    summary = {}
+    for name in metrics.names():
+        summary[name] = {}
+        for key in metrics.keys(name):
+            hour_count, hour_sum = metrics.total(name, key, 3600)
+            day_count, day_sum = metrics.total(name, key, 86400)
+            summary[name][key] = {
+                'last_hour': {'count': hour_count, 'sum': round(hour_sum, 3),
+                              'avg': round(hour_sum / hour_count, 3) if hour_count else None},
+                'last_day': {'count': day_count, 'sum': round(day_sum, 3),
+                             'avg': round(day_sum / day_count, 3) if day_count else None}
+            }
     return jsonify({
-        'items': activities,
+        'metrics': summary,
+        'store': metrics.to_dict(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -174,11 +371,12 @@ def connect_to_camera(camera_id, camera_url):
     try:
         print(f"Connecting to camera {camera_id}: {camera_url}")
         
-        # Try to connect to the camera
-        cap = cv2.VideoCapture(camera_url)
+        # Try to connect to the camera (synthetic:// URLs open the built-in simulator)
+        cap = open_capture(camera_url)
         
-        # Set timeout and buffer settings
+        # Minimal buffer so frames stay real-time
         cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        cap.set(cv2.CAP_PROP_FPS, 30)
         
         # Test if camera is accessible
         if cap.isOpened():
@@ -196,47 +394,32 @@ def connect_to_camera(camera_id, camera_url):
     except Exception as e:
         return None, f"Connection error: {str(e)}"
 
-def camera_frame_worker(camera_id):
-    """OPTIMIZED background worker for real-time frame capture"""
-    camera = surveillance_state['cameras'][camera_id]
-    
-    # Set optimal camera parameters for real-time streaming
-    if camera['cap']:
-        camera['cap'].set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimal buffer
-        camera['cap'].set(cv2.CAP_PROP_FPS, 30)        # Higher FPS
+def camera_frame_callback(camera):
+    """Per-frame work shared by thread and process capture"""
+    frame_slot = camera.frame_slot
     
-    frame_count = 0
+    def publish_frame(frame, for_display, for_analysis, capture_time):
+        camera.motion.update(frame)
+        
+        # The latest frame is already published (read-only) in the frame slot.
+        # Analysis samples are paced by the capture loop (CaptureDemand.analysis_fps)
+        # and share the published frame instead of copying it.
+        if for_analysis:
+            # Keeps only the last 30 frames (about 10 seconds of samples)
+            camera.add_analysis_frame(frame)
+            frame_slot.record_shared(frame)
     
-    while camera['frame_thread_active'] and camera['active']:
-        try:
-            if camera['cap'] and camera['cap'].isOpened():
-                ret, frame = camera['cap'].read()
-                if ret and frame is not None:
-                    # Always store latest frame for real-time display
-                    camera['last_frame'] = frame.copy()
-                    
-                    # Add to buffer less frequently (every 10th frame for analysis)
-                    frame_count += 1
-                    if frame_count % 10 == 0:
-                        camera['frame_buffer'].append(frame.copy())
-                        # Keep only last 30 frames (about 10 seconds of samples)
-                        if len(camera['frame_buffer']) > 30:
-                            camera['frame_buffer'] = camera['frame_buffer'][-30:]
-                else:
-                    print(f"No frame from camera {camera_id}")
-                    time.sleep(0.1)
-            else:
-                print(f"Camera {camera_id} not accessible")
-                break
-                
-        except Exception as e:
-            print(f"Error in camera {camera_id} worker: {e}")
-            break
-        
-        # CRITICAL: Much shorter sleep for real-time performance
-        time.sleep(0.033)  # ~30 FPS instead of 0.1 (10 FPS)
-    
-    print(f"Camera {camera_id} frame worker stopped")
+    return publish_frame
+
+def camera_connection_changed(camera_id, state):
+    """Connection manager callback: drop stale analysis frames while a camera is down"""
+    camera = camera_registry.get(camera_id)
+    if camera is None:
+        return
+    if state != CONNECTED:
+        camera.frame_buffer = []
+    push_hub.publish('status', {'camera_id': camera_id, 'active': camera.active, 'connection': state,
+                                'active_count': camera_registry.active_count})
 
 @app.route('/api/surveillance/start', methods=['POST'])
 def start_surveillance_camera():
@@ -244,47 +427,69 @@ def start_surveillance_camera():
     try:
         data = request.get_json()
         camera_id = int(data.get('camera_id'))
-        camera_url = data.get('camera_url', '').strip()
         
-        if camera_id not in surveillance_state['cameras']:
+        if camera_id not in camera_registry:
             return jsonify({'error': 'Invalid camera ID'}), 400
         
+        camera = camera_registry[camera_id]
+        
+        # Falls back to the URL stored in the camera's config
+        camera_url = data.get('camera_url', '').strip() or camera.url
         if not camera_url:
             return jsonify({'error': 'Camera URL is required'}), 400
         
-        camera = surveillance_state['cameras'][camera_id]
-        
         # Stop if already active
-        if camera['active']:
+        if camera.active:
             return jsonify({'error': f'Camera {camera_id} is already active'}), 400
         
-        # Try to connect
-        cap, error = connect_to_camera(camera_id, camera_url)
-        if not cap:
-            camera['connection_attempts'] += 1
-            return jsonify({'error': f'Failed to connect: {error}'}), 500
+        owner = camera_registry.find_by_url(camera_url)
+        if owner is not None and owner != camera_id:
+            return jsonify({'error': f'URL already used by camera {owner}'}), 400
+        
+        capture_mode = data.get('capture_mode') or capture_settings['mode']
+        if capture_mode not in ('thread', 'process'):
+            return jsonify({'error': "capture_mode must be 'thread' or 'process'"}), 400
+        
+        camera.frame_slot = FrameSlot()
+        camera.motion.reset()
+        
+        if capture_mode == 'process':
+            # A worker process opens the stream; reconnects are supervised like thread mode
+            camera.connection = PooledConnection(
+                f'Camera {camera_id}', camera_url, capture_pool, camera_id,
+                camera.frame_slot, camera.demand,
+                on_frame=camera_frame_callback(camera),
+                on_state=lambda state: camera_connection_changed(camera_id, state),
+                open_timeout=POOL_OPEN_TIMEOUT
+            )
+            camera.capture_stats = camera.connection.stats
+        else:
+            # Opened, watched and reconnected in the background; the request does not wait
+            camera.capture_stats = CaptureStats()
+            camera.connection = CameraConnection(
+                f'Camera {camera_id}', camera_url,
+                open_source=lambda url: connect_to_camera(camera_id, url),
+                make_capture=lambda cap: CameraCapture(cap, camera.demand, camera.capture_stats, camera.frame_slot),
+                on_frame=camera_frame_callback(camera),
+                on_state=lambda state: camera_connection_changed(camera_id, state)
+            )
         
         # Update camera state
-        camera['cap'] = cap
-        camera['url'] = camera_url
-        camera['active'] = True
-        camera['connection_attempts'] = 0
-        camera['frame_thread_active'] = True
-        
-        # Start frame capture worker
-        camera['frame_thread'] = threading.Thread(
-            target=camera_frame_worker, 
-            args=(camera_id,), 
-            daemon=True
-        )
-        camera['frame_thread'].start()
+        camera.capture_mode = capture_mode
+        camera_registry.set_url(camera_id, camera_url)
+        camera_registry.set_active(camera_id, True)
+        camera.connection_attempts = 0
+        camera.connection.start()
         
-        # Update global count
-        surveillance_state['active_count'] = sum(1 for cam in surveillance_state['cameras'].values() if cam['active'])
+        # Background anomaly scanning starts with the first camera
+        surveillance_scanner.start()
+        
+        push_hub.publish('status', {'camera_id': camera_id, 'active': True, 'active_count': camera_registry.active_count})
         
         return jsonify({
             'success': True,
             'message': f'Camera {camera_id} started successfully',
+            'connection': camera.connection.state,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -299,29 +504,22 @@ def stop_surveillance_camera():
         data = request.get_json()
         camera_id = int(data.get('camera_id'))
         
-        if camera_id not in surveillance_state['cameras']:
+        if camera_id not in camera_registry:
             return jsonify({'error': 'Invalid camera ID'}), 400
         
-        camera = surveillance_state['cameras'][camera_id]
+        camera = camera_registry[camera_id]
         
-        # Stop frame worker
-        camera['frame_thread_active'] = False
-        if camera['frame_thread'] and camera['frame_thread'].is_alive():
-            camera['frame_thread'].join(timeout=2)
+        # Reset camera state first so capture callbacks see an operator stop
+        camera_registry.set_active(camera_id, False)
         
-        # Release camera
-        if camera['cap']:
-            camera['cap'].release()
-            camera['cap'] = None
+        # Stop frame capture; the connection manager releases the stream
+        if camera.connection:
+            camera.connection.stop()
         
-        # Reset camera state
-        camera['active'] = False
-        camera['last_frame'] = None
-        camera['frame_buffer'] = []
-        camera['frame_thread'] = None
+        camera.frame_slot = FrameSlot()
+        camera.frame_buffer = []
         
-        # Update global count
-        surveillance_state['active_count'] = sum(1 for cam in surveillance_state['cameras'].values() if cam['active'])
+        push_hub.publish('status', {'camera_id': camera_id, 'active': False, 'active_count': camera_registry.active_count})
         
         return jsonify({
             'success': True,
@@ -335,36 +533,24 @@ def stop_surveillance_camera():
 
 @app.route('/api/surveillance/frame/<int:camera_id>', methods=['GET'])
 def get_surveillance_frame(camera_id):
-    """OPTIMIZED - Get current frame with caching"""
+    """Get current frame, encoded once per new frame and shared by all viewers"""
     try:
-        if camera_id not in surveillance_state['cameras']:
+        if camera_id not in camera_registry:
             return jsonify({'error': 'Invalid camera ID'}), 400
         
-        camera = surveillance_state['cameras'][camera_id]
+        camera = camera_registry[camera_id]
+        camera.demand.touch_viewer()
         
-        if not camera['active'] or camera['last_frame'] is None:
+        if not camera.active:
             return jsonify({'error': 'Camera not active or no frame available'}), 404
         
-        # Get frame - no copy needed since we're encoding immediately
-        frame = camera['last_frame']
-        
-        # OPTIMIZED: Resize before encoding to reduce data size
-        height, width = frame.shape[:2]
-        if width > 640:  # Resize large frames for web display
-            new_width = 640
-            new_height = int(height * (new_width / width))
-            frame = cv2.resize(frame, (new_width, new_height))
+        # The camera's preview profile unless the client's adaptive profile says otherwise
+        options, profile = preview_options(f'camera_{camera_id}', **camera.preview_profile)
+        encoded = camera.frame_cache.get(camera.frame_slot, **options)
+        if encoded is None:
+            return jsonify({'error': 'Camera not active or no frame available'}), 404
         
-        # OPTIMIZED: Lower JPEG quality for faster encoding/transmission
-        encode_params = [cv2.IMWRITE_JPEG_QUALITY, 75]  # Reduced from default 95
-        _, buffer = cv2.imencode('.jpg', frame, encode_params)
-        frame_base64 = base64.b64encode(buffer).decode('utf-8')
-        
-        return jsonify({
-            'success': True,
-            'frame': f'data:image/jpeg;base64,{frame_base64}',
-            'timestamp': datetime.now().isoformat()
-        })
+        return encoded_frame_response(camera.frame_cache, encoded, profile)
         
     except Exception as e:
         print(f"Error getting surveillance frame: {e}")
@@ -378,54 +564,194 @@ def get_live_frame_fast():
         if not app_state['live_tracking_active']:
             return jsonify({'error': 'Live monitoring not active'}), 400
         
-        # Get frame directly without extra processing
-        if video_processor.live_cap and video_processor.live_cap.isOpened():
-            ret, frame = video_processor.live_cap.read()
-            if ret and frame is not None:
-                # OPTIMIZED: Resize and compress for web
-                height, width = frame.shape[:2]
-                if width > 640:
-                    new_width = 640
-                    new_height = int(height * (new_width / width))
-                    frame = cv2.resize(frame, (new_width, new_height))
-                
-                # Add minimal overlay
-                cv2.putText(frame, f"LIVE {datetime.now().strftime('%H:%M:%S')}", 
-                           (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 1)
-                
-                # Fast JPEG encoding
-                encode_params = [cv2.IMWRITE_JPEG_QUALITY, 70]
-                _, buffer = cv2.imencode('.jpg', frame, encode_params)
-                frame_base64 = base64.b64encode(buffer).decode('utf-8')
-                
-                return jsonify({
-                    'success': True,
-                    'frame': f'data:image/jpeg;base64,{frame_base64}',
-                    'timestamp': datetime.now().isoformat()
-                })
+        video_processor.live_demand.touch_viewer()
+        options, profile = preview_options('live', 640, 70)
+        encoded = live_frame_cache.get(
+            video_processor.live_slot,
+            overlay=draw_fast_live_overlay,
+            **options
+        )
+        if encoded is None:
+            return jsonify({'error': 'No frame available'}), 404
         
-        return jsonify({'error': 'No frame available'}), 404
+        return encoded_frame_response(live_frame_cache, encoded, profile)
             
     except Exception as e:
         return jsonify({'error': f'Failed to get live frame: {str(e)}'}), 500
 
+def stream_profile(max_fps, max_width, quality):
+    """Adaptive profile for a new stream viewer, or these fixed settings for ?profile=fixed"""
+    if request.args.get('profile') == 'fixed':
+        return FixedProfile(encode_budget, max_width, quality, max_fps)
+    return AdaptiveProfile(encode_budget, max_fps=max_fps)
+
+@app.route('/api/surveillance/stream/<int:camera_id>', methods=['GET'])
+def stream_surveillance_camera(camera_id):
+    """MJPEG (multipart/x-mixed-replace) stream of a surveillance camera"""
+    if camera_id not in camera_registry:
+        return jsonify({'error': 'Invalid camera ID'}), 400
+    
+    camera = camera_registry[camera_id]
+    if not camera.active:
+        return jsonify({'error': 'Camera not active'}), 404
+    
+    max_fps = parse_stream_fps(request.args.get('fps'))
+    frames = mjpeg_generator(
+        stream_registry,
+        f'camera_{camera_id}',
+        lambda: camera.frame_slot,
+        camera.frame_cache,
+        lambda: camera.active,
+        max_fps=max_fps,
+        on_poll=camera.demand.touch_viewer,
+        adaptive=stream_profile(max_fps, **camera.preview_profile)
+    )
+    return Response(stream_with_context(frames), mimetype=MJPEG_MIMETYPE,
+                    headers={'Cache-Control': 'no-cache'})
+
+@app.route('/api/live/stream', methods=['GET'])
+def stream_live_feed():
+    """MJPEG (multipart/x-mixed-replace) stream of the live camera"""
+    if not app_state['live_tracking_active']:
+        return jsonify({'error': 'Live monitoring not active'}), 400
+    
+    max_fps = parse_stream_fps(request.args.get('fps'))
+    frames = mjpeg_generator(
+        stream_registry,
+        'live',
+        lambda: video_processor.live_slot,
+        live_frame_cache,
+        lambda: app_state['live_tracking_active'],
+        max_fps=max_fps,
+        on_poll=video_processor.live_demand.touch_viewer,
+        adaptive=stream_profile(max_fps, 640, 70),
+        overlay=draw_fast_live_overlay
+    )
+    return Response(stream_with_context(frames), mimetype=MJPEG_MIMETYPE,
+                    headers={'Cache-Control': 'no-cache'})
+
+def surveillance_mosaic():
+    """MosaicComposer for ?cameras=1,2,3&tile_width=320 (all cameras by default)"""
+    camera_ids = parse_camera_ids(request.args.get('cameras'), camera_registry)
+    try:
+        tile_width = int(request.args.get('tile_width', 320))
+    except ValueError:
+        tile_width = 320
+    tile_width = max(160, min(tile_width, 640))
+    
+    def sources():
+        # A camera removed while the mosaic is open shows as an empty tile
+        cameras = [camera_registry.get(cam_id) for cam_id in camera_ids]
+        return [
+            (f"Camera {cam_id}", camera.frame_slot if camera is not None and camera.active else None)
+            for cam_id, camera in zip(camera_ids, cameras)
+        ]
+    
+    mosaic = mosaic_registry.get(camera_ids, sources, tile_width, tile_width * 9 // 16)
+    return mosaic, camera_ids
+
+def touch_mosaic_viewers(camera_ids):
+    for cam_id in camera_ids:
+        camera = camera_registry.get(cam_id)
+        if camera is not None:
+            camera.demand.touch_viewer()
+
+@app.route('/api/surveillance/mosaic', methods=['GET'])
+def get_surveillance_mosaic():
+    """Latest frames of several cameras tiled into one image"""
+    try:
+        mosaic, camera_ids = surveillance_mosaic()
+        if not camera_ids:
+            return jsonify({'error': 'No valid camera IDs'}), 400
+        
+        touch_mosaic_viewers(camera_ids)
+        encoded = mosaic.frame_cache.get(mosaic, **fixed_profile(encode_budget, None, 75))
+        if encoded is None:
+            return jsonify({'error': 'No frame available'}), 404
+        
+        return encoded_frame_response(mosaic.frame_cache, encoded)
+        
+    except Exception as e:
+        print(f"Error getting surveillance mosaic: {e}")
+        return jsonify({'error': f'Failed to get mosaic: {str(e)}'}), 500
+
+@app.route('/api/surveillance/mosaic/stream', methods=['GET'])
+def stream_surveillance_mosaic():
+    """MJPEG stream of the multi-camera mosaic"""
+    mosaic, camera_ids = surveillance_mosaic()
+    if not camera_ids:
+        return jsonify({'error': 'No valid camera IDs'}), 400
+    
+    max_fps = parse_stream_fps(request.args.get('fps'))
+    frames = mjpeg_generator(
+        stream_registry,
+        mosaic.name,
+        lambda: mosaic,
+        mosaic.frame_cache,
+        lambda: any(camera is not None and camera.active
+                    for camera in map(camera_registry.get, camera_ids)),
+        max_fps=max_fps,
+        on_poll=lambda: touch_mosaic_viewers(camera_ids),
+        # Looked up per frame, so a long-lived wall follows the encode budget
+        adaptive=FixedProfile(encode_budget, None, 75, max_fps)
+    )
+    return Response(stream_with_context(frames), mimetype=MJPEG_MIMETYPE,
+                    headers={'Cache-Control': 'no-cache'})
+
+def push_frame_source(camera_id):
+    """Frame slot, cache, demand and encode profile for a push-channel subscription"""
+    if camera_id == LIVE_FEED_ID:
+        if not app_state['live_tracking_active']:
+            return None
+        return (video_processor.live_slot, live_frame_cache, video_processor.live_demand,
+                {'max_width': 640, 'quality': 70, 'overlay': draw_fast_live_overlay})
+    
+    camera = camera_registry.get(camera_id)
+    if camera is None or not camera.active:
+        return None
+    return (camera.frame_slot, camera.frame_cache, camera.demand, dict(camera.preview_profile))
+
+@sock.route('/api/ws')
+def push_channel(ws):
+    """One WebSocket per client: binary JPEG frames plus JSON events"""
+    push_hub.serve(ws, push_frame_source)
+
+@app.route('/api/push/stats', methods=['GET'])
+def get_push_stats():
+    """Connected push-channel clients with their subscriptions and counters"""
+    return jsonify({
+        'success': True,
+        'push': push_hub.to_dict(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/stream/stats', methods=['GET'])
+def get_stream_stats():
+    """Per-viewer frame rate and bandwidth for MJPEG streams"""
+    return jsonify({
+        'success': True,
+        'streams': stream_registry.to_dict(),
+        'timestamp': datetime.now().isoformat()
+    })
+
 @app.route('/api/surveillance/analyze/<int:camera_id>', methods=['POST'])
 def analyze_surveillance_camera(camera_id):
     """Analyze specific surveillance camera feed"""
     try:
-        if camera_id not in surveillance_state['cameras']:
+        if camera_id not in camera_registry:
             return jsonify({'error': 'Invalid camera ID'}), 400
         
-        camera = surveillance_state['cameras'][camera_id]
+        camera = camera_registry[camera_id]
         
-        if not camera['active'] or len(camera['frame_buffer']) < 3:
+        if not camera.active or len(camera.frame_buffer) < 3:
             return jsonify({'error': 'Camera not active or insufficient frames'}), 400
         
         # Use recent frames for analysis
-        frames_to_analyze = camera['frame_buffer'][-6:] if len(camera['frame_buffer']) >= 6 else camera['frame_buffer']
+        frames_to_analyze = camera.frame_buffer[-6:] if len(camera.frame_buffer) >= 6 else camera.frame_buffer
         
         # Analyze using video processor
         result = video_processor.analyze_surveillance_frames(frames_to_analyze, len(frames_to_analyze) / 10.0)
+        metrics.record('scans', 1, camera_key(camera_id))
         
         # Create report
         report_content = f"CAMERA {camera_id} ANALYSIS\n"
@@ -438,15 +764,10 @@ def analyze_surveillance_camera(camera_id):
         report_content += result
         
         # Store report
-        report_entry = {
-            'id': len(camera['reports']) + 1,
-            'type': 'Analysis',
-            'content': report_content,
-            'timestamp': datetime.now().isoformat()
-        }
-        camera['reports'].insert(0, report_entry)
-        camera['reports'] = camera['reports'][:10]  # Keep last 10 reports
-        camera['last_analysis'] = result
+        report_entry = report_store.add(camera_key(camera_id), 'Analysis', report_content)
+        push_hub.publish('report', {'source': 'surveillance', 'camera_id': camera_id, 'report': report_entry})
+        camera.last_analysis = result
+        analysis_scheduler.entry(f'camera_{camera_id}', 'analysis').record_result(False)
         
         return jsonify({
             'success': True,
@@ -458,67 +779,123 @@ def analyze_surveillance_camera(camera_id):
         print(f"Error analyzing surveillance camera: {e}")
         return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
 
+def check_surveillance_camera(camera_id, report_type='Anomaly Detection', trigger_time=None):
+    """Run one VILA anomaly check on a camera's recent frames and store the report.
+
+    Used by the anomaly endpoint and the background scanner; returns
+    (report_content, anomalies_detected, events). trigger_time is the motion
+    trigger behind a scheduled scan, for the gate's alert latency.
+    """
+    camera = camera_registry[camera_id]
+    
+    # Use recent frames for anomaly detection
+    frames_to_analyze = camera.frame_buffer[-8:] if len(camera.frame_buffer) >= 8 else camera.frame_buffer
+    
+    # Detect anomalies using video processor
+    result = video_processor.detect_surveillance_anomalies(frames_to_analyze, len(frames_to_analyze) / 10.0)
+    metrics.record('scans', 1, camera_key(camera_id))
+    
+    # Structured events; normal scenes and VILA errors yield none
+    events = parse_anomaly_response(result)
+    anomalies_detected = bool(events)
+    anomaly_schedule = analysis_scheduler.entry(f'camera_{camera_id}', 'anomaly')
+    anomaly_schedule.record_result(anomalies_detected)
+    decisions = alert_correlator.observe(camera_key(camera_id), events) if anomalies_detected else []
+    
+    # Create report
+    report_content = f"CAMERA {camera_id} ANOMALY CHECK\n"
+    report_content += "=" * 35 + "\n"
+    report_content += f"Time: {datetime.now().strftime('%H:%M:%S')}\n"
+    report_content += f"Frames analyzed: {len(frames_to_analyze)}\n"
+    report_content += f"Duration: ~{len(frames_to_analyze)/10.0:.1f}s\n"
+    report_content += f"Status: {'ANOMALIES DETECTED' if anomalies_detected else 'NORMAL'}\n"
+    if decisions:
+        report_content += describe_decisions(decisions) + "\n"
+    report_content += "\n"
+    report_content += "Detection Results:\n"
+    report_content += "-" * 25 + "\n"
+    report_content += result
+    
+    # Store report
+    report_entry = report_store.add(camera_key(camera_id), report_type, report_content)
+    push_hub.publish('report', {'source': 'surveillance', 'camera_id': camera_id, 'report': report_entry})
+    
+    # Update global stats if anomalies detected
+    if anomalies_detected:
+        anomaly_schedule.gate.record_alert(trigger_time)
+        alert_correlator.link_report(decisions, report_entry['id'])
+        record_evidence(camera_key(camera_id), decisions, report_entry['id'])
+        record_anomaly_events(camera_key(camera_id), events, report_entry['id'], len(frames_to_analyze) / 10.0)
+        count_anomalies(camera_key(camera_id), new_incident_count(decisions))
+        
+        # Notify for new or escalated incidents, and ongoing ones past their cooldown
+        if any(decision['notify'] for decision in decisions):
+            add_anomaly_notification(f'Anomaly detected on Camera {camera_id}', result, camera_key(camera_id), events)
+    
+    return report_content, anomalies_detected, events
+
+def scan_surveillance_camera(camera_id, trigger_time=None):
+    """Scanner callback: None when the camera cannot be scanned right now"""
+    camera = camera_registry[camera_id]
+    if not camera.active or len(camera.frame_buffer) < 3:
+        return None
+    return check_surveillance_camera(camera_id, 'Automatic Anomaly Scan', trigger_time)[1]
+
+# Unattended round-robin anomaly scanning of every active camera
+surveillance_scanner = SurveillanceScanner(
+    lambda: camera_registry,
+    lambda camera_id: analysis_scheduler.entry(f'camera_{camera_id}', 'anomaly'),
+    scan_surveillance_camera,
+    concurrency=video_processor.vila_usage.max_concurrent
+)
+
+@app.route('/api/surveillance/scanner/status', methods=['GET'])
+def get_scanner_status():
+    """Scan throughput, queue latency and per-camera staleness"""
+    return jsonify({
+        'success': True,
+        'scanner': surveillance_scanner.to_dict(),
+        'vila': video_processor.vila_usage.to_dict(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/surveillance/scanner/config', methods=['POST'])
+def configure_scanner():
+    """Enable/disable scanning and set camera priorities: {"enabled": true, "priorities": {"1": 2.0}}"""
+    try:
+        data = request.get_json() or {}
+        if 'enabled' in data:
+            surveillance_scanner.enabled = bool(data['enabled'])
+        for camera_id, priority in (data.get('priorities') or {}).items():
+            camera = camera_registry.get(int(camera_id))
+            if camera is None:
+                return jsonify({'error': f'Invalid camera ID: {camera_id}'}), 400
+            camera.priority = max(0.1, float(priority))
+        return jsonify({'success': True, 'scanner': surveillance_scanner.to_dict()})
+        
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({'error': f'Invalid scanner settings: {str(e)}'}), 400
+
 @app.route('/api/surveillance/anomaly/<int:camera_id>', methods=['POST'])
 def detect_surveillance_anomalies(camera_id):
     """Detect anomalies in specific surveillance camera feed"""
     try:
-        if camera_id not in surveillance_state['cameras']:
+        if camera_id not in camera_registry:
             return jsonify({'error': 'Invalid camera ID'}), 400
         
-        camera = surveillance_state['cameras'][camera_id]
+        camera = camera_registry[camera_id]
         
-        if not camera['active'] or len(camera['frame_buffer']) < 3:
+        if not camera.active or len(camera.frame_buffer) < 3:
             return jsonify({'error': 'Camera not active or insufficient frames'}), 400
         
-        # Use recent frames for anomaly detection
-        frames_to_analyze = camera['frame_buffer'][-8:] if len(camera['frame_buffer']) >= 8 else camera['frame_buffer']
-        
-        # Detect anomalies using video processor
-        result = video_processor.detect_surveillance_anomalies(frames_to_analyze, len(frames_to_analyze) / 10.0)
-        
-        # Check if anomalies were detected
-        anomalies_detected = not result.lower().startswith('no significant anomalies')
-        anomaly_count = 1 if anomalies_detected else 0
-        
-        # Create report
-        report_content = f"CAMERA {camera_id} ANOMALY CHECK\n"
-        report_content += "=" * 35 + "\n"
-        report_content += f"Time: {datetime.now().strftime('%H:%M:%S')}\n"
-        report_content += f"Frames analyzed: {len(frames_to_analyze)}\n"
-        report_content += f"Duration: ~{len(frames_to_analyze)/10.0:.1f}s\n"
-        report_content += f"Status: {'ANOMALIES DETECTED' if anomalies_detected else 'NORMAL'}\n\n"
-        report_content += "Detection Results:\n"
-        report_content += "-" * 25 + "\n"
-        report_content += result
-        
-        # Store report
-        report_entry = {
-            'id': len(camera['reports']) + 1,
-            'type': 'Anomaly Detection',
-            'content': report_content,
-            'timestamp': datetime.now().isoformat()
-        }
-        camera['reports'].insert(0, report_entry)
-        camera['reports'] = camera['reports'][:10]  # Keep last 10 reports
-        
-        # Update global stats if anomalies detected
-        if anomalies_detected:
-            app_state['system_stats']['accidents'] += anomaly_count
-            
-            # Add notification
-            app_state['anomaly_notifications'].append({
-                'id': len(app_state['anomaly_notifications']) + 1,
-                'message': f'Anomaly detected on Camera {camera_id}',
-                'details': result[:100] + '...' if len(result) > 100 else result,
-                'timestamp': datetime.now().isoformat(),
-                'read': False
-            })
+        report_content, anomalies_detected, events = check_surveillance_camera(camera_id)
         
         return jsonify({
             'success': True,
             'report': report_content,
             'anomalies_detected': anomalies_detected,
-            'anomaly_count': anomaly_count,
+            'anomaly_count': len(events),
+            'events': events,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -528,19 +905,20 @@ def detect_surveillance_anomalies(camera_id):
 
 @app.route('/api/surveillance/reports/<int:camera_id>', methods=['GET'])
 def get_surveillance_reports(camera_id):
-    """Get reports for specific surveillance camera"""
+    """Get the latest reports of a surveillance camera, or its history with ?since=&until=&type=&limit="""
     try:
-        if camera_id not in surveillance_state['cameras']:
+        if camera_id not in camera_registry:
             return jsonify({'error': 'Invalid camera ID'}), 400
         
-        camera = surveillance_state['cameras'][camera_id]
-        
         return jsonify({
             'success': True,
-            'reports': camera['reports'],
+            'reports': stored_reports(camera_key(camera_id), 10),
             'timestamp': datetime.now().isoformat()
         })
         
+    except ValueError as e:
+        return jsonify({'error': f'Invalid report query: {str(e)}'}), 400
+        
     except Exception as e:
         print(f"Error getting surveillance reports: {e}")
         return jsonify({'error': f'Failed to get reports: {str(e)}'}), 500
@@ -550,18 +928,25 @@ def get_surveillance_status():
     """Get overall surveillance system status"""
     try:
         status = {
-            'total_cameras': surveillance_state['total_cameras'],
-            'active_cameras': surveillance_state['active_count'],
+            'total_cameras': len(camera_registry),
+            'active_cameras': camera_registry.active_count,
+            'capture_mode': capture_settings['mode'],
+            'capture_pool': capture_pool.to_dict(),
             'cameras': {}
         }
         
-        for cam_id, camera in surveillance_state['cameras'].items():
+        for cam_id, camera in camera_registry.items():
             status['cameras'][cam_id] = {
-                'active': camera['active'],
-                'url': camera['url'],
-                'has_frames': len(camera['frame_buffer']) > 0,
-                'connection_attempts': camera['connection_attempts'],
-                'reports_count': len(camera['reports'])
+                'active': camera.active,
+                'url': camera.url,
+                'has_frames': len(camera.frame_buffer) > 0,
+                'connection_attempts': camera.connection_attempts,
+                'reports_count': min(report_store.hot_count(camera_key(cam_id)), 10),
+                'has_viewers': camera.demand.has_viewers(),
+                'capture_mode': camera.capture_mode,
+                'connection': camera.connection.to_dict() if camera.connection else None,
+                'capture': camera.capture_stats.to_dict(),
+                'frame_slot': camera.frame_slot.to_dict()
             }
         
         return jsonify({
@@ -574,6 +959,192 @@ def get_surveillance_status():
         print(f"Error getting surveillance status: {e}")
         return jsonify({'error': f'Failed to get status: {str(e)}'}), 500
 
+@app.route('/api/surveillance/cameras', methods=['GET'])
+def list_surveillance_cameras():
+    """Configured surveillance cameras"""
+    return jsonify({
+        'success': True,
+        'registry': camera_registry.to_dict(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/surveillance/cameras', methods=['POST'])
+def add_surveillance_camera():
+    """Add a camera: {"camera_id": 4, "url": "rtsp://...", "name": "Dock", "priority": 2,
+    "analysis_profile": {"anomaly": {"base_interval": 20}}, "preview_profile": {"max_width": 480}}"""
+    try:
+        data = request.get_json() or {}
+        camera_id = data.get('camera_id')
+        camera = camera_registry.add(
+            int(camera_id) if camera_id is not None else None,
+            (data.get('url') or '').strip(),
+            name=data.get('name'),
+            priority=data.get('priority'),
+            analysis_profile=data.get('analysis_profile'),
+            preview_profile=data.get('preview_profile')
+        )
+        schedule_camera_analysis(camera)
+        record_camera_evidence(camera)
+        push_hub.publish('status', {'camera_id': camera.id, 'added': True, 'total_cameras': len(camera_registry)})
+        
+        return jsonify({'success': True, 'camera': camera.config_dict()})
+        
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({'error': f'Invalid camera settings: {str(e)}'}), 400
+
+@app.route('/api/surveillance/cameras/<int:camera_id>', methods=['PATCH'])
+def update_surveillance_camera(camera_id):
+    """Change a camera's URL, name, priority or profiles; the URL only while it is stopped"""
+    try:
+        camera = camera_registry.get(camera_id)
+        if camera is None:
+            return jsonify({'error': 'Invalid camera ID'}), 404
+        
+        data = request.get_json() or {}
+        if 'url' in data:
+            url = (data.get('url') or '').strip()
+            if camera.active and url != camera.url:
+                return jsonify({'error': f'Camera {camera_id} is active; stop it before changing its URL'}), 400
+            camera_registry.set_url(camera_id, url)
+        camera.configure(
+            name=data.get('name'),
+            priority=data.get('priority'),
+            analysis_profile=data.get('analysis_profile'),
+            preview_profile=data.get('preview_profile')
+        )
+        if data.get('analysis_profile'):
+            for kind, bounds in camera.analysis_profile.items():
+                entry = analysis_scheduler.entry(f'camera_{camera_id}', kind)
+                if entry is not None:
+                    entry.configure(**bounds)
+        
+        return jsonify({'success': True, 'camera': camera.config_dict()})
+        
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({'error': f'Invalid camera settings: {str(e)}'}), 400
+
+@app.route('/api/surveillance/cameras/<int:camera_id>', methods=['DELETE'])
+def remove_surveillance_camera(camera_id):
+    """Remove a stopped camera"""
+    try:
+        if camera_registry.remove(camera_id) is None:
+            return jsonify({'error': 'Invalid camera ID'}), 404
+        analysis_scheduler.remove(f'camera_{camera_id}')
+        surveillance_scanner.forget(camera_id)
+        report_store.forget(camera_key(camera_id))
+        alert_correlator.forget(camera_key(camera_id))
+        evidence_recorder.remove_source(camera_key(camera_id))
+        continuous_recorder.remove_source(camera_key(camera_id))
+        mosaic_registry.forget(camera_id)
+        push_hub.publish('status', {'camera_id': camera_id, 'removed': True, 'total_cameras': len(camera_registry)})
+        
+        return jsonify({'success': True, 'message': f'Camera {camera_id} removed'})
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/frame-cache/stats', methods=['GET'])
+def get_frame_cache_stats():
+    """Encodes per second vs. requests per second for every frame cache"""
+    cameras = {
+        cam_id: camera.frame_cache.to_dict()
+        for cam_id, camera in camera_registry.items()
+    }
+    return jsonify({
+        'success': True,
+        'live': live_frame_cache.to_dict(),
+        'cameras': cameras,
+        'mosaics': mosaic_registry.to_dict(),
+        'encode_budget': encode_budget.to_dict(),
+        'polling_profiles': polling_profiles.to_dict(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/motion/stats', methods=['GET'])
+def get_motion_stats():
+    """Scene activity per camera and VILA calls made/skipped by the live motion gates"""
+    cameras = {
+        cam_id: camera.motion.to_dict()
+        for cam_id, camera in camera_registry.items()
+    }
+    return jsonify({
+        'success': True,
+        'live': {
+            'motion': video_processor.live_motion.to_dict(),
+            'gates': {entry.kind: entry.gate.to_dict() for entry in analysis_scheduler.entries('live')}
+        },
+        'cameras': cameras,
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/motion/config', methods=['POST'])
+def configure_motion_detection():
+    """Set motion thresholds for one camera (camera_id 0 is the live feed)"""
+    try:
+        data = request.get_json() or {}
+        camera_id = int(data.get('camera_id', LIVE_FEED_ID))
+        
+        if camera_id == LIVE_FEED_ID:
+            detector = video_processor.live_motion
+        elif camera_id in camera_registry:
+            detector = camera_registry[camera_id].motion
+        else:
+            return jsonify({'error': 'Invalid camera ID'}), 400
+        
+        detector.configure(
+            threshold=data.get('threshold'),
+            pixel_delta=data.get('pixel_delta'),
+            spike_factor=data.get('spike_factor'),
+            hold_seconds=data.get('hold_seconds')
+        )
+        return jsonify({'success': True, 'camera_id': camera_id, 'motion': detector.to_dict()})
+        
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid motion settings: {str(e)}'}), 400
+
+@app.route('/api/scheduler/status', methods=['GET'])
+def get_scheduler_status():
+    """Effective analysis interval per camera and the factors behind it"""
+    return jsonify({
+        'success': True,
+        'scheduler': analysis_scheduler.to_dict(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/scheduler/config', methods=['POST'])
+def configure_scheduler():
+    """Set interval bounds for one camera ('live' or a camera id) and/or busy/quiet hours"""
+    try:
+        data = request.get_json() or {}
+        
+        schedule = data.get('schedule')
+        if schedule:
+            analysis_scheduler.schedule.configure(
+                busy_start=schedule.get('busy_start'),
+                busy_end=schedule.get('busy_end'),
+                busy_multiplier=schedule.get('busy_multiplier'),
+                quiet_multiplier=schedule.get('quiet_multiplier')
+            )
+        
+        if 'camera_id' in data:
+            camera_id = data['camera_id']
+            key = 'live' if camera_id in ('live', LIVE_FEED_ID) else f'camera_{int(camera_id)}'
+            kinds = [data['kind']] if data.get('kind') else ['analysis', 'anomaly']
+            entries = [analysis_scheduler.entry(key, kind) for kind in kinds]
+            if not all(entries):
+                return jsonify({'error': f'No schedule for {key}'}), 400
+            for entry in entries:
+                entry.configure(
+                    base_interval=data.get('base_interval'),
+                    min_interval=data.get('min_interval'),
+                    max_interval=data.get('max_interval')
+                )
+        
+        return jsonify({'success': True, 'scheduler': analysis_scheduler.to_dict()})
+        
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({'error': f'Invalid scheduler settings: {str(e)}'}), 400
+
 # ===== VIDEO ANALYSIS ENDPOINTS =====
 
 @app.route('/api/video/analyze', methods=['POST'])
@@ -595,6 +1166,7 @@ def analyze_video():
         try:
             # Process video
             result = video_processor.analyze_video(upload_path)
+            metrics.record('scans', 1, 'upload')
             
             # Store context for chat
             video_context = {
@@ -652,6 +1224,12 @@ def detect_anomalies():
         try:
             # Process video for anomalies
             result = video_processor.detect_anomalies(upload_path)
+            metrics.record('scans', 1, 'upload')
+            
+            # Structured events from VILA's answer; normal videos and VILA errors yield none
+            events = parse_anomaly_response(result['anomaly_report'])
+            anomalies_detected = bool(events)
+            decisions = alert_correlator.observe('upload', events) if anomalies_detected else []
             
             # Store context for chat
             video_context = {
@@ -668,16 +1246,13 @@ def detect_anomalies():
             app_state['last_processed_context'] = video_context
             
             # Update incident count if anomalies detected
-            if not result['summary'].lower().startswith('no significant anomalies'):
-                app_state['system_stats']['accidents'] += 1
+            if anomalies_detected:
+                record_anomaly_events('upload', events, 0, result['duration'])
+                count_anomalies('upload', new_incident_count(decisions))
                 
-                # Add to notifications
-                app_state['anomaly_notifications'].append({
-                    'id': len(app_state['anomaly_notifications']) + 1,
-                    'message': 'Anomaly detected in uploaded video',
-                    'details': result['summary'][:100] + '...' if len(result['summary']) > 100 else result['summary'],
-                    'timestamp': datetime.now().isoformat()
-                })
+                # Notify for new or escalated incidents, and ongoing ones past their cooldown
+                if any(decision['notify'] for decision in decisions):
+                    add_anomaly_notification('Anomaly detected in uploaded video', result['summary'], 'upload', events)
             
             # Clean up
             if os.path.exists(upload_path):
@@ -688,7 +1263,8 @@ def detect_anomalies():
                 'report': result['summary'],
                 'video_url': result.get('output_video'),
                 'processing_time': result.get('processing_time', 0),
-                'anomalies_detected': not result['summary'].lower().startswith('no significant anomalies'),
+                'anomalies_detected': anomalies_detected,
+                'events': events,
                 'timestamp': datetime.now().isoformat()
             })
             
@@ -707,30 +1283,44 @@ def detect_anomalies():
 
 @app.route('/api/live/start', methods=['POST'])
 def start_live_monitoring():
-    """Start live camera monitoring - OPTIMIZED"""
+    """Start live camera monitoring - OPTIMIZED.
+
+    {"replay": "lobby.mp4", "speed": 4, "loop": false} plays a recording from
+    the replay directory through the live pipeline instead of a camera.
+    """
     try:
         if app_state['live_tracking_active']:
             return jsonify({'error': 'Live monitoring already active'}), 400
         
+        data = request.get_json(silent=True) or {}
+        replay_path = None
+        if data.get('replay'):
+            try:
+                replay_path = resolve_replay_path(data['replay'])
+                speed = float(data.get('speed', 1.0))
+            except (TypeError, ValueError) as e:
+                return jsonify({'error': str(e)}), 400
+        
         # Initialize camera with optimized settings
-        success, message = video_processor.start_live_tracking()
+        success, message = video_processor.start_live_tracking(
+            replay_path, speed if replay_path else 1.0, bool(data.get('loop', False))
+        )
         
         if success and video_processor.live_cap:
-            # CRITICAL: Optimize camera settings for real-time streaming
-            video_processor.live_cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            video_processor.live_cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            video_processor.live_cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            video_processor.live_cap.set(cv2.CAP_PROP_FPS, 30)
-            
+            # Camera settings (640x480, 30 FPS, 1-frame buffer) are applied by
+            # start_live_tracking before its capture thread starts
             app_state['live_tracking_active'] = True
+            app_state['live_finished'] = False
             app_state['live_cap'] = video_processor.live_cap
             
             # Start background workers
             start_live_workers()
+            push_hub.publish('status', {'live_tracking_active': True})
             
             return jsonify({
                 'success': True,
                 'message': 'Live monitoring started with optimized settings',
+                'source': video_processor.live_source_status(),
                 'timestamp': datetime.now().isoformat()
             })
         else:
@@ -741,33 +1331,42 @@ def start_live_monitoring():
             'error': f'Failed to start live monitoring: {str(e)}'
         }), 500
 
+def shutdown_live_monitoring(finished=False):
+    """Stop the live workers and capture; finished marks a source that ended by itself"""
+    # Stop workers first
+    stop_live_workers()
+    
+    # IMPORTANT: Before stopping, preserve the live video context as last processed
+    if app_state['live_video_context']:
+        # Convert live context to a permanent context
+        last_live_context = {
+            'type': app_state['live_video_context']['type'],
+            'source': 'live_stopped',
+            'summary': app_state['live_video_context']['summary'],
+            'timestamp': app_state['live_video_context']['timestamp'],
+            'stopped_at': datetime.now().isoformat()
+        }
+        app_state['last_processed_context'] = last_live_context
+    
+    # Stop video processor
+    video_processor.stop_live_tracking()
+    
+    # Reset live state but preserve last processed context
+    app_state['live_tracking_active'] = False
+    app_state['live_finished'] = finished
+    app_state['live_cap'] = None
+    app_state['current_live_frame'] = None
+    app_state['live_video_context'] = None  # Clear current live context
+    push_hub.publish('status', {'live_tracking_active': False, 'live_finished': finished})
+
+# A finished replay stops live monitoring instead of leaving the workers on stale frames
+video_processor.on_live_finished = lambda: shutdown_live_monitoring(finished=True)
+
 @app.route('/api/live/stop', methods=['POST'])
 def stop_live_monitoring():
     """Stop live camera monitoring"""
     try:
-        # Stop workers first
-        stop_live_workers()
-        
-        # IMPORTANT: Before stopping, preserve the live video context as last processed
-        if app_state['live_video_context']:
-            # Convert live context to a permanent context
-            last_live_context = {
-                'type': app_state['live_video_context']['type'],
-                'source': 'live_stopped',
-                'summary': app_state['live_video_context']['summary'],
-                'timestamp': app_state['live_video_context']['timestamp'],
-                'stopped_at': datetime.now().isoformat()
-            }
-            app_state['last_processed_context'] = last_live_context
-        
-        # Stop video processor
-        video_processor.stop_live_tracking()
-        
-        # Reset live state but preserve last processed context
-        app_state['live_tracking_active'] = False
-        app_state['live_cap'] = None
-        app_state['current_live_frame'] = None
-        app_state['live_video_context'] = None  # Clear current live context
+        shutdown_live_monitoring()
         
         return jsonify({
             'success': True,
@@ -787,17 +1386,15 @@ def get_live_frame():
         if not app_state['live_tracking_active']:
             return jsonify({'error': 'Live monitoring not active'}), 400
         
-        frame = video_processor.get_current_frame()
-        if frame is not None:
-            # Encode frame as base64 for web display
-            _, buffer = cv2.imencode('.jpg', frame)
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            
-            return jsonify({
-                'success': True,
-                'frame': f'data:image/jpeg;base64,{frame_base64}',
-                'timestamp': datetime.now().isoformat()
-            })
+        video_processor.live_demand.touch_viewer()
+        encoded = live_frame_cache.get(
+            video_processor.live_slot,
+            max_width=None,
+            quality=95,
+            overlay=video_processor.draw_live_overlay
+        )
+        if encoded is not None:
+            return encoded_frame_response(live_frame_cache, encoded)
         else:
             return jsonify({
                 'error': 'No frame available'
@@ -816,15 +1413,11 @@ def analyze_live_feed():
             return jsonify({'error': 'Live monitoring not active'}), 400
         
         result = video_processor.analyze_live_feed()
+        metrics.record('scans', 1, 'live')
         
         # Add to live reports
-        report_entry = {
-            'id': len(app_state['live_reports']) + 1,
-            'type': 'analysis',
-            'content': result,
-            'timestamp': datetime.now().isoformat()
-        }
-        app_state['live_reports'].insert(0, report_entry)
+        report_entry = report_store.add('live', 'analysis', result)
+        push_hub.publish('report', {'source': 'live', 'report': report_entry})
         
         # Update live video context for chat
         live_context = {
@@ -838,9 +1431,6 @@ def analyze_live_feed():
         # IMPORTANT: Also update as last processed context
         app_state['last_processed_context'] = live_context
         
-        # Keep only last 50 reports
-        app_state['live_reports'] = app_state['live_reports'][:50]
-        
         return jsonify({
             'success': True,
             'report': result,
@@ -860,28 +1450,26 @@ def check_live_anomalies():
             return jsonify({'error': 'Live monitoring not active'}), 400
         
         result = video_processor.check_live_anomalies()
+        metrics.record('scans', 1, 'live')
+        
+        # Check if anomalies detected
+        events = parse_anomaly_response(result)
+        anomalies_detected = bool(events)
+        decisions = alert_correlator.observe('live', events) if anomalies_detected else []
         
         # Add to live reports
-        report_entry = {
-            'id': len(app_state['live_reports']) + 1,
-            'type': 'anomaly',
-            'content': result,
-            'timestamp': datetime.now().isoformat()
-        }
-        app_state['live_reports'].insert(0, report_entry)
+        report_entry = report_store.add('live', 'anomaly', result + ('\n\n' + describe_decisions(decisions) if decisions else ''))
+        push_hub.publish('report', {'source': 'live', 'report': report_entry})
         
-        # Check if anomalies detected
-        anomalies_detected = not result.lower().startswith('no significant anomalies')
         if anomalies_detected:
-            app_state['system_stats']['accidents'] += 1
+            alert_correlator.link_report(decisions, report_entry['id'])
+            record_evidence('live', decisions, report_entry['id'])
+            record_anomaly_events('live', events, report_entry['id'], LIVE_ANOMALY_WINDOW)
+            count_anomalies('live', new_incident_count(decisions))
             
             # Add to notifications
-            app_state['anomaly_notifications'].append({
-                'id': len(app_state['anomaly_notifications']) + 1,
-                'message': 'Live anomaly detected',
-                'details': result[:100] + '...' if len(result) > 100 else result,
-                'timestamp': datetime.now().isoformat()
-            })
+            if any(decision['notify'] for decision in decisions):
+                add_anomaly_notification('Live anomaly detected', result, 'live', events)
         
         # Update live video context for chat
         live_context = {
@@ -896,13 +1484,12 @@ def check_live_anomalies():
         # IMPORTANT: Also update as last processed context
         app_state['last_processed_context'] = live_context
         
-        # Keep only last 50 reports
-        app_state['live_reports'] = app_state['live_reports'][:50]
-        
         return jsonify({
             'success': True,
             'report': result,
             'anomalies_detected': anomalies_detected,
+            'events': events,
+            'incidents': [decision['incident'].to_dict() for decision in decisions],
             'timestamp': datetime.now().isoformat()
         })
         
@@ -913,11 +1500,249 @@ def check_live_anomalies():
 
 @app.route('/api/live/reports', methods=['GET'])
 def get_live_reports():
-    """Get live monitoring reports"""
-    return jsonify({
-        'reports': app_state['live_reports'],
-        'timestamp': datetime.now().isoformat()
-    })
+    """Get the latest live monitoring reports, or their history with ?since=&until=&type=&limit="""
+    try:
+        return jsonify({
+            'reports': stored_reports('live', 50),
+            'timestamp': datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid report query: {str(e)}'}), 400
+
+@app.route('/api/reports', methods=['GET'])
+def get_report_history():
+    """Report history across cameras: ?camera=<id>|live&type=&since=&until=&limit="""
+    try:
+        return jsonify({
+            'reports': stored_reports(report_camera_arg(), 100, history=True),
+            'store': report_store.to_dict(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid report query: {str(e)}'}), 400
+
+@app.route('/api/reports/search', methods=['GET'])
+def search_reports():
+    """Full-text search over all reports: ?q=&camera=<id>|live&type=&since=&until=&limit=&order=rank|recent"""
+    try:
+        text = request.args.get('q', '').strip()
+        if not text:
+            return jsonify({'error': 'Search text (q) is required'}), 400
+        if not report_store.search_enabled:
+            return jsonify({'error': 'Report search is not available (SQLite without FTS5)'}), 503
+        order = request.args.get('order', 'rank')
+        if order not in ('rank', 'recent'):
+            return jsonify({'error': 'order must be rank or recent'}), 400
+        
+        started = time.perf_counter()
+        results = report_store.search(
+            text, report_camera_arg(), request.args.get('type') or None,
+            parse_time(request.args.get('since')), parse_time(request.args.get('until')),
+            int(request.args.get('limit', 20)), order
+        )
+        return jsonify({
+            'query': text,
+            'results': results,
+            'took_ms': round((time.perf_counter() - started) * 1000, 1),
+            'timestamp': datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid search: {str(e)}'}), 400
+
+@app.route('/api/anomaly-events', methods=['GET'])
+def get_anomaly_events():
+    """Latest anomaly events: ?camera=<id>|live&category=&min_criticality=&since=&until=&limit="""
+    try:
+        limit = max(1, min(int(request.args.get('limit', 50)), 500))
+        return jsonify({
+            'events': anomaly_events.latest(limit, **anomaly_event_filters()),
+            'index': anomaly_events.to_dict(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid event query: {str(e)}'}), 400
+
+@app.route('/api/anomaly-events/summary', methods=['GET'])
+def get_anomaly_event_summary():
+    """Event counts grouped ?by=category|camera|criticality|confidence|custom, plus a timeline
+    in ?bucket= second buckets; defaults to the last 24 hours"""
+    try:
+        filters = anomaly_event_filters()
+        until = filters.pop('until') or time.time()
+        since = filters.pop('since') or until - 86400
+        bucket = max(60.0, float(request.args.get('bucket', 3600)))
+        if (until - since) / bucket > 1000:
+            return jsonify({'error': 'Too many timeline buckets; use a larger bucket'}), 400
+        return jsonify({
+            'since': since,
+            'until': until,
+            'counts': anomaly_events.counts(request.args.get('by', 'category'), since=since, until=until, **filters),
+            'timeline': anomaly_events.timeline(since, until, bucket, **filters),
+            'categories': CATEGORY_NAMES,
+            'timestamp': datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid event query: {str(e)}'}), 400
+
+def anomaly_event_filters():
+    """Event index filters from the request; raises ValueError on bad values"""
+    min_criticality = request.args.get('min_criticality') or None
+    if min_criticality is not None and min_criticality not in CRITICALITY:
+        raise ValueError(f'min_criticality must be one of {", ".join(CRITICALITY)}')
+    return {
+        'camera': report_camera_arg(),
+        'category': request.args.get('category') or None,
+        'since': parse_time(request.args.get('since')),
+        'until': parse_time(request.args.get('until')),
+        'min_criticality': min_criticality
+    }
+
+@app.route('/api/evidence', methods=['GET'])
+def list_evidence_clips():
+    """Evidence clips, newest first: ?camera=<id>|live&report_id=&limit="""
+    try:
+        limit = max(1, min(int(request.args.get('limit', 50)), 500))
+        report_id = request.args.get('report_id', type=int)
+        return jsonify({
+            'clips': evidence_recorder.clips(report_camera_arg(), report_id, limit),
+            'recorder': evidence_recorder.to_dict(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid evidence query: {str(e)}'}), 400
+
+@app.route('/api/evidence/<int:clip_id>/video', methods=['GET'])
+def get_evidence_video(clip_id):
+    """The clip as an MJPEG AVI once it has been written"""
+    clip = evidence_recorder.clip(clip_id)
+    if clip is None:
+        return jsonify({'error': 'Clip not found'}), 404
+    if clip['status'] != 'ready' or not os.path.exists(clip['path']):
+        return jsonify({'error': f"Clip is not available ({clip['status']})", 'clip': clip}), 409
+    return send_file(os.path.abspath(clip['path']), mimetype='video/x-msvideo', conditional=True)
+
+@app.route('/api/surveillance/evidence/<int:camera_id>', methods=['POST'])
+def capture_surveillance_evidence(camera_id):
+    """Save a clip around now for a running camera, without an anomaly"""
+    if camera_id not in camera_registry:
+        return jsonify({'error': 'Invalid camera ID'}), 404
+    clip_id = evidence_recorder.trigger(camera_key(camera_id))
+    if clip_id is None:
+        return jsonify({'error': 'Camera is not running or has no frames yet'}), 400
+    return jsonify({'success': True, 'clip_id': clip_id, 'ready_in_seconds': evidence_recorder.post_seconds})
+
+@app.route('/api/recordings', methods=['GET'])
+def list_recordings():
+    """Recorded segments, newest first: ?camera=<id>&since=&until=&limit="""
+    try:
+        limit = max(1, min(int(request.args.get('limit', 200)), 2000))
+        return jsonify({
+            'segments': continuous_recorder.segments(report_camera_arg(), parse_time(request.args.get('since')),
+                                                     parse_time(request.args.get('until')), limit),
+            'recorder': continuous_recorder.to_dict(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid recordings query: {str(e)}'}), 400
+
+@app.route('/api/recordings/config', methods=['POST'])
+def configure_recordings():
+    """Set recording retention: {"retention_days": 7, "quota_mb": 20480}"""
+    try:
+        data = request.get_json() or {}
+        continuous_recorder.configure(data.get('retention_days'), data.get('quota_mb'))
+        return jsonify({'success': True, 'recorder': continuous_recorder.to_dict()})
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid recording settings: {str(e)}'}), 400
+
+@app.route('/api/surveillance/recording/<int:camera_id>', methods=['POST'])
+def set_surveillance_recording(camera_id):
+    """Turn continuous recording of a camera on or off: {"enabled": true}"""
+    if camera_id not in camera_registry:
+        return jsonify({'error': 'Invalid camera ID'}), 404
+    enabled = bool((request.get_json() or {}).get('enabled', True))
+    continuous_recorder.set_enabled(camera_key(camera_id), enabled)
+    return jsonify({'success': True, 'camera_id': camera_id, 'recording': enabled})
+
+@app.route('/api/recordings/<int:camera_id>/frame', methods=['GET'])
+def get_recorded_frame(camera_id):
+    """The recorded frame at ?at= (epoch seconds or ISO time) as a JPEG"""
+    try:
+        at = parse_time(request.args.get('at'))
+        if at is None:
+            return jsonify({'error': 'at is required'}), 400
+        found = continuous_recorder.frame_at(camera_key(camera_id), at)
+        if found is None:
+            return jsonify({'error': 'Nothing was recorded at that time'}), 404
+        jpeg, ts = found
+        response = app.response_class(jpeg, mimetype='image/jpeg')
+        response.headers['X-Frame-Time'] = datetime.fromtimestamp(ts).isoformat()
+        # Recorded footage never changes
+        response.headers['Cache-Control'] = 'private, max-age=86400'
+        return response
+    except ValueError as e:
+        return jsonify({'error': f'Invalid time: {str(e)}'}), 400
+
+@app.route('/api/recordings/<int:camera_id>/video', methods=['GET'])
+def get_recorded_video(camera_id):
+    """Recorded footage from ?since= to ?until= as one MJPEG AVI"""
+    try:
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until')) or time.time()
+        if since is None:
+            return jsonify({'error': 'since is required'}), 400
+        exported = continuous_recorder.export(camera_key(camera_id), since, until)
+        if exported is None:
+            return jsonify({'error': 'Nothing was recorded in that range'}), 404
+        size, chunks = exported
+        response = Response(stream_with_context(chunks), mimetype='video/x-msvideo')
+        response.headers['Content-Length'] = str(size)
+        return response
+    except ValueError as e:
+        return jsonify({'error': f'Invalid recording range: {str(e)}'}), 400
+
+@app.route('/api/incidents', methods=['GET'])
+def get_incidents():
+    """Correlated anomaly incidents, newest first: ?camera=<id>|live&state=open|closed|all&limit="""
+    try:
+        limit = max(1, min(int(request.args.get('limit', 100)), 500))
+        return jsonify({
+            'incidents': alert_correlator.incidents(report_camera_arg(), request.args.get('state', 'open'), limit),
+            'correlator': alert_correlator.to_dict(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid incident query: {str(e)}'}), 400
+
+@app.route('/api/incidents/config', methods=['POST'])
+def configure_incidents():
+    """Set {"window": seconds, "cooldowns": {"high": 120, "medium": 600, "low": 1800}, "similarity": 0.4}"""
+    try:
+        data = request.get_json() or {}
+        alert_correlator.configure(data.get('window'), data.get('cooldowns'), data.get('similarity'))
+        return jsonify({'success': True, 'correlator': alert_correlator.to_dict()})
+        
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({'error': f'Invalid incident settings: {str(e)}'}), 400
+
+def report_camera_arg():
+    """Store key for the ?camera= argument (a camera id or 'live'); None when absent"""
+    camera = request.args.get('camera')
+    if not camera:
+        return None
+    return camera if camera == 'live' else camera_key(int(camera))
+
+def stored_reports(camera, default_limit, history=False):
+    """Latest reports from memory, or a database query when the request filters by type or time.
+
+    since/until are epoch seconds or ISO timestamps; raises ValueError on bad values.
+    """
+    args = request.args
+    limit = int(args.get('limit', default_limit))
+    if not history and not any(args.get(key) for key in ('since', 'until', 'type')):
+        return report_store.recent(camera, limit)
+    return report_store.query(camera, args.get('type') or None,
+                              parse_time(args.get('since')), parse_time(args.get('until')), limit)
 
 # ===== CHAT ENDPOINTS =====
 
@@ -1027,10 +1852,9 @@ def clear_chat_history():
 
 # ===== CONTEXT STATUS ENDPOINT =====
 
-@app.route('/api/chat/context', methods=['GET'])
-def get_chat_context_status():
-    """Get current chat context status for frontend"""
-    return jsonify({
+def chat_context_status():
+    """Which video context chat questions are answered from"""
+    return {
         'has_live_active': app_state['live_tracking_active'],
         'has_live_context': app_state['live_video_context'] is not None,
         'has_uploaded_context': app_state['video_context'] is not None,
@@ -1040,38 +1864,127 @@ def get_chat_context_status():
             app_state['last_processed_context'].get('source') if app_state['last_processed_context'] else
             'uploaded' if app_state['video_context'] else
             None
-        ),
-        'timestamp': datetime.now().isoformat()
-    })
+        )
+    }
+
+@app.route('/api/chat/context', methods=['GET'])
+def get_chat_context_status():
+    """Get current chat context status for frontend"""
+    return jsonify({**chat_context_status(), 'timestamp': datetime.now().isoformat()})
+
+# ===== DASHBOARD SNAPSHOT =====
+
+def surveillance_overview():
+    """Per-camera state the dashboard shows; capture counters stay in /api/surveillance/status"""
+    return {
+        'total_cameras': len(camera_registry),
+        'active_cameras': camera_registry.active_count,
+        'cameras': {
+            str(camera.id): {
+                'name': camera.name,
+                'active': camera.active,
+                'connection': camera.connection.state if camera.connection else None,
+                'capture_mode': camera.capture_mode
+            }
+            for camera in camera_registry.values()
+        }
+    }
+
+def incidents_chart():
+    """Anomalies per day over the last week"""
+    buckets = metrics.series('anomalies', resolution='day', since=time.time() - 6 * 86400)
+    return [{'time': bucket['time'], 'anomalies': bucket['sum']} for bucket in buckets]
+
+dashboard_snapshot = DashboardSnapshot({
+    'status': system_status,
+    'notifications': lambda: {'count': notification_store.total, 'unread': notification_store.unread},
+    'activity': recent_activity,
+    'surveillance': surveillance_overview,
+    'context': chat_context_status,
+    'chart': incidents_chart
+}, max_age={
+    # Rolled-up metrics, relative times and state that changes without an event
+    'status': 10, 'activity': 60, 'surveillance': 30, 'context': 15, 'chart': 300
+})
+
+SNAPSHOT_SECTIONS = {
+    'notification': ('notifications', 'activity', 'status', 'chart'),
+    'status': ('status', 'surveillance', 'context'),
+    'report': ('context',)
+}
+
+def invalidate_snapshot(topic, data):
+    sections = SNAPSHOT_SECTIONS.get(topic)
+    if sections:
+        dashboard_snapshot.invalidate(*sections)
+
+push_hub.listeners.append(invalidate_snapshot)
+
+@app.route('/api/dashboard/snapshot', methods=['GET'])
+def get_dashboard_snapshot():
+    """Status, notifications, activity, cameras, chat context and the incidents chart in one
+    response. Carries an ETag; answers 304 when the client's copy is current"""
+    etag, body = dashboard_snapshot.get()
+    if request.if_none_match.contains(etag):
+        dashboard_snapshot.record_not_modified()
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 # ===== NOTIFICATION ENDPOINTS =====
 
 @app.route('/api/notifications', methods=['GET'])
 def get_notifications():
-    """Get anomaly notifications"""
-    return jsonify({
-        'notifications': app_state['anomaly_notifications'],
-        'count': len(app_state['anomaly_notifications']),
-        'timestamp': datetime.now().isoformat()
-    })
+    """Get anomaly notifications, newest first.
+
+    Query parameters: limit, before (the cursor of the previous page),
+    unread=1 for unread only, and source ('live', 'upload' or camera_<id>).
+    """
+    try:
+        before = request.args.get('before', type=int)
+        limit = request.args.get('limit', default=50, type=int)
+        unread_only = request.args.get('unread', '').lower() in ('1', 'true', 'yes')
+        page = notification_store.page(before, limit, unread_only, request.args.get('source') or None)
+        return jsonify({
+            **page,
+            'count': notification_store.total,
+            'unread': notification_store.unread,
+            'timestamp': datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
 @app.route('/api/notifications/clear', methods=['POST'])
 def clear_notifications():
     """Clear all notifications"""
-    app_state['anomaly_notifications'] = []
+    notification_store.clear()
+    dashboard_snapshot.invalidate('notifications', 'activity')
     return jsonify({
         'success': True,
         'message': 'Notifications cleared',
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/notifications/read', methods=['POST'])
+def mark_all_notifications_read():
+    """Mark every notification as read"""
+    marked = notification_store.mark_all_read()
+    dashboard_snapshot.invalidate('notifications', 'activity')
+    return jsonify({
+        'success': True,
+        'marked': marked,
+        'timestamp': datetime.now().isoformat()
+    })
+
 @app.route('/api/notifications/<int:notification_id>/read', methods=['POST'])
 def mark_notification_read(notification_id):
     """Mark specific notification as read"""
-    for notification in app_state['anomaly_notifications']:
-        if notification['id'] == notification_id:
-            notification['read'] = True
-            break
+    if not notification_store.mark_read(notification_id):
+        return jsonify({'error': 'Notification not found'}), 404
+    dashboard_snapshot.invalidate('notifications', 'activity')
     
     return jsonify({
         'success': True,
@@ -1088,29 +2001,31 @@ def start_live_workers():
     app_state['workers_active'] = True
     app_state['worker_threads'] = []
     
+    # Around 20 s / 10 s while the scene is active, adapted by the scheduler;
+    # static scenes get occasional analyses and no anomaly checks, and motion
+    # triggers both immediately
+    analysis_schedule = analysis_scheduler.add('live', 'analysis', video_processor.live_motion,
+                                           base_interval=20, min_interval=10, max_interval=120, static_factor=6)
+    anomaly_schedule = analysis_scheduler.add('live', 'anomaly', video_processor.live_motion,
+                                          base_interval=10, min_interval=5, max_interval=60)
+    
     def live_analysis_worker():
-        """Background worker for periodic analysis - EVERY 20 SECONDS"""
-        last_analysis = time.time()
-        
+        """Background worker for periodic analysis, gated by scene activity"""
         while app_state['workers_active'] and app_state['live_tracking_active']:
             try:
-                current_time = time.time()
-                
-                # Analyze every 20 seconds (not every second!)
-                if current_time - last_analysis >= 20:
+                run, _, _ = analysis_schedule.due()
+                if run:
                     if app_state['live_tracking_active']:  # Double check
                         result = video_processor.analyze_live_feed()
+                        metrics.record('scans', 1, 'live')
+                        analysis_schedule.record_result(False)
                         
                         if result:
-                            report_entry = {
-                                'id': len(app_state['live_reports']) + 1,
-                                'type': 'auto_analysis',
-                                'content': f"AUTOMATIC ANALYSIS [{datetime.now().strftime('%H:%M:%S')}]\n" + 
-                                          "=" * 40 + "\n" + result,
-                                'timestamp': datetime.now().isoformat()
-                            }
-                            app_state['live_reports'].insert(0, report_entry)
-                            app_state['live_reports'] = app_state['live_reports'][:50]
+                            report_entry = report_store.add(
+                                'live', 'auto_analysis',
+                                f"AUTOMATIC ANALYSIS [{datetime.now().strftime('%H:%M:%S')}]\n" + "=" * 40 + "\n" + result
+                            )
+                            push_hub.publish('report', {'source': 'live', 'report': report_entry})
                             
                             # Update live video context
                             live_context = {
@@ -1121,11 +2036,9 @@ def start_live_workers():
                             }
                             app_state['live_video_context'] = live_context
                             app_state['last_processed_context'] = live_context
-                    
-                    last_analysis = current_time
                 
-                # Sleep for 2 seconds between checks
-                time.sleep(2)
+                # Short sleep so motion triggers are picked up quickly
+                time.sleep(0.5)
                 
             except Exception as e:
                 print(f"Error in live analysis worker: {e}")
@@ -1135,38 +2048,38 @@ def start_live_workers():
                     break
     
     def live_anomaly_worker():
-        """Background worker for anomaly detection - EVERY 10 SECONDS"""
-        last_check = time.time()
-        
+        """Background worker for anomaly detection, gated by scene activity"""
         while app_state['workers_active'] and app_state['live_tracking_active']:
             try:
-                current_time = time.time()
-                
-                # Check for anomalies every 10 seconds (not every second!)
-                if current_time - last_check >= 10:
+                run, _, trigger_time = anomaly_schedule.due()
+                if run:
                     if app_state['live_tracking_active']:  # Double check
                         result = video_processor.check_live_anomalies()
+                        metrics.record('scans', 1, 'live')
+                        events = parse_anomaly_response(result)
+                        anomaly_found = bool(events)
+                        anomaly_schedule.record_result(anomaly_found)
                         
-                        if result and not result.lower().startswith('no significant anomalies'):
-                            app_state['system_stats']['accidents'] += 1
+                        if anomaly_found:
+                            decisions = alert_correlator.observe('live', events)
+                            count_anomalies('live', new_incident_count(decisions))
+                            anomaly_schedule.gate.record_alert(trigger_time)
                             
-                            report_entry = {
-                                'id': len(app_state['live_reports']) + 1,
-                                'type': 'auto_anomaly',
-                                'content': f"ANOMALY ALERT [{datetime.now().strftime('%H:%M:%S')}]\n" + 
-                                          "=" * 40 + "\n" + result,
-                                'timestamp': datetime.now().isoformat()
-                            }
-                            app_state['live_reports'].insert(0, report_entry)
+                            if any(decision['notify'] for decision in decisions):
+                                report_entry = report_store.add(
+                                    'live', 'auto_anomaly',
+                                    f"ANOMALY ALERT [{datetime.now().strftime('%H:%M:%S')}]\n" + "=" * 40 + "\n" + result
+                                    + "\n\n" + describe_decisions(decisions)
+                                )
+                                alert_correlator.link_report(decisions, report_entry['id'])
+                                record_evidence('live', decisions, report_entry['id'])
+                                push_hub.publish('report', {'source': 'live', 'report': report_entry})
+                                
+                                # Add notification
+                                add_anomaly_notification('Live anomaly detected', result, 'live', events)
                             
-                            # Add notification
-                            app_state['anomaly_notifications'].append({
-                                'id': len(app_state['anomaly_notifications']) + 1,
-                                'message': 'Live anomaly detected',
-                                'details': result[:100] + '...' if len(result) > 100 else result,
-                                'timestamp': datetime.now().isoformat(),
-                                'read': False
-                            })
+                            # A repeat within its cooldown stores no report; its events point at the incident's last one
+                            record_anomaly_events('live', events, decisions[0]['incident'].last_report_id, LIVE_ANOMALY_WINDOW)
                             
                             # Update live video context
                             live_context = {
@@ -1178,11 +2091,9 @@ def start_live_workers():
                             }
                             app_state['live_video_context'] = live_context
                             app_state['last_processed_context'] = live_context
-                    
-                    last_check = current_time
                 
-                # Sleep for 2 seconds between checks
-                time.sleep(2)
+                # Short sleep so motion triggers are picked up quickly
+                time.sleep(0.5)
                 
             except Exception as e:
                 print(f"Error in live anomaly worker: {e}")
@@ -1215,22 +2126,18 @@ def stop_live_workers():
 def cleanup_surveillance_on_exit():
     """Clean up surveillance cameras on application exit"""
     print("Cleaning up surveillance cameras...")
-    for camera_id, camera in surveillance_state['cameras'].items():
-        if camera['active']:
+    surveillance_scanner.stop()
+    for camera_id, camera in camera_registry.items():
+        if camera.active:
             try:
-                # Stop frame worker
-                camera['frame_thread_active'] = False
-                if camera['frame_thread'] and camera['frame_thread'].is_alive():
-                    camera['frame_thread'].join(timeout=2)
-                
-                # Release camera
-                if camera['cap']:
-                    camera['cap'].release()
-                    camera['cap'] = None
+                # Stop frame capture; the connection manager releases the stream
+                if camera.connection:
+                    camera.connection.stop()
                     
                 print(f"Camera {camera_id} cleaned up")
             except Exception as e:
                 print(f"Error cleaning up camera {camera_id}: {e}")
+    capture_pool.shutdown()
 
 # ===== STATIC FILE SERVING =====
 
@@ -1271,6 +2178,11 @@ def cleanup_on_exit():
     cleanup_surveillance_on_exit()
     if video_processor:
         video_processor.stop_live_tracking()
+    report_store.close()
+    notification_store.close()
+    metrics.close()
+    evidence_recorder.close()
+    continuous_recorder.close()
 
 atexit.register(cleanup_on_exit)
 
@@ -1287,13 +2199,24 @@ if __name__ == '__main__':
     print("- Make sure to serve the frontend files with a web server")
     print("- Surveillance endpoints added: /api/surveillance/*")
     print("- Available surveillance endpoints:")
+    print("  * GET/POST /api/surveillance/cameras, PATCH/DELETE /api/surveillance/cameras/<camera_id> - Camera registry")
     print("  * POST /api/surveillance/start - Start camera")
     print("  * POST /api/surveillance/stop - Stop camera")
     print("  * GET /api/surveillance/frame/<camera_id> - Get live frame")
+    print("  * GET /api/surveillance/stream/<camera_id> - MJPEG stream")
+    print("  * GET /api/surveillance/mosaic[/stream]?cameras=1,2,3 - Multi-camera mosaic")
+    print("  * WS  /api/ws - Push channel for frames and events")
     print("  * POST /api/surveillance/analyze/<camera_id> - Analyze feed")
     print("  * POST /api/surveillance/anomaly/<camera_id> - Detect anomalies")
     print("  * GET /api/surveillance/reports/<camera_id> - Get reports")
+    print("  * GET /api/reports?camera=&type=&since=&until= - Report history")
+    print("  * GET /api/reports/search?q=&camera=&type=&since=&until= - Search reports")
+    print("  * GET /api/anomaly-events[/summary] - Structured anomaly events and aggregates")
     print("  * GET /api/surveillance/status - Get system status")
+    print("  * GET /api/frame-cache/stats - Frame encode cache statistics")
+    print("  * GET /api/motion/stats, POST /api/motion/config - Motion-gated analysis")
+    print("  * GET /api/scheduler/status, POST /api/scheduler/config - Adaptive analysis intervals")
+    print("  * GET /api/surveillance/scanner/status, POST /api/surveillance/scanner/config - Unattended scanning")
     
     # Configure Flask
     app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max file size
@@ -0,0 +1,210 @@
+import cv2
+import time
+import threading
+
+
+class CaptureDemand:
+    """Tracks which consumers currently need decoded frames from a camera"""
+
+    def __init__(self, display_fps=15, analysis_fps=3, idle_display_fps=1, viewer_timeout=3.0):
+        self.display_fps = display_fps
+        self.analysis_fps = analysis_fps
+        self.idle_display_fps = idle_display_fps
+        self.viewer_timeout = viewer_timeout
+        self.last_viewer_time = 0.0
+
+    def touch_viewer(self):
+        """Register a display request so the capture loop keeps decoding for viewers"""
+        self.last_viewer_time = time.monotonic()
+
+    def has_viewers(self, now=None):
+        now = time.monotonic() if now is None else now
+        return now - self.last_viewer_time <= self.viewer_timeout
+
+    def display_interval(self, now=None):
+        fps = self.display_fps if self.has_viewers(now) else self.idle_display_fps
+        return 1.0 / fps if fps > 0 else None
+
+    def analysis_interval(self):
+        return 1.0 / self.analysis_fps if self.analysis_fps > 0 else None
+
+
+class CaptureStats:
+    """Per-camera capture counters: grabbed, decoded and dropped frames plus latency"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.grabbed = 0
+        self.retrieved = 0
+        self.dropped = 0
+        self.failed_grabs = 0
+        self.decode_fps = 0.0
+        self.grab_fps = 0.0
+        self.last_latency_ms = 0.0
+        self.avg_latency_ms = 0.0
+        self._window_start = time.monotonic()
+        self._window_grabbed = 0
+        self._window_retrieved = 0
+
+    def record_grab(self):
+        with self.lock:
+            self.grabbed += 1
+            self._window_grabbed += 1
+            self._roll_window()
+
+    def record_drop(self):
+        with self.lock:
+            self.dropped += 1
+
+    def record_failure(self):
+        with self.lock:
+            self.failed_grabs += 1
+
+    def record_publish(self, latency_seconds):
+        with self.lock:
+            self.retrieved += 1
+            self._window_retrieved += 1
+            self.last_latency_ms = latency_seconds * 1000.0
+            # Exponential moving average keeps the figure stable between polls
+            self.avg_latency_ms = self.last_latency_ms if self.retrieved == 1 else \
+                0.9 * self.avg_latency_ms + 0.1 * self.last_latency_ms
+
+    def _roll_window(self):
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.grab_fps = self._window_grabbed / elapsed
+            self.decode_fps = self._window_retrieved / elapsed
+            self._window_start = now
+            self._window_grabbed = 0
+            self._window_retrieved = 0
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'grabbed': self.grabbed,
+                'decoded': self.retrieved,
+                'dropped': self.dropped,
+                'failed_grabs': self.failed_grabs,
+                'grab_fps': round(self.grab_fps, 1),
+                'decode_fps': round(self.decode_fps, 1),
+                'capture_to_publish_ms': round(self.last_latency_ms, 2),
+                'avg_capture_to_publish_ms': round(self.avg_latency_ms, 2)
+            }
+
+
+class CameraCapture:
+    """Grab/retrieve capture loop that only decodes frames someone actually needs.
+
+    grab() is called for every frame so the stream never falls behind the
+    source; retrieve() (the expensive decode) only runs when a viewer or the
+    analysis sampler is due for a frame. File-like sources that report a
+    position are paced from their own clock instead of a fixed sleep.
+    A clock other than time.monotonic (a replay's schedule) makes the
+    choice of decoded frames independent of scheduling jitter.
+    """
+
+    def __init__(self, cap, demand=None, stats=None, frame_slot=None, clock=None):
+        self.cap = cap
+        self.demand = demand or CaptureDemand()
+        self.stats = stats or CaptureStats()
+        self.frame_slot = frame_slot
+        self.clock = clock or time.monotonic
+        self._next_display = 0.0
+        self._next_analysis = 0.0
+        self._clock_origin = None
+
+    def _pace_to_source_clock(self):
+        """Sleep until the wall clock catches up with the source timestamp"""
+        position_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        if not position_ms or position_ms <= 0:
+            # Live streams block in grab() and report no usable position
+            return
+        now = time.monotonic()
+        if self._clock_origin is None:
+            self._clock_origin = (now, position_ms)
+            return
+        wall_origin, source_origin = self._clock_origin
+        if position_ms < source_origin:
+            # Source looped or was rewound
+            self._clock_origin = (now, position_ms)
+            return
+        delay = wall_origin + (position_ms - source_origin) / 1000.0 - now
+        if delay > 0:
+            time.sleep(delay)
+
+    @staticmethod
+    def _next_due(previous_due, interval, now):
+        """Keep a steady cadence, but resync instead of bursting after a stall"""
+        next_due = previous_due + interval
+        if next_due <= now:
+            next_due = now + interval
+        return next_due
+
+    def run(self, should_continue, on_frame):
+        """Capture until should_continue() is False.
+
+        on_frame(frame, for_display, for_analysis, capture_time) is called for
+        every decoded frame. When a FrameSlot is attached, frames are decoded
+        into its recycled back buffer and published there before on_frame runs;
+        the frame is then read-only and must not be modified by the callback.
+        should_continue() is checked again after every grab() and before
+        publishing, so a session abandoned while blocked never writes to the
+        slot. Returns False if the stream stopped delivering.
+        """
+        consecutive_failures = 0
+
+        while should_continue():
+            if not self.cap or not self.cap.isOpened():
+                return False
+
+            if not self.cap.grab():
+                self.stats.record_failure()
+                consecutive_failures += 1
+                if consecutive_failures >= 50:
+                    return False
+                time.sleep(0.1)
+                continue
+
+            # A grab() that blocked past a stall may return after the supervisor
+            # gave this session up; its replacement now owns the frame slot
+            if not should_continue():
+                break
+
+            consecutive_failures = 0
+            self.stats.record_grab()
+            self._pace_to_source_clock()
+            grabbed_at = time.monotonic()
+            capture_time = self.clock()
+
+            display_interval = self.demand.display_interval(capture_time)
+            analysis_interval = self.demand.analysis_interval()
+            for_display = display_interval is not None and capture_time >= self._next_display
+            for_analysis = analysis_interval is not None and capture_time >= self._next_analysis
+
+            if not for_display and not for_analysis:
+                self.stats.record_drop()
+                continue
+
+            buffer = self.frame_slot.back_buffer() if self.frame_slot else None
+            if buffer is not None:
+                ret, frame = self.cap.retrieve(buffer)
+            else:
+                ret, frame = self.cap.retrieve()
+            if not ret or frame is None:
+                self.stats.record_failure()
+                continue
+
+            if for_display:
+                self._next_display = self._next_due(self._next_display, display_interval, capture_time)
+            if for_analysis:
+                self._next_analysis = self._next_due(self._next_analysis, analysis_interval, capture_time)
+
+            if not should_continue():
+                break
+            if self.frame_slot:
+                self.frame_slot.publish(frame, capture_time)
+            on_frame(frame, for_display, for_analysis, capture_time)
+            self.stats.record_publish(time.monotonic() - grabbed_at)
+
+        return True
@@ -0,0 +1,282 @@
+import time
+import random
+import threading
+from collections import deque
+
+CONNECTING = 'connecting'
+CONNECTED = 'connected'
+RECONNECTING = 'reconnecting'
+STOPPED = 'stopped'
+
+
+class Backoff:
+    """Exponential backoff with jitter: each delay is drawn from [d/2, d] for d = base * 2^n"""
+
+    def __init__(self, base=1.0, maximum=60.0):
+        self.base = base
+        self.maximum = maximum
+        self.failures = 0
+
+    def next_delay(self):
+        delay = min(self.maximum, self.base * (2 ** self.failures))
+        self.failures += 1
+        return random.uniform(delay / 2, delay)
+
+    def reset(self):
+        self.failures = 0
+
+
+class CameraConnection:
+    """Keeps one camera stream connected without operator action.
+
+    A supervisor thread opens the stream off the request thread (giving up
+    after open_timeout), runs the capture loop in its own thread and watches
+    it: if the loop exits or no frame has been grabbed for stall_timeout
+    seconds, the session is abandoned and the stream reopened after a
+    jittered exponential backoff. A blocked grab() on a dead stream is left
+    to finish on its own; its session is already invalid by then.
+    """
+
+    def __init__(self, name, url, open_source, make_capture, on_frame, on_state=None,
+                 open_timeout=10.0, stall_timeout=10.0, backoff_base=1.0, backoff_max=60.0,
+                 stable_seconds=30.0):
+        # open_source(url) -> (cap, error), like connect_to_camera
+        self.name = name
+        self.url = url
+        self.open_source = open_source
+        # make_capture(cap) -> CameraCapture for one session
+        self.make_capture = make_capture
+        self.on_frame = on_frame
+        # on_state(state) is called on every state change
+        self.on_state = on_state
+        self.open_timeout = open_timeout
+        self.stall_timeout = stall_timeout
+        self.stable_seconds = stable_seconds
+        self.backoff = Backoff(backoff_base, backoff_max)
+        self.lock = threading.Lock()
+        self.state = STOPPED
+        self.last_error = None
+        self._session = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self._connected_since = None
+        self._uptime = 0.0
+        self._down_since = None
+        self._next_retry = None
+        self.sessions = 0
+        self.reconnects = 0
+        self.stalls = 0
+        self.open_failures = 0
+        self.recover_times = deque(maxlen=50)
+
+    def start(self):
+        with self.lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._started = time.monotonic()
+            self._thread = threading.Thread(target=self._supervise, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        with self.lock:
+            self._session += 1
+            thread = self._thread
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._set_state(STOPPED)
+
+    def _set_state(self, state, error=None, since=None):
+        """since backdates a loss of connection, e.g. to the last frame before a stall"""
+        now = time.monotonic() if since is None else since
+        with self.lock:
+            if error:
+                self.last_error = error
+            if state == self.state:
+                return
+            if self.state == CONNECTED and self._connected_since is not None:
+                self._uptime += now - self._connected_since
+                self._connected_since = None
+            if state == CONNECTED:
+                self._connected_since = now
+                if self._down_since is not None:
+                    self.reconnects += 1
+                    self.recover_times.append(now - self._down_since)
+                self._down_since = None
+            elif state == RECONNECTING and self._down_since is None:
+                self._down_since = now
+            self.state = state
+        if self.on_state:
+            try:
+                self.on_state(state)
+            except Exception as e:
+                print(f"Error in {self.name} state callback: {e}")
+
+    def _open(self):
+        """Open the stream in a helper thread so a hanging open cannot block the supervisor"""
+        result = {}
+
+        def opener():
+            cap, error = self.open_source(self.url)
+            result['cap'], result['error'] = cap, error
+            # Nobody is waiting any more: do not leak the late connection
+            if result.get('abandoned') and cap is not None:
+                cap.release()
+
+        thread = threading.Thread(target=opener, daemon=True)
+        thread.start()
+        thread.join(self.open_timeout)
+        if thread.is_alive():
+            result['abandoned'] = True
+            if result.get('cap') is not None:
+                result['cap'].release()
+            return None, f'Timed out after {self.open_timeout:.0f}s opening stream'
+        return result.get('cap'), result.get('error')
+
+    def _supervise(self):
+        self._set_state(CONNECTING)
+        while not self._stop.is_set():
+            cap, error = self._open()
+            if self._stop.is_set():
+                if cap is not None:
+                    cap.release()
+                break
+            if cap is None:
+                self.open_failures += 1
+                self._retry_later(error or 'Could not open stream')
+                continue
+
+            with self.lock:
+                self._session += 1
+                session = self._session
+                self.sessions += 1
+            capture = self.make_capture(cap)
+            outcome = {}
+
+            # Bound as defaults: an abandoned session that wakes up late must
+            # only ever touch its own capture
+            def run_session(cap=cap, capture=capture, session=session, outcome=outcome):
+                try:
+                    outcome['streaming'] = capture.run(
+                        lambda: self._session == session and not self._stop.is_set(),
+                        self.on_frame
+                    )
+                except Exception as e:
+                    outcome['error'] = str(e)
+                finally:
+                    cap.release()
+
+            worker = threading.Thread(target=run_session, daemon=True)
+            worker.start()
+            self._set_state(CONNECTED)
+            connected_at = time.monotonic()
+
+            # Watch for a dead capture loop or a stream that stopped delivering
+            last_grabbed = capture.stats.grabbed
+            last_progress = connected_at
+            reason = None
+            lost_at = None
+            while not self._stop.is_set():
+                worker.join(0.5)
+                if not worker.is_alive():
+                    reason = outcome.get('error') or 'Stream ended'
+                    break
+                now = time.monotonic()
+                grabbed = capture.stats.grabbed
+                if grabbed != last_grabbed:
+                    last_grabbed, last_progress = grabbed, now
+                elif now - last_progress >= self.stall_timeout:
+                    self.stalls += 1
+                    reason = f'No frames for {self.stall_timeout:.0f}s'
+                    lost_at = last_progress
+                    break
+
+            with self.lock:
+                self._session += 1
+            if self._stop.is_set():
+                break
+            if time.monotonic() - connected_at >= self.stable_seconds:
+                self.backoff.reset()
+            print(f"{self.name} disconnected ({reason}); reconnecting")
+            self._retry_later(reason, lost_at)
+
+    def _retry_later(self, error, since=None):
+        if self._stop.is_set():
+            return
+        self._set_state(RECONNECTING, error, since)
+        delay = self.backoff.next_delay()
+        self._next_retry = time.monotonic() + delay
+        self._stop.wait(delay)
+        self._next_retry = None
+
+    def to_dict(self):
+        now = time.monotonic()
+        with self.lock:
+            uptime = self._uptime
+            if self._connected_since is not None:
+                uptime += now - self._connected_since
+            elapsed = now - self._started if self._started else 0.0
+            recover = list(self.recover_times)
+            return {
+                'state': self.state,
+                'url': self.url,
+                'uptime_seconds': round(uptime, 1),
+                'uptime_percent': round(uptime / elapsed * 100, 1) if elapsed > 0 else None,
+                'sessions': self.sessions,
+                'reconnects': self.reconnects,
+                'stalls': self.stalls,
+                'open_failures': self.open_failures,
+                'backoff_level': self.backoff.failures,
+                'down_seconds': round(now - self._down_since, 1) if self._down_since else None,
+                'next_retry_in': round(max(0.0, self._next_retry - now), 1) if self._next_retry else None,
+                'last_time_to_recover_s': round(recover[-1], 2) if recover else None,
+                'avg_time_to_recover_s': round(sum(recover) / len(recover), 2) if recover else None,
+                'last_error': self.last_error
+            }
+
+
+FLAKY_SCENARIOS = {
+    'disconnects': 'synthetic://1?fps=15&disconnect_after=6&open_failures=2',
+    'stalls': 'synthetic://2?fps=15&stall_every=5&stall_seconds=6'
+}
+
+
+def run_flaky_test(url, duration=30.0):
+    """Drive a connection against a synthetic stream with injected faults"""
+    from camera_capture import CameraCapture, CaptureDemand, CaptureStats
+    from synthetic_camera import open_capture, allow_synthetic
+
+    allow_synthetic()
+
+    def open_source(url):
+        cap = open_capture(url)
+        if not cap.isOpened():
+            return None, 'Could not open camera stream'
+        return cap, None
+
+    demand = CaptureDemand()
+    states = []
+    connection = CameraConnection(
+        'Flaky camera', url, open_source,
+        make_capture=lambda cap: CameraCapture(cap, demand, CaptureStats()),
+        on_frame=lambda *args: None,
+        on_state=lambda state: states.append((round(time.monotonic() - started, 1), state)),
+        stall_timeout=3.0, backoff_base=0.5, backoff_max=4.0
+    )
+    started = time.monotonic()
+    connection.start()
+    time.sleep(duration)
+    stats = connection.to_dict()
+    connection.stop()
+    return stats, states
+
+
+if __name__ == '__main__':
+    for scenario, scenario_url in FLAKY_SCENARIOS.items():
+        results, transitions = run_flaky_test(scenario_url)
+        print(f"Flaky camera reconnect test: {scenario}")
+        print("  " + ", ".join(f"{at}s {state}" for at, state in transitions))
+        for key, value in results.items():
+            print(f"  {key}: {value}")
@@ -0,0 +1,276 @@
+import threading
+from collections.abc import Mapping
+
+from camera_capture import CaptureDemand, CaptureStats
+from frame_slot import FrameSlot
+from frame_cache import JpegFrameCache
+from motion import MotionDetector
+
+MAX_CAMERAS = 256
+ANALYSIS_FRAMES_KEPT = 30
+
+# Default scheduler bounds per call kind: base, min and max interval in seconds
+DEFAULT_ANALYSIS_PROFILE = {
+    'analysis': {'base_interval': 60, 'min_interval': 30, 'max_interval': 600},
+    'anomaly': {'base_interval': 30, 'min_interval': 10, 'max_interval': 300}
+}
+DEFAULT_PREVIEW_PROFILE = {'max_width': 640, 'quality': 75}
+
+
+class CameraState:
+    """Configuration and runtime state of one surveillance camera"""
+
+    __slots__ = (
+        'id', 'name', 'url', 'priority', 'analysis_profile', 'preview_profile',
+        'active', 'connection', 'frame_buffer', 'frame_slot', 'connection_attempts',
+        'last_analysis', 'demand', 'capture_stats',
+        'motion', 'frame_cache', 'capture_mode'
+    )
+
+    def __init__(self, camera_id, url='', name=None, priority=1.0,
+                 analysis_profile=None, preview_profile=None, budget=None):
+        self.id = camera_id
+        self.name = name or f'Camera {camera_id}'
+        self.url = url
+        self.priority = priority
+        self.analysis_profile = {kind: dict(bounds) for kind, bounds in
+                                 (analysis_profile or DEFAULT_ANALYSIS_PROFILE).items()}
+        self.preview_profile = dict(preview_profile or DEFAULT_PREVIEW_PROFILE)
+        self.active = False
+        self.connection = None
+        self.frame_buffer = []
+        self.frame_slot = FrameSlot()
+        self.connection_attempts = 0
+        self.last_analysis = None
+        self.demand = CaptureDemand()
+        self.capture_stats = CaptureStats()
+        self.motion = MotionDetector()
+        self.frame_cache = JpegFrameCache(f'cam{camera_id}', budget)
+        self.capture_mode = 'thread'
+
+    def configure(self, name=None, priority=None, analysis_profile=None, preview_profile=None):
+        """Update configuration; None leaves a value unchanged. Raises ValueError on bad input"""
+        if analysis_profile is not None:
+            profile = {}
+            for kind, bounds in analysis_profile.items():
+                if kind not in DEFAULT_ANALYSIS_PROFILE:
+                    raise ValueError(f'Unknown analysis kind: {kind}')
+                merged = dict(self.analysis_profile.get(kind, DEFAULT_ANALYSIS_PROFILE[kind]))
+                merged.update({key: float(value) for key, value in bounds.items()
+                               if key in DEFAULT_ANALYSIS_PROFILE[kind]})
+                if not 1 <= merged['min_interval'] <= merged['max_interval']:
+                    raise ValueError(f'Invalid {kind} interval bounds')
+                profile[kind] = merged
+            self.analysis_profile = {**self.analysis_profile, **profile}
+        if preview_profile is not None:
+            merged = dict(self.preview_profile)
+            merged.update({key: int(value) for key, value in preview_profile.items()
+                           if key in DEFAULT_PREVIEW_PROFILE})
+            if not 64 <= merged['max_width'] <= 3840 or not 10 <= merged['quality'] <= 95:
+                raise ValueError('Preview max_width must be 64-3840 and quality 10-95')
+            self.preview_profile = merged
+        if priority is not None:
+            self.priority = max(0.1, float(priority))
+        if name is not None:
+            self.name = str(name)[:100]
+
+    def add_analysis_frame(self, frame):
+        """Keep the last ANALYSIS_FRAMES_KEPT sampled frames without reallocating the list"""
+        self.frame_buffer.append(frame)
+        if len(self.frame_buffer) > ANALYSIS_FRAMES_KEPT:
+            del self.frame_buffer[:-ANALYSIS_FRAMES_KEPT]
+
+    def config_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'url': self.url,
+            'priority': self.priority,
+            'analysis_profile': self.analysis_profile,
+            'preview_profile': self.preview_profile,
+            'capture_mode': self.capture_mode,
+            'active': self.active
+        }
+
+
+class CameraRegistry(Mapping):
+    """Cameras by id, with indexes for active cameras and stream URLs.
+
+    Read access (registry[id], `id in registry`, items()) is a plain dict
+    lookup; add/remove/set_active take a lock and keep the indexes in step,
+    so subsystems can ask for active cameras without scanning all of them.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._cameras = {}
+        self._active = set()
+        self._by_url = {}
+
+    def __getitem__(self, camera_id):
+        return self._cameras[camera_id]
+
+    def __iter__(self):
+        return iter(self._cameras)
+
+    def __len__(self):
+        return len(self._cameras)
+
+    @property
+    def active_count(self):
+        return len(self._active)
+
+    def active(self):
+        """Active cameras, in id order"""
+        cameras = self._cameras
+        return [cameras[camera_id] for camera_id in sorted(self._active) if camera_id in cameras]
+
+    def find_by_url(self, url):
+        return self._by_url.get(url)
+
+    def add(self, camera_id=None, url='', **config):
+        """Create a camera; picks the next free id when camera_id is None"""
+        with self._lock:
+            if len(self._cameras) >= MAX_CAMERAS:
+                raise ValueError(f'Camera limit of {MAX_CAMERAS} reached')
+            if camera_id is None:
+                camera_id = max(self._cameras, default=0) + 1
+            camera_id = int(camera_id)
+            if camera_id <= 0:
+                raise ValueError('Camera IDs must be positive')
+            if camera_id in self._cameras:
+                raise ValueError(f'Camera {camera_id} already exists')
+            if url and url in self._by_url:
+                raise ValueError(f'URL already used by camera {self._by_url[url]}')
+
+            camera = CameraState(camera_id, url, budget=self.budget)
+            camera.configure(**config)
+            # Copy-on-write so readers iterating the old dict are never disturbed
+            cameras = dict(self._cameras)
+            cameras[camera_id] = camera
+            self._cameras = cameras
+            if url:
+                self._by_url[url] = camera_id
+            return camera
+
+    def remove(self, camera_id):
+        """Forget a camera; the caller must have stopped it first"""
+        with self._lock:
+            camera = self._cameras.get(camera_id)
+            if camera is None:
+                return None
+            if camera.active:
+                raise ValueError(f'Camera {camera_id} is active; stop it first')
+            cameras = dict(self._cameras)
+            del cameras[camera_id]
+            self._cameras = cameras
+            self._active.discard(camera_id)
+            if self._by_url.get(camera.url) == camera_id:
+                del self._by_url[camera.url]
+            return camera
+
+    def set_url(self, camera_id, url):
+        with self._lock:
+            camera = self._cameras[camera_id]
+            owner = self._by_url.get(url)
+            if url and owner is not None and owner != camera_id:
+                raise ValueError(f'URL already used by camera {owner}')
+            if self._by_url.get(camera.url) == camera_id:
+                del self._by_url[camera.url]
+            camera.url = url
+            if url:
+                self._by_url[url] = camera_id
+
+    def set_active(self, camera_id, active):
+        with self._lock:
+            camera = self._cameras[camera_id]
+            camera.active = active
+            if active:
+                self._active.add(camera_id)
+            else:
+                self._active.discard(camera_id)
+
+    def to_dict(self):
+        return {
+            'total_cameras': len(self._cameras),
+            'active_cameras': self.active_count,
+            'max_cameras': MAX_CAMERAS,
+            'cameras': [camera.config_dict() for camera in self._cameras.values()]
+        }
+
+
+def run_scale_test(cameras=64, duration=10.0, width=640, height=360, fps=15):
+    """Run the capture path for many synthetic cameras and report CPU and memory per camera"""
+    import time
+    import resource
+    import tracemalloc
+    from camera_capture import CameraCapture
+    from synthetic_camera import SyntheticCapture
+
+    tracemalloc.start()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    wall_before = time.monotonic()
+
+    registry = CameraRegistry()
+    running = [True]
+    threads = []
+    for index in range(cameras):
+        camera = registry.add(url=f'synthetic://{index + 1}')
+        registry.set_active(camera.id, True)
+        # A viewer on every camera: the worst case, every frame is decoded
+        camera.demand.touch_viewer()
+
+        def worker(camera=camera, cap=SyntheticCapture(width, height, fps, seed=index)):
+            capture = CameraCapture(cap, camera.demand, camera.capture_stats, camera.frame_slot)
+
+            def on_frame(frame, for_display, for_analysis, capture_time):
+                camera.motion.update(frame)
+                if for_analysis:
+                    camera.add_analysis_frame(frame)
+                    camera.frame_slot.record_shared(frame)
+
+            capture.run(lambda: running[0], on_frame)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        threads.append(thread)
+        thread.start()
+
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        for camera in registry.active():
+            camera.demand.touch_viewer()
+        time.sleep(0.5)
+
+    running[0] = False
+    for thread in threads:
+        thread.join(timeout=2)
+
+    wall = time.monotonic() - wall_before
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # ru_maxrss is in kilobytes on Linux
+    rss_growth_mb = (usage_after.ru_maxrss - rss_before) / 1024
+
+    decode_fps = [camera.capture_stats.to_dict()['decoded'] / duration for camera in registry.values()]
+    return {
+        'cameras': cameras,
+        'resolution': f'{width}x{height}',
+        'source_fps': fps,
+        'avg_decoded_fps_per_camera': round(sum(decode_fps) / len(decode_fps), 1),
+        'min_decoded_fps_per_camera': round(min(decode_fps), 1),
+        'cpu_percent_total': round(cpu / wall * 100, 1),
+        'cpu_percent_per_camera': round(cpu / wall * 100 / cameras, 2),
+        'python_heap_peak_mb_per_camera': round(traced_peak / (1024 * 1024) / cameras, 2),
+        'rss_growth_mb_per_camera': round(rss_growth_mb / cameras, 2)
+    }
+
+
+if __name__ == '__main__':
+    for count in (16, 64):
+        print(f"Camera registry scale test ({count} synthetic cameras)")
+        for key, value in run_scale_test(cameras=count).items():
+            print(f"  {key}: {value}")
@@ -0,0 +1,144 @@
+import cv2
+import re
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, urlencode
+
+from synthetic_camera import SCHEME, SyntheticCapture
+
+BOUNDARY = 'simframe'
+STREAM_PATH = re.compile(r'^/camera/(\d+)(?:\.mjpg)?$')
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    """GET /camera/<n>.mjpg?<synthetic options> streams one simulated camera as MJPEG"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == '/':
+            self._send_index()
+            return
+        match = STREAM_PATH.match(parsed.path)
+        if not match:
+            self.send_error(404)
+            return
+
+        try:
+            source = SyntheticCapture.from_url(f'{SCHEME}{match.group(1)}?{parsed.query}')
+        except (TypeError, ValueError) as e:
+            self.send_error(400, str(e))
+            return
+
+        simulator = self.server.simulator
+        simulator.record('connections')
+        self.send_response(200)
+        self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        quality = [cv2.IMWRITE_JPEG_QUALITY, simulator.jpeg_quality]
+        try:
+            # Stalls block in read() and simply stop the bytes; a disconnect ends the response
+            while not simulator.stopping:
+                ok, frame = source.read()
+                if not ok:
+                    simulator.record('disconnects')
+                    break
+                jpeg = cv2.imencode('.jpg', frame, quality)[1].tobytes()
+                self.wfile.write(f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n'
+                                 f'Content-Length: {len(jpeg)}\r\n\r\n'.encode() + jpeg + b'\r\n')
+                simulator.record('frames')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            source.release()
+
+    def _send_index(self):
+        simulator = self.server.simulator
+        body = '\n'.join(simulator.urls(simulator.cameras)).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class CameraSimulator:
+    """Local HTTP server for N simulated network cameras.
+
+    Each stream is a SyntheticCapture (generated pattern or a looped
+    recording) served as MJPEG, so the app opens it with plain
+    cv2.VideoCapture and exercises its real network path. Motion events,
+    stalls and disconnects are chosen per stream with the same query
+    options as synthetic:// URLs.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8554, cameras=4, jpeg_quality=80):
+        self.host = host
+        self.port = port
+        self.cameras = cameras
+        self.jpeg_quality = jpeg_quality
+        self.stopping = False
+        self.lock = threading.Lock()
+        self.counters = {'connections': 0, 'disconnects': 0, 'frames': 0}
+        self._server = None
+        self._thread = None
+
+    def record(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def url(self, camera, **options):
+        query = f'?{urlencode(options)}' if options else ''
+        return f'http://{self.host}:{self.port}/camera/{camera}.mjpg{query}'
+
+    def urls(self, count, **options):
+        return [self.url(camera, **options) for camera in range(1, count + 1)]
+
+    def start(self):
+        self.stopping = False
+        self._server = ThreadingHTTPServer((self.host, self.port), SimulatorHandler)
+        self._server.daemon_threads = True
+        self._server.simulator = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopping = True
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def to_dict(self):
+        with self.lock:
+            return dict(self.counters, url=f'http://{self.host}:{self.port}/')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve simulated MJPEG cameras')
+    parser.add_argument('--cameras', type=int, default=4)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8554)
+    args = parser.parse_args()
+
+    simulator = CameraSimulator(args.host, args.port, args.cameras).start()
+    print(f"Camera simulator serving {args.cameras} cameras:")
+    for camera_url in simulator.urls(args.cameras):
+        print(f"  {camera_url}")
+    print("Options: width, height, fps, file, motion_every, motion_seconds, "
+          "disconnect_after, stall_every, stall_seconds")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"  {simulator.to_dict()}")
+    except KeyboardInterrupt:
+        simulator.stop()
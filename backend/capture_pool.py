@@ -0,0 +1,764 @@
+import cv2
+import os
+import sys
+import time
+import pickle
+import itertools
+import threading
+import subprocess
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import AuthenticationError, Client, Listener, wait
+import numpy as np
+
+from camera_capture import CameraCapture, CaptureDemand, CaptureStats
+from camera_connection import CameraConnection, CONNECTED, CONNECTING
+from synthetic_camera import open_capture
+
+RING_SLOTS = 4               # frames a camera can run ahead of the web process before overwriting
+HEADER_BYTES = 4096          # control block at the start of every ring
+STATS_INTERVAL = 1.0         # seconds between capture stats sent by workers
+OPEN_TIMEOUT = 15.0
+WORKER_CHECK_INTERVAL = 1.0  # seconds between checks for crashed worker processes
+RECEIVE_BATCH = 64           # messages taken from one worker before looking at the others
+
+
+class SharedFrameRing:
+    """Fixed-size ring of frames in one shared memory block.
+
+    The header holds a float64 control block (viewer timestamp written by the
+    web process) and one sequence number per slot. The writer sets a slot's
+    sequence to -1 while decoding into it and to the frame's sequence once it
+    is complete, so a reader that sees the same sequence before and after
+    copying knows the copy is not torn.
+    """
+
+    def __init__(self, shape, slots=RING_SLOTS, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + slots * frame_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            if os.name == 'posix':
+                # Attaching registers the block with this process's resource
+                # tracker, which would unlink it when the worker exits; the
+                # web process created it and unlinks it
+                resource_tracker.unregister(self.shm._name, 'shared_memory')
+        self.name = self.shm.name
+        self.control = np.ndarray((8,), dtype=np.float64, buffer=self.shm.buf, offset=0)
+        self.slot_seq = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf, offset=64)
+        self.frames = [np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf,
+                                  offset=HEADER_BYTES + index * frame_bytes)
+                       for index in range(slots)]
+        if name is None:
+            self.control[:] = 0.0
+            self.slot_seq[:] = 0
+
+    def read(self, index, seq, out):
+        """Copy slot index into out if it still holds frame seq; returns out or None"""
+        if self.slot_seq[index] != seq:
+            return None
+        np.copyto(out, self.frames[index])
+        if self.slot_seq[index] != seq:
+            return None
+        return out
+
+    def close(self, unlink=False):
+        # numpy views must go before the mapping can be closed
+        self.control = self.slot_seq = self.frames = None
+        self.shm.close()
+        if unlink:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class RingWriter:
+    """FrameSlot writer interface (back_buffer/publish) over a SharedFrameRing"""
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.seq = 0
+        self.index = 0
+
+    def back_buffer(self):
+        index = (self.seq + 1) % self.ring.slots
+        self.ring.slot_seq[index] = -1
+        return self.ring.frames[index]
+
+    def publish(self, frame, timestamp=None):
+        index = (self.seq + 1) % self.ring.slots
+        target = self.ring.frames[index]
+        if frame is not target:
+            self.ring.slot_seq[index] = -1
+            if frame.shape != target.shape:
+                # The stream changed resolution; keep the ring's geometry
+                cv2.resize(frame, (target.shape[1], target.shape[0]), dst=target)
+            else:
+                np.copyto(target, frame)
+        self.seq += 1
+        self.index = index
+        self.ring.slot_seq[index] = self.seq
+
+    def record_shared(self, frame):
+        pass
+
+
+class SharedDemand(CaptureDemand):
+    """CaptureDemand whose viewer timestamp is kept up to date by the web process"""
+
+    def __init__(self, control, **kwargs):
+        super().__init__(**kwargs)
+        self.control = control
+
+    def has_viewers(self, now=None):
+        now = time.monotonic() if now is None else now
+        return now - self.control[0] <= self.viewer_timeout
+
+
+class PooledCaptureStats:
+    """Web-process view of a pooled camera: the worker's CaptureStats plus transfer counters"""
+
+    def __init__(self, worker=None):
+        self.worker = worker
+        self.token = None
+        self.last_error = None
+        self.remote = CaptureStats().to_dict()
+        self.transferred = 0
+        self.overruns = 0
+        self.transfer_ms = 0.0
+
+    @property
+    def retrieved(self):
+        """Frames delivered to the web process, counted like CaptureStats.retrieved"""
+        return self.transferred
+
+    def record_transfer(self, latency_seconds):
+        self.transferred += 1
+        latency_ms = latency_seconds * 1000.0
+        self.transfer_ms = latency_ms if self.transferred == 1 else 0.9 * self.transfer_ms + 0.1 * latency_ms
+
+    def to_dict(self):
+        stats = dict(self.remote)
+        stats.update({
+            'mode': 'process',
+            'worker': self.worker,
+            'transferred': self.transferred,
+            'ring_overruns': self.overruns,
+            'avg_capture_to_web_ms': round(self.transfer_ms, 2)
+        })
+        return stats
+
+
+def _run_camera(token, url, settings, state, results):
+    """Capture one camera inside a worker process, decoding straight into shared memory"""
+    cap = None
+    ring = None
+    still_streaming = False
+    try:
+        cap = open_capture(url)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        ret, frame = cap.read() if cap.isOpened() else (False, None)
+        if not ret or frame is None:
+            results.put(('failed', token, 'Could not open camera stream' if not cap.isOpened()
+                         else 'Camera opened but no frame received'))
+            return
+        results.put(('opened', token, frame.shape))
+
+        # The web process owns the ring; wait for it to say where it is
+        if not state['ring_ready'].wait(OPEN_TIMEOUT) or state['stop'].is_set():
+            return
+        ring = SharedFrameRing(frame.shape, name=state['ring_name'])
+        writer = RingWriter(ring)
+        demand = SharedDemand(ring.control, **settings)
+        stats = CaptureStats()
+        capture = CameraCapture(cap, demand, stats, writer)
+        last_stats = [0.0]
+
+        def on_frame(frame, for_display, for_analysis, capture_time):
+            results.put(('frame', token, writer.index, writer.seq, capture_time, for_display, for_analysis))
+            if capture_time - last_stats[0] >= STATS_INTERVAL:
+                last_stats[0] = capture_time
+                results.put(('stats', token, stats.to_dict()))
+
+        still_streaming = capture.run(lambda: not state['stop'].is_set(), on_frame)
+    except Exception as e:
+        results.put(('failed', token, f"Connection error: {str(e)}"))
+    finally:
+        if cap is not None:
+            cap.release()
+        if ring is not None:
+            ring.close()
+        results.put(('stopped', token, still_streaming))
+
+
+class WorkerChannel:
+    """Pickled messages to or from a worker process over a multiprocessing Connection.
+
+    put() may be called from any thread; messages put before the worker has
+    connected are held and sent once it does, and messages to a worker that
+    went away are dropped (the pool notices the dead process on its own).
+    """
+
+    def __init__(self, conn=None):
+        self.lock = threading.Lock()
+        self.conn = conn
+        self.closed = False
+        self._pending = []
+
+    def attach(self, conn):
+        with self.lock:
+            self.conn = conn
+            pending, self._pending = self._pending, []
+            for message in pending:
+                self._send(message)
+
+    def put(self, message):
+        with self.lock:
+            if self.conn is None:
+                self._pending.append(message)
+            elif not self.closed:
+                self._send(message)
+
+    def _send(self, message):
+        try:
+            self.conn.send(message)
+        except (OSError, ValueError):
+            self.closed = True
+
+    def get(self):
+        return self.conn.recv()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            if self.conn is not None:
+                self.conn.close()
+
+
+def _worker_main(commands, results):
+    """Worker process: one capture thread per camera assigned to this process"""
+    cameras = {}
+    while True:
+        try:
+            command = commands.get()
+        except (EOFError, OSError):
+            # The web process went away
+            command = ('exit', None)
+        action, token = command[0], command[1]
+        if action == 'start':
+            state = {'stop': threading.Event(), 'ring_ready': threading.Event(), 'ring_name': None}
+            thread = threading.Thread(target=_run_camera, args=(token, command[2], command[3], state, results),
+                                      daemon=True)
+            cameras[token] = (thread, state)
+            thread.start()
+        elif action == 'ring' and token in cameras:
+            state = cameras[token][1]
+            state['ring_name'] = command[2]
+            state['ring_ready'].set()
+        elif action == 'stop' and token in cameras:
+            state = cameras.pop(token)[1]
+            state['stop'].set()
+            state['ring_ready'].set()
+        elif action == 'exit':
+            for thread, state in cameras.values():
+                state['stop'].set()
+                state['ring_ready'].set()
+            for thread, _ in cameras.values():
+                thread.join(timeout=2)
+            return
+
+
+def _worker_process():
+    """Entry point of a worker process: connect back to the pool and serve its commands"""
+    address, authkey, launch_id = pickle.load(sys.stdin.buffer)
+    channel = WorkerChannel(Client(address, authkey=authkey))
+    channel.put(launch_id)
+    _worker_main(channel, channel)
+    channel.close()
+
+
+class PooledCamera:
+    __slots__ = ('token', 'camera_id', 'worker', 'frame_slot', 'demand', 'on_frame', 'on_stopped',
+                 'ring', 'stats', 'opened', 'stopped', 'error')
+
+    def __init__(self, token, camera_id, worker, frame_slot, demand, on_frame, on_stopped, stats=None):
+        self.token = token
+        self.camera_id = camera_id
+        self.worker = worker
+        self.frame_slot = frame_slot
+        self.demand = demand
+        self.on_frame = on_frame
+        self.on_stopped = on_stopped
+        self.ring = None
+        self.stats = stats or PooledCaptureStats(worker)
+        self.stats.worker = worker
+        self.opened = threading.Event()
+        self.stopped = threading.Event()
+        self.error = None
+
+
+class CapturePool:
+    """Camera capture and decode in worker processes instead of web-process threads.
+
+    Each worker process runs up to cameras_per_process capture loops. Frames
+    are decoded directly into a per-camera SharedFrameRing; only a small
+    (slot, seq, timestamp) message crosses the process boundary. A receiver
+    thread in the web process copies each announced frame into the camera's
+    FrameSlot and runs the same on_frame callback as thread mode, so the rest
+    of the app cannot tell the difference. Worker processes start lazily; one
+    that dies takes its cameras down with it (each gets on_stopped) and the
+    next camera placed on its slot starts a fresh process.
+
+    Workers run this file as a script (`capture_pool.py --worker`) and connect
+    back over an authenticated Listener, rather than through multiprocessing's
+    spawn, which would re-import the web process's main module (app.py and all
+    of its stores, recorders and threads) in every worker.
+    """
+
+    def __init__(self, processes=None, cameras_per_process=4):
+        self.processes = processes or os.cpu_count() or 2
+        self.cameras_per_process = cameras_per_process
+        self.lock = threading.Lock()
+        self._listener = None
+        self._authkey = None
+        self._accepter = None
+        # launch id -> WorkerChannel of a worker process that has not connected yet
+        self._launching = {}
+        self._launches = itertools.count(1)
+        self._workers = []
+        self._cameras = {}
+        self._by_camera = {}
+        self._tokens = itertools.count(1)
+        self._receiver = None
+        self._stop = threading.Event()
+        self.worker_crashes = 0
+
+    def _ensure_started(self):
+        if self._listener is None:
+            self._authkey = os.urandom(32)
+            self._listener = Listener(authkey=self._authkey)
+            self._stop.clear()
+            self._accepter = threading.Thread(target=self._accept_loop, args=(self._listener,), daemon=True)
+            self._accepter.start()
+            self._receiver = threading.Thread(target=self._receive_loop, daemon=True)
+            self._receiver.start()
+
+    def _launch_worker(self):
+        """Start a worker process; its channel buffers commands until it connects"""
+        launch_id = next(self._launches)
+        channel = WorkerChannel()
+        self._launching[launch_id] = channel
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--worker'], stdin=subprocess.PIPE)
+        try:
+            process.stdin.write(pickle.dumps((self._listener.address, self._authkey, launch_id)))
+            process.stdin.close()
+        except OSError:
+            pass  # It died on startup; _check_workers() reports it
+        return process, channel
+
+    def _accept_loop(self, listener):
+        while not self._stop.is_set():
+            try:
+                conn = listener.accept()
+            except AuthenticationError:
+                continue
+            except OSError:
+                return
+            if self._stop.is_set():
+                conn.close()
+                return
+            try:
+                launch_id = conn.recv()
+            except (EOFError, OSError):
+                conn.close()
+                continue
+            with self.lock:
+                channel = self._launching.pop(launch_id, None)
+            if channel is None:
+                conn.close()
+                continue
+            channel.attach(conn)
+
+    def _pick_worker(self):
+        """Least-loaded worker, starting a new process while all existing ones are full"""
+        loads = [sum(1 for cam in self._cameras.values() if cam.worker == index) if worker else None
+                 for index, worker in enumerate(self._workers)]
+        live = [load for load in loads if load is not None]
+        if live and min(live) < self.cameras_per_process or len(live) >= self.processes:
+            return loads.index(min(live))
+        worker = self._launch_worker()
+        if None in loads:
+            # Reuse the slot of a crashed worker
+            index = loads.index(None)
+            self._workers[index] = worker
+            return index
+        self._workers.append(worker)
+        return len(self._workers) - 1
+
+    def start_camera(self, camera_id, url, frame_slot, demand, on_frame, on_stopped=None, timeout=OPEN_TIMEOUT,
+                     stats=None):
+        """Start capturing a camera in the pool; returns (stats, None) or (None, error).
+
+        Blocks until the worker has opened the stream. stats, when given, is
+        a PooledCaptureStats carried over from an earlier session; it gets a
+        token attribute naming this session for stop_camera().
+        """
+        with self.lock:
+            if camera_id in self._by_camera:
+                return None, f'Camera {camera_id} is already running in the capture pool'
+            self._ensure_started()
+            worker = self._pick_worker()
+            token = next(self._tokens)
+            camera = PooledCamera(token, camera_id, worker, frame_slot, demand, on_frame, on_stopped, stats)
+            camera.stats.token = token
+            camera.stats.last_error = None
+            self._cameras[token] = camera
+            self._by_camera[camera_id] = token
+            settings = {
+                'display_fps': demand.display_fps,
+                'analysis_fps': demand.analysis_fps,
+                'idle_display_fps': demand.idle_display_fps,
+                'viewer_timeout': demand.viewer_timeout
+            }
+            self._workers[worker][1].put(('start', token, url, settings))
+
+        if not camera.opened.wait(timeout):
+            self.stop_camera(camera_id, token)
+            return None, 'Timed out waiting for the camera to open'
+        if camera.error:
+            return None, camera.error
+        with self.lock:
+            stopped = self._by_camera.get(camera_id) != token
+        if stopped or camera.stopped.is_set():
+            return None, 'Camera stopped while opening'
+        return camera.stats, None
+
+    def stop_camera(self, camera_id, token=None, timeout=2.0):
+        """Stop a pooled camera; with a token, only if that session is still the camera's current one"""
+        with self.lock:
+            if token is not None and self._by_camera.get(camera_id) != token:
+                return False
+            token = self._by_camera.pop(camera_id, None)
+            camera = self._cameras.get(token)
+            if camera is None:
+                return False
+            opening = not camera.opened.is_set()
+            worker = self._workers[camera.worker]
+            if worker is not None:
+                worker[1].put(('stop', token))
+        if worker is None:
+            self._release(camera)
+        if opening:
+            # The worker may be blocked opening the stream for a while; wake
+            # start_camera() now and let the worker's 'stopped' clean up later
+            camera.opened.set()
+        else:
+            camera.stopped.wait(timeout)
+        return True
+
+    def shutdown(self):
+        with self.lock:
+            workers, self._workers = self._workers, []
+            self._by_camera.clear()
+        workers = [worker for worker in workers if worker is not None]
+        for process, channel in workers:
+            channel.put(('exit', None))
+        for process, channel in workers:
+            try:
+                process.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                process.terminate()
+        self._stop.set()
+        if self._receiver:
+            self._receiver.join(timeout=2)
+        for _, channel in workers:
+            channel.close()
+        self._close_listener()
+        for camera in list(self._cameras.values()):
+            self._release(camera)
+        self._receiver = None
+
+    def _close_listener(self):
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
+        # A blocked accept() is not interrupted by close() everywhere; connect once to wake it
+        try:
+            Client(listener.address, authkey=self._authkey).close()
+        except OSError:
+            pass
+        if self._accepter:
+            self._accepter.join(timeout=2)
+        listener.close()
+        self._accepter = None
+        with self.lock:
+            self._launching.clear()
+
+    def _release(self, camera):
+        with self.lock:
+            self._cameras.pop(camera.token, None)
+            if self._by_camera.get(camera.camera_id) == camera.token:
+                del self._by_camera[camera.camera_id]
+        if camera.ring is not None:
+            camera.ring.close(unlink=True)
+            camera.ring = None
+        camera.opened.set()
+        camera.stopped.set()
+
+    def _sync_demand(self):
+        for camera in list(self._cameras.values()):
+            if camera.ring is not None:
+                camera.ring.control[0] = camera.demand.last_viewer_time
+
+    def _check_workers(self):
+        """Stop the cameras of worker processes that died, as if their streams had ended"""
+        lost = []
+        with self.lock:
+            for index, worker in enumerate(self._workers):
+                if worker is None or worker[0].poll() is None:
+                    continue
+                self._workers[index] = None
+                worker[1].close()
+                self.worker_crashes += 1
+                print(f"Capture worker {index} exited with code {worker[0].returncode}")
+                lost += [(camera, worker[0].returncode) for camera in self._cameras.values() if camera.worker == index]
+        for camera, exitcode in lost:
+            camera.error = camera.stats.last_error = f'Capture worker exited with code {exitcode}'
+            was_streaming = camera.ring is not None
+            self._release(camera)
+            if camera.on_stopped and was_streaming:
+                camera.on_stopped(False)
+
+    def _receive_loop(self):
+        checked = time.monotonic()
+        while not self._stop.is_set():
+            self._sync_demand()
+            if time.monotonic() - checked >= WORKER_CHECK_INTERVAL:
+                checked = time.monotonic()
+                self._check_workers()
+            channels = {worker[1].conn: worker[1] for worker in list(self._workers)
+                        if worker is not None and worker[1].conn is not None and not worker[1].closed}
+            if not channels:
+                self._stop.wait(0.1)
+                continue
+            for conn in wait(list(channels), timeout=0.1):
+                # Bounded, so demand sync and worker checks keep running under load
+                for _ in range(RECEIVE_BATCH):
+                    try:
+                        message = conn.recv()
+                    except (EOFError, OSError):
+                        # The worker died; _check_workers() stops its cameras
+                        channels[conn].closed = True
+                        break
+                    try:
+                        self._handle(message)
+                    except Exception as e:
+                        print(f"Error handling capture pool message {message[0]}: {e}")
+                    if not conn.poll():
+                        break
+
+    def _handle(self, message):
+        kind, token = message[0], message[1]
+        camera = self._cameras.get(token)
+        if camera is None:
+            return
+
+        if kind == 'frame':
+            _, _, index, seq, capture_time, for_display, for_analysis = message
+            ring = camera.ring
+            if ring is None:
+                return
+            out = camera.frame_slot.back_buffer()
+            if out is None or out.shape != ring.shape:
+                out = np.empty(ring.shape, dtype=np.uint8)
+            frame = ring.read(index, seq, out)
+            if frame is None:
+                # The worker lapped us; a newer frame is already on its way
+                camera.stats.overruns += 1
+                return
+            camera.frame_slot.publish(frame, capture_time)
+            camera.on_frame(frame, for_display, for_analysis, capture_time)
+            camera.stats.record_transfer(time.monotonic() - capture_time)
+        elif kind == 'stats':
+            camera.stats.remote = message[2]
+        elif kind == 'opened':
+            worker = self._workers[camera.worker]
+            if worker is None:
+                return
+            camera.ring = SharedFrameRing(message[2])
+            camera.ring.control[0] = camera.demand.last_viewer_time
+            worker[1].put(('ring', token, camera.ring.name))
+            camera.opened.set()
+        elif kind == 'failed':
+            camera.error = camera.stats.last_error = message[2]
+            camera.opened.set()
+        elif kind == 'stopped':
+            was_streaming = camera.ring is not None
+            self._release(camera)
+            if camera.on_stopped and was_streaming:
+                camera.on_stopped(message[2])
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'processes': sum(1 for worker in self._workers if worker is not None),
+                'max_processes': self.processes,
+                'cameras_per_process': self.cameras_per_process,
+                'worker_crashes': self.worker_crashes,
+                'cameras': {camera.camera_id: camera.worker for camera in self._cameras.values()}
+            }
+
+
+class PooledConnection(CameraConnection):
+    """CameraConnection supervision for a camera captured in the pool.
+
+    The supervisor thread asks the pool to open the stream (the request
+    that started the camera does not wait for it) and watches the session:
+    when the worker reports the stream ended, its process died, or no frame
+    has arrived for stall_timeout seconds, the session is stopped and the
+    camera restarted in the pool after the same jittered backoff as thread
+    mode. One PooledCaptureStats is carried across sessions.
+    """
+
+    def __init__(self, name, url, pool, camera_id, frame_slot, demand, on_frame, on_state=None, **kwargs):
+        super().__init__(name, url, None, None, on_frame, on_state, **kwargs)
+        self.pool = pool
+        self.camera_id = camera_id
+        self.frame_slot = frame_slot
+        self.demand = demand
+        self.stats = PooledCaptureStats()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        # Cancels an open in progress as well as a running session
+        self.pool.stop_camera(self.camera_id, self.stats.token)
+        super().stop(timeout)
+
+    def _supervise(self):
+        self._set_state(CONNECTING)
+        while not self._stop.is_set():
+            ended = threading.Event()
+            stats, error = self.pool.start_camera(
+                self.camera_id, self.url, self.frame_slot, self.demand, self.on_frame,
+                on_stopped=lambda still_streaming: ended.set(), timeout=self.open_timeout, stats=self.stats)
+            if self._stop.is_set():
+                self.pool.stop_camera(self.camera_id, self.stats.token)
+                break
+            if error:
+                self.open_failures += 1
+                self._retry_later(error)
+                continue
+
+            with self.lock:
+                self.sessions += 1
+            self._set_state(CONNECTED)
+            connected_at = time.monotonic()
+            last_transferred, last_progress = stats.transferred, connected_at
+            reason = None
+            lost_at = None
+            while not self._stop.is_set():
+                if ended.wait(0.5):
+                    reason = stats.last_error or 'Stream ended'
+                    break
+                now = time.monotonic()
+                if stats.transferred != last_transferred:
+                    last_transferred, last_progress = stats.transferred, now
+                elif now - last_progress >= self.stall_timeout:
+                    self.stalls += 1
+                    reason = f'No frames for {self.stall_timeout:.0f}s'
+                    lost_at = last_progress
+                    break
+
+            self.pool.stop_camera(self.camera_id, stats.token)
+            if self._stop.is_set():
+                break
+            if time.monotonic() - connected_at >= self.stable_seconds:
+                self.backoff.reset()
+            print(f"{self.name} disconnected ({reason}); reconnecting")
+            self._retry_later(reason, lost_at)
+
+
+def run_benchmark(counts=(4, 16, 32), duration=10.0, width=1280, height=720, fps=25):
+    """Sustained fps per camera with capture threads vs. the process pool.
+
+    Sources are JPEG-decoding synthetic cameras, every camera has a viewer
+    and the web-process side runs motion detection on every frame, as
+    app.py does.
+    """
+    from frame_slot import FrameSlot
+    from motion import MotionDetector
+    from synthetic_camera import allow_synthetic
+
+    allow_synthetic()
+
+    def url(index):
+        return f'synthetic://{index}?width={width}&height={height}&fps={fps}&jpeg=80'
+
+    def measure(mode, count):
+        slots = [FrameSlot() for _ in range(count)]
+        demands = [CaptureDemand(display_fps=fps) for _ in range(count)]
+        detectors = [MotionDetector() for _ in range(count)]
+        running = [True]
+        threads = []
+        pool = CapturePool() if mode == 'process' else None
+
+        for index in range(count):
+            demands[index].touch_viewer()
+
+            def on_frame(frame, for_display, for_analysis, capture_time, detector=detectors[index]):
+                detector.update(frame)
+
+            if pool:
+                _, error = pool.start_camera(index, url(index), slots[index], demands[index], on_frame)
+                if error:
+                    raise RuntimeError(error)
+            else:
+                def worker(index=index, on_frame=on_frame):
+                    capture = CameraCapture(open_capture(url(index)), demands[index], CaptureStats(), slots[index])
+                    capture.run(lambda: running[0], on_frame)
+                thread = threading.Thread(target=worker, daemon=True)
+                threads.append(thread)
+                thread.start()
+
+        # Let every camera reach steady state before counting
+        time.sleep(2.0)
+        start_seq = [slot.seq for slot in slots]
+        started = time.monotonic()
+        while time.monotonic() - started < duration:
+            for demand in demands:
+                demand.touch_viewer()
+            time.sleep(0.5)
+        elapsed = time.monotonic() - started
+        rates = [(slot.seq - before) / elapsed for slot, before in zip(slots, start_seq)]
+
+        running[0] = False
+        for thread in threads:
+            thread.join(timeout=2)
+        if pool:
+            pool.shutdown()
+        return {
+            'avg_fps_per_camera': round(sum(rates) / len(rates), 1),
+            'min_fps_per_camera': round(min(rates), 1)
+        }
+
+    results = []
+    for count in counts:
+        for mode in ('thread', 'process'):
+            result = measure(mode, count)
+            result.update({'mode': mode, 'cameras': count})
+            results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['--worker']:
+        _worker_process()
+        raise SystemExit(0)
+
+    print(f"Capture benchmark: 1280x720 @ 25 fps JPEG sources, {os.cpu_count()} CPUs")
+    for row in run_benchmark():
+        print(f"  {row['cameras']:>3} cameras  {row['mode']:<8} "
+              f"avg {row['avg_fps_per_camera']:>5} fps  min {row['min_fps_per_camera']:>5} fps")
@@ -0,0 +1,149 @@
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+
+
+class DashboardSnapshot:
+    """Everything the dashboard shows, serialised once and served with an ETag.
+
+    The snapshot is made of named sections, each built by its own function.
+    invalidate() marks sections whose source state changed (the app wires
+    this to push events and to the endpoints that change state without
+    one); sections derived from the clock also expire after max_age
+    seconds. get() rebuilds only the stale sections, and only when one of
+    them actually changed does it re-serialise the body and move to a new
+    version. Between changes every poll is answered from the same bytes,
+    and a client that sends the ETag back gets a 304 with no body at all.
+    """
+
+    def __init__(self, sections, max_age=None):
+        self.builders = dict(sections)
+        self.max_age = dict(max_age or {})
+        self.lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._sections = {}
+        self._built_at = {}
+        self._dirty = set(self.builders)
+        self._epoch = format(int(time.time()), 'x')
+        self.version = 0
+        self._body = b''
+        self._etag = None
+        self.requests = 0
+        self.not_modified = 0
+        self.section_builds = 0
+        self.serialisations = 0
+
+    def invalidate(self, *names):
+        """Mark sections (all of them when none are named) for rebuilding on the next request"""
+        with self.lock:
+            self._dirty.update(names or self.builders)
+
+    def _stale(self, now):
+        with self.lock:
+            stale = self._dirty | {name for name, age in self.max_age.items()
+                                   if now - self._built_at.get(name, 0) >= age}
+            self._dirty -= stale
+        return stale
+
+    def get(self):
+        """(etag, JSON body) of the current snapshot"""
+        with self._build_lock:
+            now = time.monotonic()
+            changed = False
+            for name in self._stale(now):
+                try:
+                    value = self.builders[name]()
+                except Exception as e:
+                    # Keep serving the last good section
+                    print(f"Error building dashboard section {name}: {e}")
+                    continue
+                self.section_builds += 1
+                self._built_at[name] = now
+                if self._sections.get(name) != value:
+                    self._sections[name] = value
+                    changed = True
+
+            if changed or self._etag is None:
+                self.version += 1
+                self._body = json.dumps({
+                    'version': self.version,
+                    'updated': datetime.now().isoformat(),
+                    **self._sections
+                }, default=str).encode()
+                digest = hashlib.blake2b(self._body, digest_size=6).hexdigest()
+                self._etag = f'{self._epoch}-{self.version}-{digest}'
+                self.serialisations += 1
+            self.requests += 1
+            return self._etag, self._body
+
+    def record_not_modified(self):
+        with self.lock:
+            self.not_modified += 1
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'version': self.version,
+                'sections': sorted(self.builders),
+                'body_bytes': len(self._body),
+                'requests': self.requests,
+                'not_modified': self.not_modified,
+                'section_builds': self.section_builds,
+                'serialisations': self.serialisations
+            }
+
+
+def run_benchmark(polls=10000, change_every=50):
+    """Per-poll server cost of the snapshot vs. rebuilding and serialising every endpoint on each poll"""
+    import random
+
+    cameras = {camera_id: {'name': f'Camera {camera_id}', 'active': True, 'connection': 'connected'}
+               for camera_id in range(1, 33)}
+    notifications = [{'id': index, 'message': 'Anomaly detected on Camera 3', 'details': 'Spill ' * 15,
+                      'read': False} for index in range(200)]
+    state = {'accidents': 0}
+
+    sections = {
+        'status': lambda: {'accidents': state['accidents'], 'active_cameras': len(cameras)},
+        'notifications': lambda: {'count': len(notifications),
+                                  'unread': sum(1 for item in notifications if not item['read'])},
+        'activity': lambda: notifications[-5:],
+        'surveillance': lambda: {'cameras': {str(key): dict(value) for key, value in cameras.items()}},
+        'context': lambda: {'current_context_source': 'live'}
+    }
+    snapshot = DashboardSnapshot(sections, max_age={'status': 10})
+
+    def separate_endpoints():
+        for build in sections.values():
+            json.dumps(build())
+
+    rng = random.Random(3)
+    started = time.perf_counter()
+    etag = None
+    unchanged = 0
+    for poll in range(polls):
+        if poll % change_every == 0:
+            state['accidents'] += 1
+            snapshot.invalidate('status')
+        if rng.random() < 0.05:
+            snapshot.invalidate('notifications', 'activity')
+        current, _ = snapshot.get()
+        unchanged += current == etag
+        etag = current
+    snapshot_us = (time.perf_counter() - started) * 1e6 / polls
+
+    started = time.perf_counter()
+    for _ in range(polls):
+        separate_endpoints()
+    separate_us = (time.perf_counter() - started) * 1e6 / polls
+    return snapshot_us, separate_us, unchanged / polls, snapshot.to_dict()
+
+
+if __name__ == '__main__':
+    snapshot_us, separate_us, unchanged, stats = run_benchmark()
+    print("Dashboard polling: server time per poll, 32 cameras")
+    print(f"  snapshot:           {snapshot_us:7.1f} us ({unchanged:.0%} of polls unchanged -> 304)")
+    print(f"  separate endpoints: {separate_us:7.1f} us (5 requests)")
+    print(f"  serialisations: {stats['serialisations']}, section builds: {stats['section_builds']}")
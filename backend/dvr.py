@@ -0,0 +1,680 @@
+import os
+import cv2
+import time
+import struct
+import sqlite3
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime
+
+from evidence_clips import MjpegAviWriter, avi_header, avi_index, avi_chunk, AVI_HEADER_SIZE
+from report_store import REPORT_DB
+
+RECORDINGS_DIR = os.environ.get('RECORDINGS_DIR', 'dvr')   # not REPLAY_DIR: the compactor deletes in here
+RECORDING_FPS = 5
+SEGMENT_SECONDS = 60
+GAP_SECONDS = 5             # no new frame for this long ends the segment; playback shows a gap
+RETENTION_DAYS = 7
+QUOTA_MB = int(os.environ.get('RECORDINGS_QUOTA_MB', 20 * 1024))
+COMPACT_INTERVAL = 60
+MAX_EXPORT_SECONDS = 900    # longest range served as one video
+INDEX_CACHE_SEGMENTS = 64   # decoded frame indexes kept for scrubbing
+
+# Per frame in a segment's index: capture time, offset of the JPEG data in the file, its length
+FRAME_ENTRY = struct.Struct('<dII')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recording_segments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    camera TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    status TEXT NOT NULL,
+    path TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    frames INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    frame_index BLOB
+);
+CREATE INDEX IF NOT EXISTS recording_segments_camera ON recording_segments (camera, start);
+CREATE INDEX IF NOT EXISTS recording_segments_start ON recording_segments (start);
+CREATE TABLE IF NOT EXISTS recording_cameras (
+    camera TEXT PRIMARY KEY
+);
+"""
+
+
+class Segment:
+    """The segment a camera is currently writing, with its frame index in memory"""
+
+    __slots__ = ('id', 'camera', 'path', 'writer', 'start', 'end', 'times', 'offsets', 'lengths')
+
+    def __init__(self, segment_id, camera, path, writer, start):
+        self.id = segment_id
+        self.camera = camera
+        self.path = path
+        self.writer = writer
+        self.start = start
+        self.end = start
+        self.times = []
+        self.offsets = []
+        self.lengths = []
+
+    def frame_index(self):
+        return b''.join(FRAME_ENTRY.pack(ts, offset, length)
+                        for ts, offset, length in zip(self.times, self.offsets, self.lengths))
+
+
+def unpack_index(blob):
+    """(times, offsets, lengths) lists of a stored frame index"""
+    times, offsets, lengths = [], [], []
+    for ts, offset, length in FRAME_ENTRY.iter_unpack(blob or b''):
+        times.append(ts)
+        offsets.append(offset)
+        lengths.append(length)
+    return times, offsets, lengths
+
+
+def recover_segment(path, start, end):
+    """Frame index of a segment cut off by a restart, rebuilt from its chunks.
+
+    Capture times were only in memory, so they are spread evenly between
+    the segment start and the file's last write. Only used at start-up.
+    """
+    offsets, lengths = [], []
+    with open(path, 'rb') as segment:
+        segment.seek(AVI_HEADER_SIZE)
+        position = AVI_HEADER_SIZE
+        while True:
+            header = segment.read(8)
+            if len(header) < 8 or header[:4] != b'00dc':
+                break
+            length = struct.unpack('<I', header[4:])[0]
+            if position + 8 + length > os.fstat(segment.fileno()).st_size:
+                break  # the last frame was only partly written
+            offsets.append(position + 8)
+            lengths.append(length)
+            position += 8 + length + (length & 1)
+            segment.seek(position)
+    end = max(end, start)
+    step = (end - start) / max(len(offsets) - 1, 1)
+    return [start + index * step for index in range(len(offsets))], offsets, lengths, position
+
+
+class ContinuousRecorder:
+    """Continuous recording of chosen cameras in fixed-length segments.
+
+    A sampler thread reads each enabled camera's latest frame from its
+    FrameSlot at `fps`, encodes it once and appends it to the camera's open
+    segment, an MJPEG AVI written as frames arrive. A segment closes after
+    segment_seconds, on a resolution change or when the camera stops
+    delivering frames for GAP_SECONDS, so gaps in the footage are gaps
+    between segments.
+
+    Every segment is a row in SQLite with its start and end time and a
+    packed index of each frame's capture time, file offset and length
+    (every MJPEG frame is a keyframe). Finding the frame at a time is one
+    indexed query plus a bisect, and a time range is served by reading
+    exactly the indexed byte ranges: no file is ever scanned. The open
+    segment's index is in memory, so footage is seekable while it is being
+    recorded.
+
+    A compactor thread deletes segments older than retention_days and then
+    the oldest ones until the recordings fit in quota_mb.
+    """
+
+    def __init__(self, directory=None, path=None, fps=RECORDING_FPS, segment_seconds=SEGMENT_SECONDS,
+                 retention_days=RETENTION_DAYS, quota_mb=QUOTA_MB, max_width=960, quality=70,
+                 compact_interval=COMPACT_INTERVAL, start=True):
+        self.directory = directory or RECORDINGS_DIR
+        self.path = path or REPORT_DB
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.retention_days = retention_days
+        self.quota_mb = quota_mb
+        self.max_width = max_width
+        self.quality = quality
+        self.compact_interval = compact_interval
+        self.lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        # Held while a segment is written to, opened or closed
+        self._write_lock = threading.RLock()
+        self._sources = {}
+        self._open = {}
+        self._last_seen = {}
+        self._index_cache = OrderedDict()
+        self._stop = threading.Event()
+        self.frames_written = 0
+        self.encode_seconds = 0.0
+        self.segments_closed = 0
+        self.deleted_by_age = 0
+        self.deleted_by_quota = 0
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+
+        os.makedirs(self.directory, exist_ok=True)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._recover()
+        self.enabled = {row[0] for row in self._conn.execute('SELECT camera FROM recording_cameras')}
+        self.stored_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(bytes), 0) FROM recording_segments WHERE status = 'complete'").fetchone()[0]
+
+        self._threads = []
+        if start:
+            for target in (self._sampler, self._compactor):
+                thread = threading.Thread(target=target, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _recover(self):
+        """Finish segments that were still open when the process stopped"""
+        rows = self._conn.execute("SELECT id, path, start, end, width, height FROM recording_segments "
+                                  "WHERE status = 'recording'").fetchall()
+        for segment_id, path, start, end, width, height in rows:
+            try:
+                end = max(end, os.path.getmtime(path))
+                times, offsets, lengths, size = recover_segment(path, start, end)
+                fps = max(1.0, min(30.0, len(times) / max(end - start, 1.0)))
+                with open(path, 'r+b') as segment:
+                    segment.truncate(size)
+                    segment.seek(size)
+                    segment.write(avi_index(lengths))
+                    segment.seek(0)
+                    segment.write(avi_header(len(lengths), fps, width, height, max(lengths, default=0),
+                                             size - AVI_HEADER_SIZE + 4))
+                blob = b''.join(FRAME_ENTRY.pack(*entry) for entry in zip(times, offsets, lengths))
+                with self._conn:
+                    self._conn.execute("UPDATE recording_segments SET status = 'complete', end = ?, frames = ?, "
+                                       "bytes = ?, frame_index = ? WHERE id = ?",
+                                       (times[-1] if times else start, len(times), size + 8 + 16 * len(lengths),
+                                        blob, segment_id))
+            except (OSError, struct.error) as e:
+                print(f"Dropping unrecoverable recording segment {segment_id}: {e}")
+                with self._conn:
+                    self._conn.execute('DELETE FROM recording_segments WHERE id = ?', (segment_id,))
+
+    def add_source(self, key, slot_getter):
+        """Make a camera recordable: slot_getter() returns its FrameSlot, or None while it is stopped"""
+        with self.lock:
+            self._sources[key] = slot_getter
+
+    def remove_source(self, key):
+        """Stop recording a removed camera; its recordings stay until the compactor expires them"""
+        with self._write_lock:
+            with self.lock:
+                self._sources.pop(key, None)
+                self._last_seen.pop(key, None)
+                segment = self._open.pop(key, None)
+            if segment is not None:
+                self._close_segment(segment)
+
+    def set_enabled(self, key, enabled):
+        """Turn continuous recording of a camera on or off; the choice survives restarts"""
+        with self._write_lock:
+            with self.lock:
+                if enabled:
+                    self.enabled.add(key)
+                else:
+                    self.enabled.discard(key)
+                segment = None if enabled else self._open.pop(key, None)
+            if segment is not None:
+                self._close_segment(segment)
+        with self._db_lock:
+            with self._conn:
+                if enabled:
+                    self._conn.execute('INSERT OR IGNORE INTO recording_cameras (camera) VALUES (?)', (key,))
+                else:
+                    self._conn.execute('DELETE FROM recording_cameras WHERE camera = ?', (key,))
+
+    def configure(self, retention_days=None, quota_mb=None):
+        """Update retention; None leaves a value unchanged. Raises ValueError on bad input"""
+        if retention_days is not None and float(retention_days) <= 0:
+            raise ValueError('retention_days must be positive')
+        if quota_mb is not None and int(quota_mb) < 1:
+            raise ValueError('quota_mb must be at least 1')
+        with self.lock:
+            if retention_days is not None:
+                self.retention_days = float(retention_days)
+            if quota_mb is not None:
+                self.quota_mb = int(quota_mb)
+
+    def _encode(self, frame):
+        height, width = frame.shape[:2]
+        if width > self.max_width:
+            height = int(height * self.max_width / width) & ~1
+            width = self.max_width
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return (jpeg.tobytes(), width, height) if ok else None
+
+    def _sample(self, now):
+        with self.lock:
+            sources = [(key, getter) for key, getter in self._sources.items() if key in self.enabled]
+        for key, slot_getter in sources:
+            slot = slot_getter()
+            frame = None
+            if slot is not None:
+                seq, frame, _ = slot.read()
+                if self._last_seen.get(key) == (slot, seq):
+                    frame = None
+            if frame is None:
+                self._end_stalled(key, now)
+                continue
+            self._last_seen[key] = (slot, seq)
+            started = time.perf_counter()
+            encoded = self._encode(frame)
+            self.encode_seconds += time.perf_counter() - started
+            if encoded is not None:
+                self.append(key, *encoded, ts=now)
+
+    def _end_stalled(self, key, now):
+        with self._write_lock:
+            with self.lock:
+                segment = self._open.get(key)
+                if segment is None or now - segment.end < GAP_SECONDS:
+                    return
+                del self._open[key]
+            self._close_segment(segment)
+
+    def append(self, key, jpeg, width, height, ts=None):
+        """Add one encoded frame to a camera's open segment, starting a new segment when due"""
+        ts = time.time() if ts is None else ts
+        with self._write_lock:
+            with self.lock:
+                if key not in self.enabled:
+                    return
+                segment = self._open.get(key)
+            if segment is not None and (ts - segment.start >= self.segment_seconds or ts - segment.end >= GAP_SECONDS
+                                        or (segment.writer.width, segment.writer.height) != (width, height)):
+                with self.lock:
+                    del self._open[key]
+                self._close_segment(segment)
+                segment = None
+            if segment is None:
+                segment = self._open_segment(key, width, height, ts)
+            offset = segment.writer.write(jpeg)
+            # Readers open the file themselves, so the frame must be out of our buffer
+            segment.writer.flush()
+            with self.lock:
+                segment.times.append(ts)
+                segment.offsets.append(offset)
+                segment.lengths.append(len(jpeg))
+                segment.end = ts
+                self.frames_written += 1
+
+    def _open_segment(self, key, width, height, ts):
+        stamp = datetime.fromtimestamp(ts)
+        directory = os.path.join(self.directory, key, stamp.strftime('%Y%m%d'))
+        os.makedirs(directory, exist_ok=True)
+        with self._db_lock:
+            with self._conn:
+                segment_id = self._conn.execute(
+                    'INSERT INTO recording_segments (camera, start, end, status, path, width, height) '
+                    "VALUES (?, ?, ?, 'recording', '', ?, ?)", (key, ts, ts, width, height)).lastrowid
+                path = os.path.join(directory, f"{key}_{stamp.strftime('%H%M%S')}_{segment_id}.avi")
+                self._conn.execute('UPDATE recording_segments SET path = ? WHERE id = ?', (path, segment_id))
+        segment = Segment(segment_id, key, path, MjpegAviWriter(path, self.fps, width, height), ts)
+        with self.lock:
+            self._open[key] = segment
+        return segment
+
+    def _close_segment(self, segment):
+        with self.lock:
+            frames = len(segment.times)
+            duration = segment.end - segment.start
+            blob = segment.frame_index()
+        fps = max(1.0, min(30.0, (frames - 1) / duration)) if frames > 1 and duration > 0 else self.fps
+        size = segment.writer.close(fps)
+        with self._db_lock:
+            with self._conn:
+                self._conn.execute("UPDATE recording_segments SET status = 'complete', end = ?, frames = ?, "
+                                   'bytes = ?, frame_index = ? WHERE id = ?',
+                                   (segment.end, frames, size, blob, segment.id))
+        with self.lock:
+            self.stored_bytes += size
+            self.segments_closed += 1
+
+    def _sampler(self):
+        interval = 1.0 / self.fps
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                self._sample(started)
+            except Exception as e:
+                print(f"Error recording camera frames: {e}")
+            self._stop.wait(max(0.0, interval - (time.time() - started)))
+
+    def _segment_index(self, segment_id, blob):
+        """Decoded frame index of a closed segment, cached for repeated lookups"""
+        with self.lock:
+            index = self._index_cache.get(segment_id)
+            if index is not None:
+                self._index_cache.move_to_end(segment_id)
+                return index
+        index = unpack_index(blob)
+        with self.lock:
+            self._index_cache[segment_id] = index
+            while len(self._index_cache) > INDEX_CACHE_SEGMENTS:
+                self._index_cache.popitem(last=False)
+        return index
+
+    def _segments_between(self, key, since, until):
+        """(id, path, width, height, times, offsets, lengths) of segments overlapping [since, until], oldest first"""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, path, width, height, frame_index FROM recording_segments "
+                "WHERE camera = ? AND status = 'complete' AND start <= ? AND end >= ? ORDER BY start",
+                (key, until, since)).fetchall()
+        segments = []
+        for segment_id, path, width, height, blob in rows:
+            segments.append((segment_id, path, width, height) + self._segment_index(segment_id, blob))
+        with self.lock:
+            segment = self._open.get(key)
+            if segment is not None and segment.start <= until and segment.end >= since and segment.times:
+                segments.append((segment.id, segment.path, segment.writer.width, segment.writer.height,
+                                 list(segment.times), list(segment.offsets), list(segment.lengths)))
+        return segments
+
+    def frame_at(self, key, ts, tolerance=GAP_SECONDS):
+        """(JPEG bytes, capture time) of the last frame at or before ts, or None when nothing was recorded then"""
+        started = time.perf_counter()
+        found = None
+        with self.lock:
+            segment = self._open.get(key)
+            if segment is not None and segment.times and segment.start <= ts:
+                found = (segment.path, list(segment.times), segment.offsets, segment.lengths)
+        if found is None:
+            with self._db_lock:
+                row = self._conn.execute(
+                    "SELECT id, path, frame_index FROM recording_segments "
+                    "WHERE camera = ? AND status = 'complete' AND start <= ? ORDER BY start DESC LIMIT 1",
+                    (key, ts)).fetchone()
+            if row is None:
+                return None
+            found = (row[1],) + self._segment_index(row[0], row[2])
+        path, times, offsets, lengths = found
+        position = bisect_right(times, ts) - 1
+        if position < 0 or ts - times[position] > tolerance:
+            return None
+        try:
+            with open(path, 'rb') as segment:
+                segment.seek(offsets[position])
+                jpeg = segment.read(lengths[position])
+        except OSError:
+            return None  # deleted by the compactor since the lookup
+        with self.lock:
+            self.lookups += 1
+            self.lookup_seconds += time.perf_counter() - started
+        return jpeg, times[position]
+
+    def export(self, key, since, until):
+        """An MJPEG AVI of [since, until] as (size, chunk iterator), or None when nothing was recorded.
+
+        Sizes and offsets come from the index, so the headers are written
+        first and the frames are copied straight from the segment files.
+        Raises ValueError for a range longer than MAX_EXPORT_SECONDS.
+        """
+        if until <= since:
+            raise ValueError('until must be after since')
+        if until - since > MAX_EXPORT_SECONDS:
+            raise ValueError(f'A video covers at most {MAX_EXPORT_SECONDS} seconds; request a shorter range')
+        plan, lengths, size = [], [], None
+        for _, path, width, height, times, offsets, frame_lengths in self._segments_between(key, since, until):
+            if size is None:
+                size = (width, height)
+            elif size != (width, height):
+                continue  # a resolution change: keep the frames matching the first segment
+            first, last = bisect_right(times, since - 1e-9), bisect_right(times, until)
+            if first >= last:
+                continue
+            try:
+                # Opened now so the compactor cannot delete the footage from under the response
+                handle = open(path, 'rb')
+            except OSError:
+                continue
+            plan.append((handle, offsets[first:last], frame_lengths[first:last], times[first], times[last - 1]))
+            lengths.extend(frame_lengths[first:last])
+        if not lengths:
+            return None
+
+        movi_size = 4 + sum(8 + length + (length & 1) for length in lengths)
+        duration = max(plan[-1][4] - plan[0][3], 1.0 / self.fps)
+        fps = max(1.0, min(30.0, (len(lengths) - 1) / duration)) if len(lengths) > 1 else self.fps
+        header = avi_header(len(lengths), fps, size[0], size[1], max(lengths), movi_size)
+        index = avi_index(lengths)
+
+        def chunks():
+            try:
+                yield header
+                for handle, offsets, frame_lengths, _, _ in plan:
+                    for offset, length in zip(offsets, frame_lengths):
+                        handle.seek(offset)
+                        yield avi_chunk(handle.read(length))
+                yield index
+            finally:
+                for handle, *_ in plan:
+                    handle.close()
+
+        return AVI_HEADER_SIZE - 4 + movi_size + len(index), chunks()
+
+    @staticmethod
+    def _entry(row):
+        segment_id, camera, start, end, status, width, height, frames, size = row
+        return {
+            'id': segment_id,
+            'camera': camera,
+            'start': datetime.fromtimestamp(start).isoformat(),
+            'end': datetime.fromtimestamp(end).isoformat(),
+            'status': status,
+            'width': width,
+            'height': height,
+            'frames': frames,
+            'bytes': size
+        }
+
+    def segments(self, key=None, since=None, until=None, limit=200):
+        """Segments overlapping [since, until], newest first, without their frame indexes"""
+        clauses, params = [], []
+        if key is not None:
+            clauses.append('camera = ?')
+            params.append(key)
+        if since is not None:
+            clauses.append('end >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('start <= ?')
+            params.append(until)
+        where = f'WHERE {" AND ".join(clauses)} ' if clauses else ''
+        with self._db_lock:
+            rows = self._conn.execute(
+                'SELECT id, camera, start, end, status, width, height, frames, bytes FROM recording_segments '
+                f'{where}ORDER BY start DESC LIMIT ?', params + [limit]).fetchall()
+        entries = [self._entry(row) for row in rows]
+        with self.lock:
+            for entry in entries:
+                segment = self._open.get(entry['camera'])
+                if segment is not None and segment.id == entry['id']:
+                    entry['end'] = datetime.fromtimestamp(segment.end).isoformat()
+                    entry['frames'] = len(segment.times)
+        return entries
+
+    def _delete(self, rows):
+        """Remove segments (id, path, bytes), files first; returns the bytes freed"""
+        freed = 0
+        for segment_id, path, size in rows:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error deleting recording segment {segment_id}: {e}")
+                continue
+            freed += size
+            with self.lock:
+                self._index_cache.pop(segment_id, None)
+        with self._db_lock:
+            with self._conn:
+                self._conn.executemany('DELETE FROM recording_segments WHERE id = ?', [(row[0],) for row in rows])
+        with self.lock:
+            self.stored_bytes -= freed
+        return freed
+
+    def compact(self, now=None):
+        """Delete segments past retention, then the oldest until the recordings fit the quota.
+
+        Returns (deleted by age, deleted by quota).
+        """
+        now = time.time() if now is None else now
+        with self._db_lock:
+            expired = self._conn.execute(
+                "SELECT id, path, bytes FROM recording_segments WHERE status = 'complete' AND end < ?",
+                (now - self.retention_days * 86400,)).fetchall()
+        self._delete(expired)
+
+        over_quota = 0
+        quota = self.quota_mb * 1024 * 1024
+        while self.stored_bytes > quota:
+            with self._db_lock:
+                oldest = self._conn.execute(
+                    "SELECT id, path, bytes FROM recording_segments WHERE status = 'complete' "
+                    'ORDER BY start LIMIT 50').fetchall()
+            batch, excess = [], self.stored_bytes - quota
+            for row in oldest:
+                if excess <= 0:
+                    break
+                batch.append(row)
+                excess -= row[2]
+            if not batch:
+                break
+            self._delete(batch)
+            over_quota += len(batch)
+        with self.lock:
+            self.deleted_by_age += len(expired)
+            self.deleted_by_quota += over_quota
+        return len(expired), over_quota
+
+    def _compactor(self):
+        while not self._stop.wait(self.compact_interval):
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Error compacting recordings: {e}")
+
+    def close(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(5)
+        with self._write_lock:
+            with self.lock:
+                segments, self._open = list(self._open.values()), {}
+            for segment in segments:
+                self._close_segment(segment)
+        with self._db_lock:
+            self._conn.close()
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'directory': self.directory,
+                'fps': self.fps,
+                'segment_seconds': self.segment_seconds,
+                'retention_days': self.retention_days,
+                'quota_mb': self.quota_mb,
+                'enabled': sorted(self.enabled),
+                'recording': sorted(self._open),
+                'stored_mb': round(self.stored_bytes / (1024 * 1024), 2),
+                'frames_written': self.frames_written,
+                'avg_encode_ms': round(self.encode_seconds * 1000 / self.frames_written, 2)
+                if self.frames_written else None,
+                'segments_closed': self.segments_closed,
+                'deleted_by_age': self.deleted_by_age,
+                'deleted_by_quota': self.deleted_by_quota,
+                'lookups': self.lookups,
+                'avg_lookup_ms': round(self.lookup_seconds * 1000 / self.lookups, 3) if self.lookups else None
+            }
+
+
+def scan_for_frame(directory, ts, fps):
+    """The lookup without an index: pick the segment by file name, then walk its chunks"""
+    names = sorted(os.listdir(directory))
+    starts = [datetime.strptime(name.split('_')[-2], '%H%M%S') for name in names]
+    day = datetime.fromtimestamp(ts)
+    wanted = day.replace(year=1900, month=1, day=1)
+    position = max(bisect_right(starts, wanted) - 1, 0)
+    target = int((wanted - starts[position]).total_seconds() * fps)
+    with open(os.path.join(directory, names[position]), 'rb') as segment:
+        segment.seek(AVI_HEADER_SIZE)
+        for _ in range(target):
+            length = struct.unpack('<I', segment.read(8)[4:])[0]
+            segment.seek(length + (length & 1), 1)
+        length = struct.unpack('<I', segment.read(8)[4:])[0]
+        return segment.read(length)
+
+
+def run_benchmark(hours=(1, 6, 24), fps=2, lookups=500, directory=None):
+    """Frame-at-time and range lookup cost as recorded history grows, indexed vs. scanning segment files"""
+    import random
+    import tempfile
+    import numpy as np
+
+    directory = directory or tempfile.mkdtemp(prefix='recordings-')
+    recorder = ContinuousRecorder(os.path.join(directory, 'segments'), os.path.join(directory, 'bench.db'),
+                                  fps=fps, quota_mb=100000, start=False)
+    recorder.set_enabled('camera_1', True)
+    jpeg = cv2.imencode('.jpg', np.full((36, 64, 3), 90, np.uint8))[1].tobytes()
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp() - 86400
+    rng = random.Random(11)
+    rows = []
+    recorded = 0
+    for hour_mark in hours:
+        began = time.perf_counter()
+        while recorded < hour_mark * 3600 * fps:
+            recorder.append('camera_1', jpeg, 64, 36, start + recorded / fps)
+            recorded += 1
+        append_us = (time.perf_counter() - began) * 1e6 / recorded
+        end = start + recorded / fps
+
+        times = [rng.uniform(start, end - 1) for _ in range(lookups)]
+        began = time.perf_counter()
+        for ts in times:
+            recorder.frame_at('camera_1', ts)
+        indexed_ms = (time.perf_counter() - began) * 1000 / lookups
+
+        began = time.perf_counter()
+        for ts in times[:100]:
+            size, chunks = recorder.export('camera_1', ts - 60, ts)
+            for _ in chunks:
+                pass
+        export_ms = (time.perf_counter() - began) * 1000 / 100
+
+        day = os.path.join(recorder.directory, 'camera_1', datetime.fromtimestamp(start).strftime('%Y%m%d'))
+        began = time.perf_counter()
+        for ts in times[:100]:
+            scan_for_frame(day, ts, fps)
+        scan_ms = (time.perf_counter() - began) * 1000 / 100
+        rows.append((hour_mark, recorder.to_dict()['segments_closed'], append_us, indexed_ms, export_ms, scan_ms))
+
+    began = time.perf_counter()
+    recorder.configure(quota_mb=1)
+    by_age, by_quota = recorder.compact()
+    compact_ms = (time.perf_counter() - began) * 1000
+    recorder.close()
+    return rows, by_quota, compact_ms
+
+
+if __name__ == '__main__':
+    rows, deleted, compact_ms = run_benchmark()
+    print("Continuous recording: one camera at 2 fps, 60 s segments")
+    for hours, segments, append_us, indexed_ms, export_ms, scan_ms in rows:
+        print(f"  {hours:>3} h ({segments:>5} segments): append {append_us:5.1f} us/frame   "
+              f"frame at time {indexed_ms:6.3f} ms (scanning files {scan_ms:6.2f} ms)   "
+              f"60 s export {export_ms:6.2f} ms")
+    print(f"  compacting to a 1 MB quota deleted {deleted} segments in {compact_ms:.0f} ms")
@@ -0,0 +1,472 @@
+import os
+import cv2
+import time
+import struct
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from report_store import REPORT_DB
+
+EVIDENCE_DIR = os.environ.get('EVIDENCE_DIR', 'evidence')
+EVIDENCE_FPS = 4
+PRE_EVENT_SECONDS = 15    # VILA answers seconds after the frames it saw, so look back generously
+POST_EVENT_SECONDS = 5
+MAX_CLIP_SECONDS = 60     # repeated triggers extend a recording clip up to this length
+RING_BYTES = 8 * 1024 * 1024
+RETENTION_DAYS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evidence_clips (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    camera TEXT NOT NULL,
+    report_id INTEGER,
+    triggered REAL NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    status TEXT NOT NULL,
+    path TEXT,
+    frames INTEGER,
+    bytes INTEGER,
+    write_ms REAL
+);
+CREATE INDEX IF NOT EXISTS evidence_clips_report ON evidence_clips (report_id);
+CREATE INDEX IF NOT EXISTS evidence_clips_camera ON evidence_clips (camera, triggered);
+"""
+
+
+def avi_header(frames, fps, width, height, largest, movi_size):
+    """RIFF and AVI headers up to the 'movi' tag; always the same length, so a header can be rewritten in place"""
+    idx1_size = 16 * frames
+    rate = int(round(fps * 1000))
+    avih = struct.pack('<14I', int(1e6 / fps), largest * int(fps + 1), 0, 0x10, frames, 0, 1,
+                       largest, width, height, 0, 0, 0, 0)
+    strh = b'vidsMJPG' + struct.pack('<IHHIIIIIIIIhhhh', 0, 0, 0, 0, 1000, rate, 0, frames,
+                                     largest, 0xFFFFFFFF, 0, 0, 0, width, height)
+    strf = struct.pack('<IiiHH4sIiiII', 40, width, height, 1, 24, b'MJPG', width * height * 3, 0, 0, 0, 0)
+    strl = b'strl' + b'strh' + struct.pack('<I', len(strh)) + strh + b'strf' + struct.pack('<I', len(strf)) + strf
+    hdrl = b'hdrl' + b'avih' + struct.pack('<I', len(avih)) + avih + b'LIST' + struct.pack('<I', len(strl)) + strl
+    riff_size = 4 + 8 + len(hdrl) + 8 + movi_size + 8 + idx1_size
+    return (b'RIFF' + struct.pack('<I', riff_size) + b'AVI ' + b'LIST' + struct.pack('<I', len(hdrl)) + hdrl +
+            b'LIST' + struct.pack('<I', movi_size) + b'movi')
+
+
+def avi_index(lengths):
+    """idx1 chunk for JPEG frames of these lengths stored back to back after the 'movi' tag"""
+    index = []
+    offset = 4  # idx1 offsets count from the 'movi' tag
+    for length in lengths:
+        index.append(b'00dc' + struct.pack('<III', 0x10, offset, length))
+        offset += 8 + length + (length & 1)
+    return b'idx1' + struct.pack('<I', 16 * len(index)) + b''.join(index)
+
+
+def avi_chunk(jpeg):
+    """One frame's chunk in the 'movi' list, padded to an even length"""
+    return b'00dc' + struct.pack('<I', len(jpeg)) + jpeg + (b'\0' if len(jpeg) & 1 else b'')
+
+
+AVI_HEADER_SIZE = len(avi_header(0, 1, 0, 0, 0, 4))
+
+
+class MjpegAviWriter:
+    """Appends JPEG frames to an MJPEG AVI as they arrive.
+
+    The headers are written with placeholder counts first; close() appends
+    the index and rewrites them with the real frame count, sizes and rate.
+    write() returns where the frame's JPEG data starts in the file, so a
+    caller can index frames and read one back without parsing the file.
+    """
+
+    def __init__(self, path, fps, width, height):
+        self.path = path
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.lengths = []
+        self.largest = 0
+        self.size = AVI_HEADER_SIZE
+        self._file = open(path, 'wb')
+        self._file.write(avi_header(0, fps, width, height, 0, 4))
+
+    def write(self, jpeg):
+        self._file.write(avi_chunk(jpeg))
+        offset = self.size + 8
+        self.size += 8 + len(jpeg) + (len(jpeg) & 1)
+        self.lengths.append(len(jpeg))
+        self.largest = max(self.largest, len(jpeg))
+        return offset
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self, fps=None):
+        """Finish the file; fps replaces the nominal rate given at open. Returns bytes written"""
+        fps = fps or self.fps
+        self._file.write(avi_index(self.lengths))
+        self._file.seek(0)
+        self._file.write(avi_header(len(self.lengths), fps, self.width, self.height, self.largest,
+                                    self.size - AVI_HEADER_SIZE + 4))
+        self._file.close()
+        return self.size + 8 + 16 * len(self.lengths)
+
+
+def write_mjpeg_avi(path, jpegs, fps, width, height):
+    """Write already-encoded JPEG frames into an MJPEG AVI without re-encoding; returns bytes written"""
+    writer = MjpegAviWriter(path, fps, width, height)
+    try:
+        for jpeg in jpegs:
+            writer.write(jpeg)
+    finally:
+        size = writer.close()
+    return size
+
+
+class EvidenceRecorder:
+    """Pre-event rings of JPEG frames per camera, and clips written around anomalies.
+
+    A sampler thread reads each source's latest frame from its FrameSlot at
+    `fps`, encodes it once and keeps the last pre + post + a few seconds
+    of JPEGs per camera (bounded by ring_bytes). Capture threads do no
+    extra work and never wait on it. trigger() opens a clip with the ring's
+    last pre_seconds, and every frame sampled until post_seconds after the
+    trigger goes straight into the clip, so an extended clip never depends
+    on the ring still holding its early frames. When the post-event time
+    has passed the clip's frames are handed to a small writer pool, which
+    packs the JPEGs into an MJPEG AVI as they are, without decoding. A
+    trigger while a clip of the same camera is still recording extends
+    that clip instead of starting an overlapping one.
+
+    Clips are indexed in SQLite with the id of the report that triggered
+    them. Each write records its duration, so throughput per concurrent
+    clip shows up in to_dict().
+    """
+
+    def __init__(self, directory=None, path=None, fps=EVIDENCE_FPS, pre_seconds=PRE_EVENT_SECONDS,
+                 post_seconds=POST_EVENT_SECONDS, max_width=640, quality=75, writers=2,
+                 ring_bytes=RING_BYTES, retention_days=RETENTION_DAYS):
+        self.directory = directory or EVIDENCE_DIR
+        self.path = path or REPORT_DB
+        self.fps = fps
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_width = max_width
+        self.quality = quality
+        self.ring_bytes = ring_bytes
+        self.retention_days = retention_days
+        self.lock = threading.Lock()
+        self._sources = {}
+        self._rings = {}
+        self._ring_sizes = {}
+        self._last_seen = {}
+        self._recording = {}
+        self._writers = ThreadPoolExecutor(max_workers=writers, thread_name_prefix='evidence-writer')
+        self._stop = threading.Event()
+        self.frames_encoded = 0
+        self.encode_seconds = 0.0
+        self.clips_written = 0
+        self.clip_failures = 0
+        self.bytes_written = 0
+        self.write_seconds = 0.0
+        self.writing = 0
+        self.peak_writing = 0
+        self._write_rates = deque(maxlen=100)
+
+        os.makedirs(self.directory, exist_ok=True)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        with self._conn:
+            # Clips cut short by a restart lost their post-event frames with the process
+            self._conn.execute("UPDATE evidence_clips SET status = 'failed' WHERE status = 'recording'")
+        self._pruned = 0.0
+        self._thread = threading.Thread(target=self._sampler, daemon=True)
+        self._thread.start()
+
+    def add_source(self, key, slot_getter):
+        """Record from the FrameSlot slot_getter() returns; None while the source is stopped"""
+        with self.lock:
+            self._sources[key] = slot_getter
+            self._rings.setdefault(key, deque())
+            self._ring_sizes.setdefault(key, 0)
+
+    def remove_source(self, key):
+        with self.lock:
+            self._sources.pop(key, None)
+            self._rings.pop(key, None)
+            self._ring_sizes.pop(key, None)
+            self._last_seen.pop(key, None)
+
+    def _encode(self, frame):
+        height, width = frame.shape[:2]
+        if width > self.max_width:
+            height = int(height * self.max_width / width) & ~1
+            width = self.max_width
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return (jpeg.tobytes(), width, height) if ok else None
+
+    def _sample(self, now):
+        with self.lock:
+            sources = list(self._sources.items())
+        keep = self.pre_seconds + self.post_seconds + 5
+        for key, slot_getter in sources:
+            slot = slot_getter()
+            if slot is None:
+                continue
+            seq, frame, _ = slot.read()
+            if frame is None or self._last_seen.get(key) == (slot, seq):
+                continue
+            self._last_seen[key] = (slot, seq)
+            started = time.perf_counter()
+            encoded = self._encode(frame)
+            self.encode_seconds += time.perf_counter() - started
+            if encoded is None:
+                continue
+            self.frames_encoded += 1
+            with self.lock:
+                ring = self._rings.get(key)
+                if ring is None:
+                    continue
+                entry = (now,) + encoded
+                ring.append(entry)
+                clip = self._recording.get(key)
+                if clip is not None and now <= clip['end']:
+                    clip['frames'].append(entry)
+                size = self._ring_sizes[key] + len(encoded[0])
+                while ring and (ring[0][0] < now - keep or size > self.ring_bytes):
+                    size -= len(ring.popleft()[1])
+                self._ring_sizes[key] = size
+
+    def _sampler(self):
+        interval = 1.0 / self.fps
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                self._sample(started)
+                self._finish_due(started)
+                if started - self._pruned > 3600:
+                    self._pruned = started
+                    self.prune()
+            except Exception as e:
+                print(f"Error sampling evidence frames: {e}")
+            self._stop.wait(max(0.0, interval - (time.time() - started)))
+
+    def trigger(self, key, report_id=None, now=None):
+        """Start a clip around now for a source; returns the clip id, or None if the source is not recording"""
+        now = time.time() if now is None else now
+        with self.lock:
+            if key not in self._sources or not self._rings.get(key):
+                return None
+            clip = self._recording.get(key)
+            if clip is not None:
+                # Still recording: extend it rather than overlap it
+                clip['end'] = min(max(clip['end'], now + self.post_seconds), clip['start'] + MAX_CLIP_SECONDS)
+                return clip['id']
+            start = now - self.pre_seconds
+            clip = {'camera': key, 'report_id': report_id, 'start': start, 'end': now + self.post_seconds,
+                    'frames': [entry for entry in self._rings[key] if entry[0] >= start]}
+            # The row exists before the clip is published, so a concurrent trigger always finds its id
+            with self._db_lock:
+                with self._conn:
+                    clip['id'] = self._conn.execute(
+                        'INSERT INTO evidence_clips (camera, report_id, triggered, start, end, status) '
+                        "VALUES (?, ?, ?, ?, ?, 'recording')",
+                        (key, report_id, now, clip['start'], clip['end'])).lastrowid
+            self._recording[key] = clip
+        return clip['id']
+
+    def _finish_due(self, now):
+        """Hand clips whose post-event time has passed to the writers"""
+        with self.lock:
+            due = [clip for clip in self._recording.values() if clip['end'] <= now]
+            for clip in due:
+                del self._recording[clip['camera']]
+                clip['frames'] = [entry for entry in clip['frames'] if entry[0] <= clip['end']]
+        for clip in due:
+            self._writers.submit(self._write_clip, clip)
+
+    def _write_clip(self, clip):
+        frames = clip.pop('frames')
+        # A resolution change mid-clip: keep the frames matching the first one
+        if frames:
+            width, height = frames[0][2], frames[0][3]
+            frames = [entry for entry in frames if (entry[2], entry[3]) == (width, height)]
+        status, path, written, write_ms = 'empty', None, 0, None
+        if frames:
+            # Record the footage actually written, not the window asked for
+            clip['start'], clip['end'] = frames[0][0], frames[-1][0]
+            with self.lock:
+                self.writing += 1
+                self.peak_writing = max(self.peak_writing, self.writing)
+            directory = os.path.join(self.directory, clip['camera'])
+            stamp = datetime.fromtimestamp(clip['start']).strftime('%Y%m%d-%H%M%S')
+            path = os.path.join(directory, f"clip_{clip['id']}_{stamp}.avi")
+            duration = max(frames[-1][0] - frames[0][0], 1.0 / self.fps)
+            fps = max(1.0, min(30.0, (len(frames) - 1) / duration)) if len(frames) > 1 else self.fps
+            started = time.perf_counter()
+            try:
+                os.makedirs(directory, exist_ok=True)
+                written = write_mjpeg_avi(path, [entry[1] for entry in frames], fps, width, height)
+                status = 'ready'
+            except OSError as e:
+                print(f"Error writing evidence clip {clip['id']}: {e}")
+                status, path = 'failed', None
+            elapsed = time.perf_counter() - started
+            write_ms = elapsed * 1000
+            with self.lock:
+                self.writing -= 1
+                if status == 'ready':
+                    self.clips_written += 1
+                    self.bytes_written += written
+                    self.write_seconds += elapsed
+                    self._write_rates.append(written / max(elapsed, 1e-6))
+                else:
+                    self.clip_failures += 1
+        with self._db_lock:
+            with self._conn:
+                self._conn.execute('UPDATE evidence_clips SET status = ?, path = ?, frames = ?, bytes = ?, '
+                                   'write_ms = ?, start = ?, end = ? WHERE id = ?',
+                                   (status, path, len(frames), written, write_ms, clip['start'], clip['end'],
+                                    clip['id']))
+
+    @staticmethod
+    def _entry(row):
+        clip_id, camera, report_id, triggered, start, end, status, path, frames, size, write_ms = row
+        return {
+            'id': clip_id,
+            'camera': camera,
+            'report_id': report_id,
+            'triggered': datetime.fromtimestamp(triggered).isoformat(),
+            'start': datetime.fromtimestamp(start).isoformat(),
+            'end': datetime.fromtimestamp(end).isoformat(),
+            'status': status,
+            'path': path,
+            'frames': frames,
+            'bytes': size,
+            'write_ms': round(write_ms, 1) if write_ms is not None else None
+        }
+
+    def clips(self, camera=None, report_id=None, limit=50):
+        """Newest-first clips, optionally of one camera or one report"""
+        clauses, params = [], []
+        if camera is not None:
+            clauses.append('camera = ?')
+            params.append(camera)
+        if report_id is not None:
+            clauses.append('report_id = ?')
+            params.append(report_id)
+        where = f'WHERE {" AND ".join(clauses)} ' if clauses else ''
+        with self._db_lock:
+            rows = self._conn.execute(
+                'SELECT id, camera, report_id, triggered, start, end, status, path, frames, bytes, write_ms '
+                f'FROM evidence_clips {where}ORDER BY id DESC LIMIT ?', params + [limit]).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def clip(self, clip_id):
+        with self._db_lock:
+            row = self._conn.execute(
+                'SELECT id, camera, report_id, triggered, start, end, status, path, frames, bytes, write_ms '
+                'FROM evidence_clips WHERE id = ?', (clip_id,)).fetchone()
+        return self._entry(row) if row else None
+
+    def prune(self):
+        """Delete clips older than the retention period, files first"""
+        cutoff = time.time() - self.retention_days * 86400
+        with self._db_lock:
+            rows = self._conn.execute('SELECT id, path FROM evidence_clips WHERE triggered < ?', (cutoff,)).fetchall()
+        for _, path in rows:
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        with self._db_lock:
+            with self._conn:
+                self._conn.executemany('DELETE FROM evidence_clips WHERE id = ?', [(row[0],) for row in rows])
+        return len(rows)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(5)
+        self._writers.shutdown(wait=True)
+        with self._db_lock:
+            self._conn.close()
+
+    def to_dict(self):
+        with self.lock:
+            rates = sorted(self._write_rates)
+            return {
+                'directory': self.directory,
+                'fps': self.fps,
+                'pre_seconds': self.pre_seconds,
+                'post_seconds': self.post_seconds,
+                'sources': len(self._sources),
+                'ring_mb': round(sum(self._ring_sizes.values()) / (1024 * 1024), 2),
+                'frames_encoded': self.frames_encoded,
+                'avg_encode_ms': round(self.encode_seconds * 1000 / self.frames_encoded, 2)
+                if self.frames_encoded else None,
+                'recording': len(self._recording),
+                'writing': self.writing,
+                'peak_concurrent_writes': self.peak_writing,
+                'clips_written': self.clips_written,
+                'clip_failures': self.clip_failures,
+                'mb_written': round(self.bytes_written / (1024 * 1024), 2),
+                'write_mb_s_per_clip': {
+                    'p50': round(rates[len(rates) // 2] / (1024 * 1024), 1),
+                    'min': round(rates[0] / (1024 * 1024), 1)
+                } if rates else None
+            }
+
+
+def run_benchmark(concurrency=(1, 2, 4, 8), clip_seconds=20, directory=None):
+    """Disk throughput per clip and in total with N clips written at once"""
+    import tempfile
+    import numpy as np
+
+    directory = directory or tempfile.mkdtemp(prefix='evidence-')
+    rng = np.random.default_rng(5)
+    # Textured frames compress like camera footage rather than like a flat colour
+    base = cv2.GaussianBlur(rng.integers(0, 255, (360, 640, 3), dtype=np.uint8), (7, 7), 0)
+    started = time.perf_counter()
+    jpegs = []
+    for index in range(clip_seconds * EVIDENCE_FPS):
+        frame = np.roll(base, index * 4, axis=1)
+        jpegs.append(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 75])[1].tobytes())
+    encode_ms = (time.perf_counter() - started) * 1000 / len(jpegs)
+
+    rows = []
+    for clips in concurrency:
+        durations = [0.0] * clips
+
+        def write(index):
+            path = os.path.join(directory, f'bench_{clips}_{index}.avi')
+            began = time.perf_counter()
+            size = write_mjpeg_avi(path, jpegs, EVIDENCE_FPS, 640, 360)
+            with open(path, 'rb+') as written:
+                os.fsync(written.fileno())
+            durations[index] = time.perf_counter() - began
+            return size
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clips) as pool:
+            sizes = list(pool.map(write, range(clips)))
+        wall = time.perf_counter() - began
+        size_mb = sizes[0] / (1024 * 1024)
+        per_clip = sorted(size_mb / duration for duration in durations)
+        rows.append((clips, size_mb, per_clip[len(per_clip) // 2], sum(sizes) / (1024 * 1024) / wall))
+    return encode_ms, rows
+
+
+if __name__ == '__main__':
+    encode_ms, rows = run_benchmark()
+    print(f"Evidence clips: 20 s at {EVIDENCE_FPS} fps, 640x360; JPEG encode {encode_ms:.2f} ms/frame on the sampler")
+    for clips, size_mb, per_clip, total in rows:
+        print(f"  {clips} concurrent clip(s) of {size_mb:.1f} MB: {per_clip:7.1f} MB/s per clip, {total:7.1f} MB/s total")
@@ -0,0 +1,137 @@
+import cv2
+import time
+import base64
+import threading
+
+
+class RateCounter:
+    """Counts events and reports a per-second rate over a rolling one-second window"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total = 0
+        self.rate = 0.0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def add(self, count=1):
+        with self.lock:
+            self.total += count
+            self._window_count += count
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if elapsed >= 1.0:
+                self.rate = self._window_count / elapsed
+                self._window_start = now
+                self._window_count = 0
+
+    def current_rate(self):
+        # Decay to zero when nothing has happened for a while
+        if time.monotonic() - self._window_start > 2.0:
+            return 0.0
+        return self.rate
+
+
+class EncodedFrame:
+    """JPEG bytes for one frame in one output profile, shared by every viewer"""
+
+    __slots__ = ('epoch', 'seq', 'jpeg', 'etag', 'timestamp', '_data_url')
+
+    def __init__(self, epoch, seq, jpeg, etag, timestamp):
+        self.epoch = epoch
+        self.seq = seq
+        self.jpeg = jpeg
+        self.etag = etag
+        self.timestamp = timestamp
+        self._data_url = None
+
+    @property
+    def data_url(self):
+        """Base64 data URL for the JSON polling endpoints, built at most once"""
+        if self._data_url is None:
+            self._data_url = 'data:image/jpeg;base64,' + base64.b64encode(self.jpeg).decode('utf-8')
+        return self._data_url
+
+
+class JpegFrameCache:
+    """Encode-once JPEG cache for a single camera's FrameSlot.
+
+    Each new frame is resized and encoded at most once per output profile
+    (max width, quality, overlay); every request for the same frame gets the
+    same bytes and ETag, so unchanged polls can be answered with a 304.
+    Encode time is reported to the shared EncodeBudget when one is given.
+    """
+
+    def __init__(self, name, budget=None):
+        self.name = name
+        self.budget = budget
+        self._entries = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.requests = RateCounter()
+        self.encodes = RateCounter()
+        self.not_modified = RateCounter()
+
+    def _profile_lock(self, key):
+        lock = self._locks.get(key)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(key, threading.Lock())
+        return lock
+
+    def get(self, frame_slot, max_width=640, quality=75, overlay=None):
+        """Return the EncodedFrame for the slot's latest frame, or None if there is none"""
+        self.requests.add()
+        seq, frame, timestamp = frame_slot.read()
+        if frame is None:
+            return None
+
+        key = (max_width, quality, getattr(overlay, '__name__', None))
+        entry = self._entries.get(key)
+        if entry is not None and entry.epoch == frame_slot.epoch and entry.seq == seq:
+            return entry
+
+        # Concurrent requests for the same new frame wait for one encode
+        with self._profile_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and entry.epoch == frame_slot.epoch and entry.seq >= seq:
+                return entry
+
+            started = time.monotonic()
+            height, width = frame.shape[:2]
+            if max_width and width > max_width:
+                new_height = int(height * (max_width / width))
+                image = cv2.resize(frame, (max_width, new_height))
+            elif overlay is not None:
+                # Published frames are read-only; draw on a private copy
+                image = frame.copy()
+            else:
+                image = frame
+
+            if overlay is not None:
+                overlay(image)
+
+            ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ok:
+                return None
+            self.encodes.add()
+            if self.budget is not None:
+                self.budget.record_encode(time.monotonic() - started)
+
+            etag = f"{self.name}-{frame_slot.epoch}-{seq}-{max_width or 0}-{quality}-{key[2] or 'raw'}"
+            entry = EncodedFrame(frame_slot.epoch, seq, buffer.tobytes(), etag, timestamp)
+            self._entries[key] = entry
+            return entry
+
+    def record_not_modified(self):
+        self.not_modified.add()
+
+    def to_dict(self):
+        return {
+            'requests': self.requests.total,
+            'encodes': self.encodes.total,
+            'not_modified': self.not_modified.total,
+            'requests_per_second': round(self.requests.current_rate(), 1),
+            'encodes_per_second': round(self.encodes.current_rate(), 1),
+            'profiles': len(self._entries)
+        }
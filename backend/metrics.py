@@ -0,0 +1,295 @@
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+from report_store import REPORT_DB
+
+ALL = '*'   # series key summing every camera
+
+# Rollup resolutions: bucket width in seconds and how many buckets are kept
+RESOLUTIONS = {
+    'minute': (60, 1440),     # 24 hours
+    'hour': (3600, 24 * 90),  # 90 days
+    'day': (86400, 730)       # 2 years
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metric_rollups (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count REAL NOT NULL,
+    sum REAL NOT NULL,
+    min REAL,
+    max REAL,
+    PRIMARY KEY (name, key, resolution, bucket)
+);
+CREATE INDEX IF NOT EXISTS metric_rollups_expiry ON metric_rollups (resolution, bucket);
+"""
+
+
+def utc_offset():
+    """Seconds east of UTC, so day buckets start at local midnight"""
+    return datetime.now().astimezone().utcoffset().total_seconds()
+
+
+class Rollup:
+    """Fixed ring of time buckets, each holding count, sum, min and max"""
+
+    __slots__ = ('width', 'size', 'bucket', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, width, size):
+        self.width = width
+        self.size = size
+        self.bucket = [-1] * size
+        self.count = [0.0] * size
+        self.sum = [0.0] * size
+        self.min = [None] * size
+        self.max = [None] * size
+
+    def add(self, bucket, value, count=1.0, low=None, high=None):
+        index = bucket % self.size
+        if self.bucket[index] != bucket:
+            if bucket < self.bucket[index]:
+                return False  # older than everything kept
+            self.bucket[index] = bucket
+            self.count[index] = self.sum[index] = 0.0
+            self.min[index] = self.max[index] = None
+        low = value if low is None else low
+        high = value if high is None else high
+        self.count[index] += count
+        self.sum[index] += value
+        self.min[index] = low if self.min[index] is None else min(self.min[index], low)
+        self.max[index] = high if self.max[index] is None else max(self.max[index], high)
+        return True
+
+    def get(self, bucket):
+        index = bucket % self.size
+        if self.bucket[index] != bucket:
+            return None
+        return self.count[index], self.sum[index], self.min[index], self.max[index]
+
+
+class MetricsStore:
+    """Time-series metrics pre-aggregated into minute, hour and day rollups.
+
+    record() adds a sample to one bucket of each resolution, for its key
+    (a camera) and for the ALL key, so it costs the same however much
+    history there is. Each rollup is a fixed ring, and a query reads at
+    most one ring's worth of buckets: its cost depends on the window asked
+    for, never on how long the system has been recording.
+
+    Counters record the increment as the value (read 'sum'); gauges and
+    latencies record the measurement (read 'avg', 'min', 'max'). Touched
+    buckets are written to SQLite every flush_interval seconds and loaded
+    back on start, and rows past each resolution's retention are deleted.
+    """
+
+    def __init__(self, path=None, flush_interval=30.0):
+        self.path = path or REPORT_DB
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.offset = utc_offset()
+        self._series = {}
+        self._dirty = set()
+        self._stop = threading.Event()
+        self.samples = 0
+        self.flushes = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._load()
+        self._thread = threading.Thread(target=self._flusher, daemon=True)
+        self._thread.start()
+
+    def _bucket(self, resolution, ts):
+        width = RESOLUTIONS[resolution][0]
+        return int((ts + self.offset) // width)
+
+    def _bucket_time(self, resolution, bucket):
+        return bucket * RESOLUTIONS[resolution][0] - self.offset
+
+    def _rollups(self, name, key):
+        """Rollups of one series, created on first use; call under lock"""
+        series = self._series.get((name, key))
+        if series is None:
+            series = self._series[(name, key)] = {resolution: Rollup(width, size)
+                                                  for resolution, (width, size) in RESOLUTIONS.items()}
+        return series
+
+    def _load(self):
+        now = time.time()
+        for resolution, (_, size) in RESOLUTIONS.items():
+            oldest = self._bucket(resolution, now) - size + 1
+            rows = self._conn.execute(
+                'SELECT name, key, bucket, count, sum, min, max FROM metric_rollups '
+                'WHERE resolution = ? AND bucket >= ? ORDER BY bucket', (resolution, oldest))
+            for name, key, bucket, count, total, low, high in rows:
+                self._rollups(name, key)[resolution].add(bucket, total, count, low, high)
+
+    def record(self, name, value=1.0, key=None, ts=None):
+        """Add a sample to a series of one key (a camera) and to its ALL total"""
+        ts = time.time() if ts is None else ts
+        value = float(value)
+        keys = (ALL,) if key in (None, ALL) else (key, ALL)
+        with self.lock:
+            self.samples += 1
+            for resolution in RESOLUTIONS:
+                bucket = self._bucket(resolution, ts)
+                for series_key in keys:
+                    if self._rollups(name, series_key)[resolution].add(bucket, value):
+                        self._dirty.add((name, series_key, resolution, bucket))
+
+    def series(self, name, key=None, resolution='hour', since=None, until=None):
+        """Buckets of one series between since and until, oldest first.
+
+        Empty buckets are included with count 0, so charts get an evenly
+        spaced axis. Raises ValueError for an unknown resolution or a
+        window longer than the resolution keeps.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f'resolution must be one of {", ".join(RESOLUTIONS)}')
+        width, size = RESOLUTIONS[resolution]
+        until = time.time() if until is None else until
+        since = until - 24 * width if since is None else since
+        first, last = self._bucket(resolution, since), self._bucket(resolution, until)
+        if last - first >= size:
+            raise ValueError(f'{resolution} rollups cover at most {size} buckets; use a coarser resolution')
+        with self.lock:
+            rollup = self._series.get((name, key or ALL), {}).get(resolution)
+            buckets = []
+            for bucket in range(first, last + 1):
+                values = rollup.get(bucket) if rollup else None
+                count, total, low, high = values or (0.0, 0.0, None, None)
+                buckets.append({
+                    'time': datetime.fromtimestamp(self._bucket_time(resolution, bucket)).isoformat(),
+                    'count': count,
+                    'sum': round(total, 4),
+                    'avg': round(total / count, 4) if count else None,
+                    'min': low,
+                    'max': high
+                })
+        return buckets
+
+    def total(self, name, key=None, seconds=86400, until=None):
+        """(count, sum) of a series over the last `seconds`, from the coarsest rollup that fits"""
+        for resolution in ('minute', 'hour', 'day'):
+            width, size = RESOLUTIONS[resolution]
+            if seconds / width <= 180 or resolution == 'day':
+                break
+        until = time.time() if until is None else until
+        since = max(until - seconds, until - (size - 1) * width)
+        count = total = 0.0
+        for bucket in self.series(name, key, resolution, since, until):
+            count += bucket['count']
+            total += bucket['sum']
+        return count, total
+
+    def names(self):
+        with self.lock:
+            return sorted({name for name, _ in self._series})
+
+    def keys(self, name):
+        with self.lock:
+            return sorted(key for series_name, key in self._series if series_name == name)
+
+    def flush(self):
+        """Write every bucket touched since the last flush and drop expired rows"""
+        with self.lock:
+            dirty, self._dirty = self._dirty, set()
+            rows = []
+            for name, key, resolution, bucket in dirty:
+                values = self._series[(name, key)][resolution].get(bucket)
+                if values is not None:
+                    rows.append((name, key, resolution, bucket) + values)
+        now = time.time()
+        try:
+            with self._conn:
+                self._conn.executemany('INSERT OR REPLACE INTO metric_rollups '
+                                       '(name, key, resolution, bucket, count, sum, min, max) '
+                                       'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                for resolution, (_, size) in RESOLUTIONS.items():
+                    self._conn.execute('DELETE FROM metric_rollups WHERE resolution = ? AND bucket < ?',
+                                       (resolution, self._bucket(resolution, now) - size + 1))
+            self.flushes += 1
+        except sqlite3.Error as e:
+            print(f"Error writing {len(rows)} metric buckets: {e}")
+        return len(rows)
+
+    def _flusher(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(5)
+        self.flush()
+        self._conn.close()
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'path': self.path,
+                'series': len(self._series),
+                'samples': self.samples,
+                'pending_buckets': len(self._dirty),
+                'flushes': self.flushes,
+                'resolutions': {resolution: {'bucket_seconds': width, 'buckets_kept': size}
+                                for resolution, (width, size) in RESOLUTIONS.items()}
+            }
+
+
+def run_benchmark(history_days=(1, 30, 180), cameras=16, path=None, queries=200):
+    """Dashboard query latency as recorded history grows, and record() cost"""
+    import tempfile
+
+    path = path or os.path.join(tempfile.mkdtemp(prefix='metrics-'), 'bench.db')
+    store = MetricsStore(path, flush_interval=3600)
+    now = time.time()
+    rows = []
+    recorded_until = now
+    for days in history_days:
+        # Each camera: one scan every five minutes with its VILA latency
+        started = time.perf_counter()
+        samples = 0
+        ts = recorded_until - 1
+        while ts > now - days * 86400:
+            for camera in range(cameras):
+                key = f'camera_{camera}'
+                store.record('scans', 1, key, ts)
+                store.record('vila_latency', 2.0 + camera % 3, key, ts)
+                samples += 2
+            ts -= 300
+        recorded_until = now - days * 86400
+        record_us = (time.perf_counter() - started) * 1e6 / max(samples, 1)
+
+        started = time.perf_counter()
+        for _ in range(queries):
+            store.series('scans', None, 'hour', now - 86400, now)
+            store.series('vila_latency', 'camera_3', 'minute', now - 3600, now)
+            store.total('scans', None, 7 * 86400, now)
+        query_ms = (time.perf_counter() - started) * 1000 / queries
+        rows.append((days, record_us, query_ms))
+
+    started = time.perf_counter()
+    written = store.flush()
+    flush_ms = (time.perf_counter() - started) * 1000
+    store.close()
+    return rows, written, flush_ms
+
+
+if __name__ == '__main__':
+    rows, written, flush_ms = run_benchmark()
+    print("Metrics: 16 cameras, one scan every five minutes each")
+    for days, record_us, query_ms in rows:
+        print(f"  {days:>4} days of history: record {record_us:5.1f} us/sample   "
+              f"dashboard queries {query_ms:6.2f} ms")
+    print(f"  flushed {written} buckets in {flush_ms:.0f} ms")
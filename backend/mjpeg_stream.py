@@ -0,0 +1,186 @@
+import time
+import asyncio
+import threading
+import itertools
+
+BOUNDARY = 'frame'
+MIMETYPE = f'multipart/x-mixed-replace; boundary={BOUNDARY}'
+MAX_STREAM_FPS = 30
+
+
+class StreamViewer:
+    """Delivery counters for one connected MJPEG client"""
+
+    __slots__ = ('id', 'source', 'max_fps', 'adaptive', 'started', 'frames_sent', 'frames_skipped', 'bytes_sent')
+
+    def __init__(self, viewer_id, source, max_fps, adaptive=None):
+        self.id = viewer_id
+        self.source = source
+        self.max_fps = max_fps
+        self.adaptive = adaptive
+        self.started = time.monotonic()
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.bytes_sent = 0
+
+    def to_dict(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return {
+            'id': self.id,
+            'source': self.source,
+            'max_fps': self.max_fps,
+            'connected_seconds': round(elapsed, 1),
+            'frames_sent': self.frames_sent,
+            'frames_skipped': self.frames_skipped,
+            'fps': round(self.frames_sent / elapsed, 1),
+            'kbytes_per_second': round(self.bytes_sent / 1024 / elapsed, 1),
+            'profile': self.adaptive.to_dict() if self.adaptive else None
+        }
+
+
+class StreamRegistry:
+    """Tracks connected stream viewers so bandwidth per viewer can be inspected"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._viewers = {}
+        self.total_bytes_sent = 0
+        self.total_frames_sent = 0
+
+    def register(self, source, max_fps, adaptive=None):
+        with self._lock:
+            viewer = StreamViewer(next(self._ids), source, max_fps, adaptive)
+            self._viewers[viewer.id] = viewer
+            return viewer
+
+    def unregister(self, viewer):
+        with self._lock:
+            self._viewers.pop(viewer.id, None)
+            self.total_bytes_sent += viewer.bytes_sent
+            self.total_frames_sent += viewer.frames_sent
+
+    def to_dict(self):
+        with self._lock:
+            viewers = [viewer.to_dict() for viewer in self._viewers.values()]
+        return {
+            'active_viewers': len(viewers),
+            'viewers': viewers,
+            'closed_viewers_bytes_sent': self.total_bytes_sent,
+            'closed_viewers_frames_sent': self.total_frames_sent
+        }
+
+
+def parse_stream_fps(value, default=10):
+    """Clamp a client-requested frame-rate cap to what the server allows"""
+    try:
+        fps = float(value) if value is not None else default
+    except (TypeError, ValueError):
+        fps = default
+    return max(0.5, min(fps, MAX_STREAM_FPS))
+
+
+def multipart_chunk(jpeg):
+    """Wrap JPEG bytes as one part of a multipart/x-mixed-replace response"""
+    header = (
+        f'--{BOUNDARY}\r\n'
+        'Content-Type: image/jpeg\r\n'
+        f'Content-Length: {len(jpeg)}\r\n\r\n'
+    ).encode('ascii')
+    return header + jpeg + b'\r\n'
+
+
+def _next_frame(viewer, get_slot, frame_cache, encode_options, last_seq):
+    """Encode (or reuse) the newest frame and update skip counters"""
+    slot = get_slot()
+    encoded = frame_cache.get(slot, **encode_options)
+    if encoded is None or (encoded.epoch, encoded.seq) == last_seq:
+        return None
+    if last_seq is not None and last_seq[0] == encoded.epoch and encoded.seq > last_seq[1] + 1:
+        # Frames published while this client was busy are dropped, never queued
+        viewer.frames_skipped += encoded.seq - last_seq[1] - 1
+    return encoded
+
+
+def _adapted(adaptive, encode_options, max_fps):
+    """Encode options and frame interval for the next frame"""
+    if adaptive is None:
+        return encode_options, 1.0 / max_fps
+    profile_options, fps = adaptive.current()
+    return dict(encode_options, **profile_options), 1.0 / fps
+
+
+def mjpeg_generator(registry, source, get_slot, frame_cache, should_continue,
+                    max_fps=10, on_poll=None, adaptive=None, **encode_options):
+    """Blocking MJPEG generator for threaded WSGI servers (Flask).
+
+    Each iteration waits for a newer frame, respects the client's frame-rate
+    cap and always sends the latest frame. A slow client simply blocks the
+    write; when it resumes it gets the newest frame, so nothing piles up.
+    With an AdaptiveProfile, the time each write blocks picks the resolution,
+    quality and frame rate of the following frames; a FixedProfile is also
+    looked up per frame, so it follows the global encode budget.
+    """
+    viewer = registry.register(source, max_fps, adaptive)
+    last_seq = None
+    next_send = 0.0
+
+    try:
+        while should_continue():
+            if on_poll:
+                on_poll()
+            options, interval = _adapted(adaptive, encode_options, max_fps)
+
+            now = time.monotonic()
+            if now < next_send:
+                time.sleep(next_send - now)
+
+            slot = get_slot()
+            seen = last_seq[1] if last_seq and last_seq[0] == slot.epoch else 0
+            slot.wait_for_newer(seen, timeout=1.0)
+
+            encoded = _next_frame(viewer, get_slot, frame_cache, options, last_seq)
+            if encoded is None:
+                continue
+
+            chunk = multipart_chunk(encoded.jpeg)
+            # The server asks for the next chunk once this one is written
+            sent = time.monotonic()
+            yield chunk
+            if adaptive is not None:
+                adaptive.record_delivery(time.monotonic() - sent, interval)
+            viewer.frames_sent += 1
+            viewer.bytes_sent += len(chunk)
+            last_seq = (encoded.epoch, encoded.seq)
+            next_send = time.monotonic() + interval
+    finally:
+        registry.unregister(viewer)
+
+
+async def mjpeg_async_generator(registry, source, get_slot, frame_cache, should_continue,
+                                max_fps=10, on_poll=None, adaptive=None, **encode_options):
+    """Asyncio variant for FastAPI; polls the slot instead of blocking the event loop"""
+    viewer = registry.register(source, max_fps, adaptive)
+    last_seq = None
+
+    try:
+        while should_continue():
+            if on_poll:
+                on_poll()
+            options, interval = _adapted(adaptive, encode_options, max_fps)
+
+            started = time.monotonic()
+            encoded = _next_frame(viewer, get_slot, frame_cache, options, last_seq)
+            if encoded is not None:
+                chunk = multipart_chunk(encoded.jpeg)
+                sent = time.monotonic()
+                yield chunk
+                if adaptive is not None:
+                    adaptive.record_delivery(time.monotonic() - sent, interval)
+                viewer.frames_sent += 1
+                viewer.bytes_sent += len(chunk)
+                last_seq = (encoded.epoch, encoded.seq)
+
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        registry.unregister(viewer)
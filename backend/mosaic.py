@@ -0,0 +1,264 @@
+import cv2
+import math
+import time
+import threading
+import numpy as np
+
+from frame_slot import FrameSlot
+from frame_cache import JpegFrameCache
+
+MAX_MOSAIC_TILES = 25
+MAX_MOSAICS = 8              # distinct camera sets kept composed at once
+BACKGROUND = 32              # grey level behind letterboxed and offline tiles
+
+
+class TileSampler:
+    """Precomputed nearest-neighbour row/column indices for one source size.
+
+    Resampling is a single numpy fancy-index per tile, written straight into
+    the mosaic canvas; indices are only recomputed when a camera's resolution
+    changes.
+    """
+
+    __slots__ = ('source_shape', 'rows', 'cols', 'y', 'x')
+
+    def __init__(self, source_shape, tile_width, tile_height):
+        height, width = source_shape[:2]
+        scale = min(tile_width / width, tile_height / height)
+        out_width = max(1, int(width * scale))
+        out_height = max(1, int(height * scale))
+
+        self.source_shape = source_shape
+        self.rows = (np.arange(out_height) * (height / out_height)).astype(np.intp)[:, None]
+        self.cols = (np.arange(out_width) * (width / out_width)).astype(np.intp)
+        # Offsets that center the letterboxed image inside the tile
+        self.y = (tile_height - out_height) // 2
+        self.x = (tile_width - out_width) // 2
+
+
+class MosaicComposer:
+    """Tiles the latest frames of several cameras into one frame slot.
+
+    Behaves like a FrameSlot for JpegFrameCache and the MJPEG generators:
+    read() recomposes only when at least one camera published a new frame,
+    and only the changed tiles are resampled, so the mosaic is composed and
+    encoded once per change no matter how many viewers poll it.
+    """
+
+    def __init__(self, name, get_sources, tile_width=320, tile_height=180, budget=None):
+        self.name = name
+        # get_sources() -> [(label, FrameSlot or None), ...] in tile order
+        self.get_sources = get_sources
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.slot = FrameSlot()
+        self.frame_cache = JpegFrameCache(name, budget)
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self._drawn = []
+        self._samplers = {}
+        self.compositions = 0
+        self.tiles_redrawn = 0
+        self.tiles_reused = 0
+        self.compose_seconds = 0.0
+
+    @property
+    def epoch(self):
+        return self.slot.epoch
+
+    @property
+    def seq(self):
+        return self.slot.seq
+
+    def _layout(self, count):
+        columns = max(1, math.ceil(math.sqrt(count)))
+        rows = max(1, math.ceil(count / columns))
+        return rows, columns
+
+    def _tile_state(self, sources):
+        """(epoch, seq) per tile; None for cameras without a frame"""
+        state = []
+        for _, slot in sources:
+            if slot is None or slot.read()[1] is None:
+                state.append(None)
+            else:
+                state.append((slot.epoch, slot.seq))
+        return state
+
+    def _draw_tile(self, canvas, index, columns, label, frame):
+        top = (index // columns) * self.tile_height
+        left = (index % columns) * self.tile_width
+        tile = canvas[top:top + self.tile_height, left:left + self.tile_width]
+
+        if frame is None:
+            tile[...] = BACKGROUND
+            cv2.putText(tile, f"{label} offline", (8, self.tile_height // 2),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (160, 160, 160), 1)
+            return
+
+        sampler = self._samplers.get(label)
+        if sampler is None or sampler.source_shape != frame.shape:
+            sampler = self._samplers[label] = TileSampler(frame.shape, self.tile_width, self.tile_height)
+            tile[...] = BACKGROUND
+
+        height, width = sampler.rows.shape[0], sampler.cols.shape[0]
+        tile[sampler.y:sampler.y + height, sampler.x:sampler.x + width] = frame[sampler.rows, sampler.cols]
+        cv2.putText(tile, label, (8, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+
+    def refresh(self):
+        """Recompose if any tile changed; returns the underlying FrameSlot"""
+        self.last_used = time.monotonic()
+        sources = self.get_sources()
+        state = self._tile_state(sources)
+        if state == self._drawn and self.slot.seq:
+            return self.slot
+
+        with self.lock:
+            # Another request may have composed this change already
+            state = self._tile_state(sources)
+            if state == self._drawn and self.slot.seq:
+                return self.slot
+
+            started = time.monotonic()
+            rows, columns = self._layout(len(sources))
+            shape = (rows * self.tile_height, columns * self.tile_width, 3)
+            _, previous, _ = self.slot.read()
+
+            canvas = self.slot.back_buffer()
+            if canvas is None or canvas.shape != shape:
+                canvas = np.empty(shape, dtype=np.uint8)
+            if previous is not None and previous.shape == shape and len(self._drawn) == len(state):
+                # Start from the current mosaic so unchanged tiles are not resampled
+                np.copyto(canvas, previous)
+                drawn = self._drawn
+            else:
+                canvas[...] = BACKGROUND
+                drawn = [False] * len(state)
+
+            for index, ((label, slot), tile_state) in enumerate(zip(sources, state)):
+                if drawn[index] == tile_state:
+                    self.tiles_reused += 1
+                    continue
+                frame = slot.read()[1] if tile_state is not None else None
+                self._draw_tile(canvas, index, columns, label, frame)
+                self.tiles_redrawn += 1
+
+            self.slot.publish(canvas, time.time())
+            self._drawn = state
+            self.compositions += 1
+            self.compose_seconds += time.monotonic() - started
+            return self.slot
+
+    # FrameSlot interface used by JpegFrameCache and the MJPEG generators
+
+    def read(self):
+        return self.refresh().read()
+
+    def wait_for_newer(self, seq, timeout=1.0):
+        """Poll the cameras until the mosaic changes past seq (or timeout)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            published = self.read()
+            if published[0] > seq or time.monotonic() >= deadline:
+                return published
+            time.sleep(1 / 60)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'tiles': len(self._drawn),
+            'tile_size': [self.tile_width, self.tile_height],
+            'compositions': self.compositions,
+            'tiles_redrawn': self.tiles_redrawn,
+            'tiles_reused': self.tiles_reused,
+            'avg_compose_ms': round(self.compose_seconds * 1000 / max(self.compositions, 1), 2),
+            'cache': self.frame_cache.to_dict()
+        }
+
+
+class MosaicRegistry:
+    """One MosaicComposer per (camera set, tile size), least recently used evicted first"""
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._mosaics = {}
+
+    def get(self, camera_ids, get_sources, tile_width=320, tile_height=180):
+        key = (tuple(camera_ids), tile_width, tile_height)
+        with self._lock:
+            mosaic = self._mosaics.get(key)
+            if mosaic is None:
+                if len(self._mosaics) >= MAX_MOSAICS:
+                    oldest = min(self._mosaics, key=lambda k: self._mosaics[k].last_used)
+                    del self._mosaics[oldest]
+                name = 'mosaic-' + '_'.join(str(cam) for cam in camera_ids) + f'-{tile_width}'
+                mosaic = MosaicComposer(name, get_sources, tile_width, tile_height, self.budget)
+                self._mosaics[key] = mosaic
+            return mosaic
+
+    def forget(self, camera_id):
+        """Drop every mosaic that includes a removed camera"""
+        with self._lock:
+            for key in [key for key in self._mosaics if camera_id in key[0]]:
+                del self._mosaics[key]
+
+    def to_dict(self):
+        with self._lock:
+            mosaics = [mosaic.to_dict() for mosaic in self._mosaics.values()]
+        return {'mosaics': mosaics}
+
+
+def parse_camera_ids(value, available):
+    """Parse ?cameras=1,2,3 into known camera ids; all cameras when omitted"""
+    if not value:
+        return sorted(available)[:MAX_MOSAIC_TILES]
+    camera_ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if part.isdigit() and int(part) in available and int(part) not in camera_ids:
+            camera_ids.append(int(part))
+    return camera_ids[:MAX_MOSAIC_TILES]
+
+
+def run_benchmark(tiles=16, duration=5.0, shape=(720, 1280, 3), fps=15):
+    """Compose a mosaic of `tiles` cameras publishing at `fps`, polled as fast as possible"""
+    slots = [FrameSlot() for _ in range(tiles)]
+    stop = threading.Event()
+    base = np.random.randint(0, 255, shape, dtype=np.uint8)
+
+    def camera(index):
+        while not stop.is_set():
+            frame = slots[index].back_buffer()
+            if frame is None:
+                frame = base.copy()
+            frame[:8] = slots[index].seq % 256
+            slots[index].publish(frame, time.time())
+            time.sleep(1.0 / fps)
+
+    threads = [threading.Thread(target=camera, args=(i,), daemon=True) for i in range(tiles)]
+    for thread in threads:
+        thread.start()
+
+    sources = [(f"Camera {i + 1}", slot) for i, slot in enumerate(slots)]
+    mosaic = MosaicComposer('benchmark', lambda: sources)
+    polls = 0
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        mosaic.frame_cache.get(mosaic, max_width=None, quality=75)
+        polls += 1
+    stop.set()
+
+    stats = mosaic.to_dict()
+    stats.update({
+        'polls': polls,
+        'camera_frames_published': sum(slot.seq for slot in slots),
+        'mosaic_fps': round(mosaic.compositions / duration, 1)
+    })
+    return stats
+
+
+if __name__ == '__main__':
+    print("Mosaic benchmark (16 x 1280x720 cameras at 15 fps)")
+    for key, value in run_benchmark().items():
+        print(f"  {key}: {value}")
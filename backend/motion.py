@@ -0,0 +1,173 @@
+import cv2
+import time
+import threading
+import numpy as np
+from collections import deque
+
+DETECTION_WIDTH = 160        # frames are downscaled to this width before differencing
+
+
+class MotionDetector:
+    """Cheap scene-change detector for one camera.
+
+    Keeps an exponentially weighted background of downscaled grayscale frames
+    and scores each sample as the fraction of pixels that differ from it by
+    more than pixel_delta. A score above threshold counts as activity; a jump
+    from quiet to active (or a score spike_factor times the threshold) is a
+    trigger that lets periodic VILA calls run immediately.
+    """
+
+    def __init__(self, threshold=0.02, pixel_delta=25, spike_factor=3.0,
+                 hold_seconds=10.0, sample_interval=0.2, learning_rate=0.05):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.spike_factor = spike_factor
+        self.hold_seconds = hold_seconds
+        self.sample_interval = sample_interval
+        self.learning_rate = learning_rate
+        self.lock = threading.Lock()
+        self._background = None
+        self._last_sample = 0.0
+        self.score = 0.0
+        self.last_activity = 0.0
+        self.trigger_seq = 0
+        self.last_trigger = 0.0
+        self.samples = 0
+
+    def configure(self, threshold=None, pixel_delta=None, spike_factor=None, hold_seconds=None):
+        """Update per-camera thresholds; None leaves a value unchanged"""
+        with self.lock:
+            if threshold is not None:
+                self.threshold = max(0.001, min(float(threshold), 1.0))
+            if pixel_delta is not None:
+                self.pixel_delta = max(1, min(int(pixel_delta), 255))
+            if spike_factor is not None:
+                self.spike_factor = max(1.0, float(spike_factor))
+            if hold_seconds is not None:
+                self.hold_seconds = max(0.0, float(hold_seconds))
+
+    def reset(self):
+        with self.lock:
+            self._background = None
+            self.score = 0.0
+            self.last_activity = 0.0
+
+    def update(self, frame, now=None):
+        """Score a BGR frame; returns the score, or None if it was not sampled"""
+        now = time.monotonic() if now is None else now
+        if now - self._last_sample < self.sample_interval:
+            return None
+        self._last_sample = now
+
+        height, width = frame.shape[:2]
+        small = cv2.resize(frame, (DETECTION_WIDTH, max(1, height * DETECTION_WIDTH // width)),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+        with self.lock:
+            self.samples += 1
+            if self._background is None or self._background.shape != gray.shape:
+                self._background = gray
+                return 0.0
+
+            changed = np.abs(gray - self._background) > self.pixel_delta
+            score = float(np.count_nonzero(changed)) / changed.size
+            # Slowly absorb lighting changes and parked objects into the background
+            self._background += self.learning_rate * (gray - self._background)
+
+            was_active = self.is_active(now)
+            spike_level = self.threshold * self.spike_factor
+            if score >= self.threshold:
+                self.last_activity = now
+                if not was_active or (score >= spike_level and self.score < spike_level):
+                    self.trigger_seq += 1
+                    self.last_trigger = now
+            self.score = score
+            return score
+
+    def is_active(self, now=None):
+        now = time.monotonic() if now is None else now
+        return self.last_activity > 0 and now - self.last_activity <= self.hold_seconds
+
+    def to_dict(self):
+        now = time.monotonic()
+        return {
+            'score': round(self.score, 4),
+            'active': self.is_active(now),
+            'threshold': self.threshold,
+            'pixel_delta': self.pixel_delta,
+            'spike_factor': self.spike_factor,
+            'hold_seconds': self.hold_seconds,
+            'triggers': self.trigger_seq,
+            'seconds_since_activity': round(now - self.last_activity, 1) if self.last_activity else None,
+            'samples': self.samples
+        }
+
+
+class MotionGate:
+    """Decides when one periodic VILA call (analysis or anomaly check) should run.
+
+    Runs at `interval` while the scene is active, at `static_interval` while
+    it is static (never, if None), and immediately after a motion trigger,
+    at most once per min_interval.
+    """
+
+    def __init__(self, detector, interval, static_interval=None, min_interval=2.0):
+        self.detector = detector
+        self.interval = interval
+        self.static_interval = static_interval
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.last_run = time.monotonic()
+        self._last_considered = self.last_run
+        self._consumed_trigger = detector.trigger_seq
+        self.calls_made = 0
+        self.calls_skipped = 0
+        self.motion_triggered = 0
+        self.alert_latencies = deque(maxlen=50)
+
+    def due(self, now=None):
+        """Return (run, reason, trigger_time); trigger_time is set for motion-triggered runs"""
+        now = time.monotonic() if now is None else now
+        detector = self.detector
+        with self.lock:
+            since_run = now - self.last_run
+            if detector.trigger_seq != self._consumed_trigger and since_run >= self.min_interval:
+                self._consumed_trigger = detector.trigger_seq
+                self.motion_triggered += 1
+                return self._run(now, 'motion', detector.last_trigger)
+
+            if since_run < self.interval or now - self._last_considered < self.interval:
+                return False, None, None
+            if detector.is_active(now):
+                return self._run(now, 'periodic', None)
+            if self.static_interval is not None and since_run >= self.static_interval:
+                return self._run(now, 'static', None)
+
+            # Static scene: this is a call the fixed schedule would have made
+            self._last_considered = now
+            self.calls_skipped += 1
+            return False, 'static', None
+
+    def _run(self, now, reason, trigger_time):
+        self.last_run = now
+        self._last_considered = now
+        self.calls_made += 1
+        return True, reason, trigger_time
+
+    def record_alert(self, trigger_time):
+        """Record trigger-to-alert latency for a motion-triggered call that found something"""
+        if trigger_time is not None:
+            self.alert_latencies.append(time.monotonic() - trigger_time)
+
+    def to_dict(self):
+        latencies = list(self.alert_latencies)
+        return {
+            'interval': self.interval,
+            'static_interval': self.static_interval,
+            'calls_made': self.calls_made,
+            'calls_skipped': self.calls_skipped,
+            'motion_triggered': self.motion_triggered,
+            'avg_trigger_to_alert_ms': round(sum(latencies) * 1000 / len(latencies), 1) if latencies else None,
+            'last_trigger_to_alert_ms': round(latencies[-1] * 1000, 1) if latencies else None
+        }
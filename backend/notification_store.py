@@ -0,0 +1,266 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from report_store import REPORT_DB
+
+NOTIFICATION_RING_SIZE = 1000     # newest notifications kept in memory
+NOTIFICATION_RETENTION_DAYS = 30
+DETAILS_LENGTH = 100
+MAX_PAGE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT,
+    severity TEXT,
+    message TEXT NOT NULL,
+    details TEXT NOT NULL,
+    ts REAL NOT NULL,
+    read INTEGER NOT NULL DEFAULT 0,
+    cleared INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS notifications_unread ON notifications (id) WHERE read = 0 AND cleared = 0;
+CREATE INDEX IF NOT EXISTS notifications_ts ON notifications (ts);
+"""
+
+
+class NotificationStore:
+    """Anomaly notifications in a bounded in-memory ring backed by SQLite.
+
+    The newest `capacity` notifications are held in an ordered dict keyed
+    by id, so adding, marking one read and listing a page cost the same
+    after weeks of uptime as after a minute. Every notification is also
+    written to the database, which serves pages older than the ring and
+    keeps read state across restarts. Ids come from an AUTOINCREMENT
+    column and never repeat, not even after clear() or pruning. The unread
+    count is kept up to date on every change instead of being recounted.
+
+    clear() hides the current notifications rather than deleting them;
+    rows older than retention_days are pruned when the store opens.
+    """
+
+    def __init__(self, path=None, capacity=NOTIFICATION_RING_SIZE,
+                 retention_days=NOTIFICATION_RETENTION_DAYS):
+        self.path = path or REPORT_DB
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self._ring = OrderedDict()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        with self._conn:
+            self._conn.execute('DELETE FROM notifications WHERE ts < ?',
+                               (time.time() - retention_days * 86400,))
+        self.unread = self._conn.execute(
+            'SELECT COUNT(*) FROM notifications WHERE read = 0 AND cleared = 0').fetchone()[0]
+        self.total = self._conn.execute(
+            'SELECT COUNT(*) FROM notifications WHERE cleared = 0').fetchone()[0]
+        rows = self._conn.execute(
+            'SELECT id, source, severity, message, details, ts, read FROM notifications '
+            'WHERE cleared = 0 ORDER BY id DESC LIMIT ?', (capacity,)).fetchall()
+        for row in reversed(rows):
+            entry = self._entry(row)
+            self._ring[entry['id']] = entry
+
+    @staticmethod
+    def _entry(row):
+        notification_id, source, severity, message, details, ts, read = row
+        return {
+            'id': notification_id,
+            'message': message,
+            'details': details,
+            'source': source,
+            'severity': severity,
+            'timestamp': datetime.fromtimestamp(ts).isoformat(),
+            'read': bool(read)
+        }
+
+    @staticmethod
+    def _matches(entry, unread_only, source):
+        return (not unread_only or not entry['read']) and (source is None or entry['source'] == source)
+
+    def add(self, message, details, source=None, severity=None):
+        """Store a notification and return it; details are cut to DETAILS_LENGTH characters"""
+        details = details or ''
+        if len(details) > DETAILS_LENGTH:
+            details = details[:DETAILS_LENGTH] + '...'
+        ts = time.time()
+        with self.lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    'INSERT INTO notifications (source, severity, message, details, ts) VALUES (?, ?, ?, ?, ?)',
+                    (source, severity, message, details, ts))
+            entry = self._entry((cursor.lastrowid, source, severity, message, details, ts, 0))
+            self._ring[entry['id']] = entry
+            if len(self._ring) > self.capacity:
+                self._ring.popitem(last=False)
+            self.unread += 1
+            self.total += 1
+        return entry
+
+    def mark_read(self, notification_id):
+        """Mark one notification read; False if there is no such notification"""
+        with self.lock:
+            entry = self._ring.get(notification_id)
+            if entry is not None:
+                if not entry['read']:
+                    entry['read'] = True
+                    self.unread -= 1
+                    with self._conn:
+                        self._conn.execute('UPDATE notifications SET read = 1 WHERE id = ?', (notification_id,))
+                return True
+
+            # Aged out of the ring: only the database knows it
+            with self._conn:
+                changed = self._conn.execute(
+                    'UPDATE notifications SET read = 1 WHERE id = ? AND read = 0 AND cleared = 0',
+                    (notification_id,)).rowcount
+            if changed:
+                self.unread -= 1
+                return True
+            return self._conn.execute('SELECT 1 FROM notifications WHERE id = ? AND cleared = 0',
+                                      (notification_id,)).fetchone() is not None
+
+    def mark_all_read(self):
+        """Mark every notification read and return how many were unread"""
+        with self.lock:
+            with self._conn:
+                self._conn.execute('UPDATE notifications SET read = 1 WHERE read = 0 AND cleared = 0')
+            for entry in self._ring.values():
+                entry['read'] = True
+            marked, self.unread = self.unread, 0
+        return marked
+
+    def clear(self):
+        """Hide all current notifications; ids keep increasing afterwards"""
+        with self.lock:
+            with self._conn:
+                self._conn.execute('UPDATE notifications SET cleared = 1 WHERE cleared = 0')
+            self._ring.clear()
+            self.unread = 0
+            self.total = 0
+
+    def page(self, before=None, limit=50, unread_only=False, source=None):
+        """Newest-first notifications with id < before, at most limit of them.
+
+        Served from the ring, falling back to the database only for pages
+        older than it. Returns the notifications, the cursor to pass as
+        `before` for the next page and whether more remain.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE))
+        with self.lock:
+            found = []
+            for notification_id in reversed(self._ring):
+                if before is not None and notification_id >= before:
+                    continue
+                entry = self._ring[notification_id]
+                if self._matches(entry, unread_only, source):
+                    found.append(dict(entry))
+                    if len(found) > limit:
+                        break
+
+            oldest = next(iter(self._ring), None)
+            if len(found) <= limit and self.total > len(self._ring):
+                # The page reaches past the ring into the database
+                below = oldest if oldest is not None else before
+                if before is not None and below is not None:
+                    below = min(below, before)
+                clauses, params = ['cleared = 0'], []
+                if below is not None:
+                    clauses.append('id < ?')
+                    params.append(below)
+                if unread_only:
+                    clauses.append('read = 0')
+                if source is not None:
+                    clauses.append('source = ?')
+                    params.append(source)
+                params.append(limit + 1 - len(found))
+                rows = self._conn.execute(
+                    'SELECT id, source, severity, message, details, ts, read FROM notifications '
+                    f'WHERE {" AND ".join(clauses)} ORDER BY id DESC LIMIT ?', params).fetchall()
+                found.extend(self._entry(row) for row in rows)
+
+        more = len(found) > limit
+        found = found[:limit]
+        return {
+            'notifications': found,
+            'cursor': found[-1]['id'] if found else before,
+            'more': more
+        }
+
+    def close(self):
+        with self.lock:
+            self._conn.close()
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'path': self.path,
+                'total': self.total,
+                'unread': self.unread,
+                'in_memory': len(self._ring),
+                'capacity': self.capacity
+            }
+
+
+def run_benchmark(checkpoints=(1000, 10000, 100000), operations=1000, path=None):
+    """Per-request cost of listing and marking read as notifications accumulate,
+    against the old unbounded list walked on every read-mark"""
+    import random
+    import tempfile
+
+    path = path or os.path.join(tempfile.mkdtemp(prefix='notifications-'), 'bench.db')
+    store = NotificationStore(path)
+    old_list = []
+    details = 'Vehicle collision at the intersection, two cars stopped in the left lane. ' * 2
+    rows = []
+    added = 0
+    for count in checkpoints:
+        while added < count:
+            entry = store.add('Anomaly detected on Camera 3', details, 'camera_3', 'high')
+            old_list.append(dict(entry))
+            added += 1
+
+        recent_ids = [random.randint(max(1, added - store.capacity + 1), added) for _ in range(operations)]
+        started = time.perf_counter()
+        for notification_id in recent_ids:
+            store.mark_read(notification_id)
+        mark_us = (time.perf_counter() - started) * 1e6 / operations
+
+        started = time.perf_counter()
+        for _ in range(operations):
+            store.page(limit=50)
+        page_us = (time.perf_counter() - started) * 1e6 / operations
+
+        started = time.perf_counter()
+        for _ in range(100):
+            store.page(before=random.randint(2, added), limit=50, unread_only=True)
+        deep_us = (time.perf_counter() - started) * 1e6 / 100
+
+        # The old endpoint: find by walking the list, count with len(list)
+        started = time.perf_counter()
+        for notification_id in recent_ids[:100]:
+            for notification in old_list:
+                if notification['id'] == notification_id:
+                    notification['read'] = True
+                    break
+        old_mark_us = (time.perf_counter() - started) * 1e6 / 100
+        rows.append((count, mark_us, page_us, deep_us, old_mark_us))
+    store.close()
+    return rows
+
+
+if __name__ == '__main__':
+    print("Notifications: microseconds per operation after N notifications")
+    for count, mark_us, page_us, deep_us, old_mark_us in run_benchmark():
+        print(f"  {count:>7}: mark read {mark_us:7.1f}  newest page {page_us:7.1f}  "
+              f"older unread page {deep_us:8.1f}   old list walk {old_mark_us:8.1f}")
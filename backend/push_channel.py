@@ -0,0 +1,253 @@
+import json
+import time
+import struct
+import threading
+import itertools
+from collections import deque
+from datetime import datetime
+
+from adaptive_profile import AdaptiveProfile
+
+# Binary frame messages: type (1 byte), camera id (2 bytes), frame seq (4 bytes), JPEG bytes
+FRAME_MESSAGE = 1
+FRAME_HEADER = struct.Struct('>BHI')
+LIVE_FEED_ID = 0
+
+EVENT_TOPICS = ('report', 'notification', 'status')
+DEFAULT_TOPIC_RATE = 5.0     # events per second per topic
+MAX_FRAME_FPS = 30
+MAX_PENDING_EVENTS = 100     # per topic; oldest events are dropped beyond this
+
+
+class PushClient:
+    """One WebSocket connection: its subscriptions, pending events and counters"""
+
+    def __init__(self, client_id, budget=None):
+        self.id = client_id
+        self.budget = budget
+        self.connected = time.monotonic()
+        self.lock = threading.Lock()
+        # topic -> [min interval between events, next allowed send time]
+        self.topics = {topic: [1.0 / DEFAULT_TOPIC_RATE, 0.0] for topic in EVENT_TOPICS}
+        self.pending = {topic: deque(maxlen=MAX_PENDING_EVENTS) for topic in EVENT_TOPICS}
+        # camera id -> [frame interval, next due time, last (epoch, seq) sent, AdaptiveProfile or None]
+        self.cameras = {}
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.events_sent = 0
+        self.events_dropped = 0
+        self.bytes_sent = 0
+
+    def enqueue(self, topic, message):
+        with self.lock:
+            if topic not in self.topics:
+                return
+            queue = self.pending[topic]
+            if len(queue) == queue.maxlen:
+                # Backpressure: a client that cannot keep up loses the oldest events
+                self.events_dropped += 1
+            queue.append(message)
+
+    def due_events(self, now):
+        """Pop the events whose topic rate limit allows sending now"""
+        ready = []
+        with self.lock:
+            for topic, (interval, next_due) in self.topics.items():
+                queue = self.pending[topic]
+                if queue and now >= next_due:
+                    ready.append(queue.popleft())
+                    self.topics[topic][1] = now + interval
+        return ready
+
+    def handle_control(self, message):
+        """Apply a JSON control message from the browser"""
+        try:
+            command = json.loads(message)
+        except (TypeError, ValueError):
+            return {'type': 'error', 'error': 'Control messages must be JSON'}
+
+        action = command.get('action')
+        try:
+            return self._apply_control(action, command)
+        except (TypeError, ValueError, AttributeError) as e:
+            return {'type': 'error', 'error': f'Invalid {action} message: {e}'}
+
+    def _apply_control(self, action, command):
+        with self.lock:
+            if action == 'subscribe':
+                camera_id = int(command.get('camera', LIVE_FEED_ID))
+                fps = max(0.5, min(float(command.get('fps', 5)), MAX_FRAME_FPS))
+                adaptive = None
+                if self.budget is not None and command.get('adaptive', True):
+                    adaptive = AdaptiveProfile(self.budget, max_fps=fps)
+                self.cameras[camera_id] = [1.0 / fps, 0.0, None, adaptive]
+                return {'type': 'subscribed', 'camera': camera_id, 'fps': fps, 'adaptive': adaptive is not None}
+
+            if action == 'unsubscribe':
+                camera_id = int(command.get('camera', LIVE_FEED_ID))
+                self.cameras.pop(camera_id, None)
+                return {'type': 'unsubscribed', 'camera': camera_id}
+
+            if action == 'topics':
+                # {"report": 2, "notification": 5} - topic -> max events per second
+                requested = command.get('topics', {})
+                if isinstance(requested, list):
+                    requested = {topic: DEFAULT_TOPIC_RATE for topic in requested}
+                self.topics = {
+                    topic: [1.0 / max(0.1, float(rate)), 0.0]
+                    for topic, rate in requested.items() if topic in EVENT_TOPICS
+                }
+                for topic in EVENT_TOPICS:
+                    if topic not in self.topics:
+                        self.pending[topic].clear()
+                return {'type': 'topics', 'topics': sorted(self.topics)}
+
+        return {'type': 'error', 'error': f'Unknown action: {action}'}
+
+    def to_dict(self):
+        elapsed = max(time.monotonic() - self.connected, 1e-6)
+        with self.lock:
+            return {
+                'id': self.id,
+                'connected_seconds': round(elapsed, 1),
+                'cameras': {
+                    cam: sub[3].to_dict() if sub[3] else {'fps': round(1.0 / sub[0], 1)}
+                    for cam, sub in self.cameras.items()
+                },
+                'topics': sorted(self.topics),
+                'frames_sent': self.frames_sent,
+                'frames_skipped': self.frames_skipped,
+                'events_sent': self.events_sent,
+                'events_dropped': self.events_dropped,
+                'pending_events': sum(len(queue) for queue in self.pending.values()),
+                'kbytes_per_second': round(self.bytes_sent / 1024 / elapsed, 1)
+            }
+
+
+class PushHub:
+    """Fan-out of frames and JSON events to WebSocket clients.
+
+    Frames are never queued: when a client's subscription is due, it gets the
+    newest encoded frame for that camera, so a slow connection only lowers its
+    own frame rate. Events are queued per topic with a bounded deque and
+    delivered under a per-topic rate limit.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._clients = {}
+        # Called with (topic, data) on every publish, for in-process observers
+        self.listeners = []
+
+    def publish(self, topic, data):
+        """Queue an event for every client subscribed to topic"""
+        for listener in self.listeners:
+            listener(topic, data)
+        message = json.dumps({
+            'type': 'event',
+            'topic': topic,
+            'data': data,
+            'timestamp': datetime.now().isoformat()
+        }, default=str)
+        with self._lock:
+            clients = list(self._clients.values())
+        for client in clients:
+            client.enqueue(topic, message)
+
+    def _register(self):
+        with self._lock:
+            client = PushClient(next(self._ids), self.budget)
+            self._clients[client.id] = client
+            return client
+
+    def _unregister(self, client):
+        with self._lock:
+            self._clients.pop(client.id, None)
+
+    def _send_due_frames(self, ws, client, frame_source, now):
+        """Send the newest frame for every camera subscription that is due"""
+        with client.lock:
+            subscriptions = list(client.cameras.items())
+
+        next_wake = now + 0.25
+        for camera_id, subscription in subscriptions:
+            interval, next_due, last_sent, adaptive = subscription
+            if adaptive is not None:
+                options, fps = adaptive.current()
+                interval = 1.0 / fps
+            if now < next_due:
+                next_wake = min(next_wake, next_due)
+                continue
+
+            source = frame_source(camera_id)
+            if source is None:
+                continue
+            slot, cache, demand, encode_options = source
+            if demand is not None:
+                demand.touch_viewer()
+            if adaptive is not None:
+                encode_options = dict(encode_options, **options)
+
+            encoded = cache.get(slot, **encode_options)
+            if encoded is None or (encoded.epoch, encoded.seq) == last_sent:
+                # Nothing new yet; check again shortly
+                next_wake = min(next_wake, now + min(interval, 0.05))
+                continue
+
+            if last_sent and last_sent[0] == encoded.epoch and encoded.seq > last_sent[1] + 1:
+                client.frames_skipped += encoded.seq - last_sent[1] - 1
+
+            message = FRAME_HEADER.pack(FRAME_MESSAGE, camera_id, encoded.seq & 0xFFFFFFFF) + encoded.jpeg
+            started = time.monotonic()
+            ws.send(message)
+            client.frames_sent += 1
+            client.bytes_sent += len(message)
+
+            sent_at = time.monotonic()
+            if adaptive is not None:
+                adaptive.record_delivery(sent_at - started, interval)
+            subscription[1] = sent_at + interval
+            subscription[2] = (encoded.epoch, encoded.seq)
+            next_wake = min(next_wake, subscription[1])
+        return next_wake
+
+    def serve(self, ws, frame_source):
+        """Run one client connection until it closes.
+
+        frame_source(camera_id) returns (frame_slot, frame_cache, demand,
+        encode_options) for a subscribable camera, or None.
+        """
+        client = self._register()
+        try:
+            ws.send(json.dumps({'type': 'hello', 'client_id': client.id, 'topics': list(EVENT_TOPICS)}))
+            next_wake = time.monotonic()
+
+            while True:
+                timeout = max(0.0, min(next_wake - time.monotonic(), 0.1))
+                message = ws.receive(timeout=timeout)
+                if message is not None:
+                    ws.send(json.dumps(client.handle_control(message)))
+
+                now = time.monotonic()
+                for event in client.due_events(now):
+                    ws.send(event)
+                    client.events_sent += 1
+                    client.bytes_sent += len(event)
+
+                next_wake = self._send_due_frames(ws, client, frame_source, now)
+        except Exception as e:
+            # ConnectionClosed ends the loop; anything else is worth a log line
+            if type(e).__name__ != 'ConnectionClosed':
+                print(f"Push channel client {client.id} error: {e}")
+        finally:
+            self._unregister(client)
+
+    def to_dict(self):
+        with self._lock:
+            clients = list(self._clients.values())
+        return {
+            'connected_clients': len(clients),
+            'clients': [client.to_dict() for client in clients]
+        }
@@ -0,0 +1,117 @@
+import cv2
+import os
+import time
+
+REPLAY_DIR = os.environ.get('REPLAY_DIR', 'recordings')
+MAX_SPEED = 100.0
+
+
+def resolve_replay_path(name, directory=None):
+    """Path of a recording inside the replay directory; raises ValueError if it is not there"""
+    directory = directory or REPLAY_DIR
+    filename = os.path.basename(str(name or ''))
+    path = os.path.join(directory, filename)
+    if not filename or not os.path.isfile(path):
+        raise ValueError(f'Recording not found in {directory}/: {name}')
+    return path
+
+
+class ReplayCapture:
+    """Plays a recorded video file as if it were a live camera.
+
+    grab() releases frame n when the replay clock reaches n / (fps * speed),
+    so the file plays at its native rate (speed=1) or accelerated, and
+    clock() returns that scheduled time instead of the wall clock. Which
+    frames the capture loop samples therefore depends only on the file and
+    the speed, not on scheduling jitter, and two replays of the same file
+    are comparable. position_seconds is the source timestamp of the last
+    grabbed frame.
+    """
+
+    def __init__(self, path, speed=1.0, loop=False):
+        self.path = path
+        self.speed = max(0.1, min(float(speed), MAX_SPEED))
+        self.loop = loop
+        self._cap = cv2.VideoCapture(path)
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.frame_count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        self.frames = 0
+        self.loops = 0
+        self.finished = False
+        self._index = -1
+        self._started = None
+
+    def isOpened(self):
+        return self._cap.isOpened() and not self.finished
+
+    @property
+    def position_seconds(self):
+        return max(self._index, 0) / self.fps
+
+    def clock(self):
+        """Scheduled replay time of the current frame, on the time.monotonic() scale"""
+        if self._started is None:
+            return time.monotonic()
+        return self._started + self.frames / (self.fps * self.speed)
+
+    def grab(self):
+        if self.finished:
+            return False
+        if not self._cap.grab():
+            if not self.loop or self.frames == 0:
+                self.finished = True
+                return False
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self._index = -1
+            self.loops += 1
+            if not self._cap.grab():
+                self.finished = True
+                return False
+
+        if self._started is None:
+            self._started = time.monotonic()
+        else:
+            self.frames += 1
+        self._index += 1
+        delay = self.clock() - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    def retrieve(self, image=None):
+        if image is not None:
+            return self._cap.retrieve(image)
+        return self._cap.retrieve()
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            # Paced by grab() itself; CameraCapture must not pace it again
+            return 0.0
+        return self._cap.get(prop)
+
+    def set(self, prop, value):
+        # Device settings (resolution, fps, buffer size) do not apply to a recording
+        return True
+
+    def release(self):
+        self._cap.release()
+
+    def to_dict(self):
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return {
+            'file': os.path.basename(self.path),
+            'speed': self.speed,
+            'loop': self.loop,
+            'fps': round(self.fps, 2),
+            'frame_count': self.frame_count,
+            'frames_played': self.frames + (1 if self._started else 0),
+            'loops': self.loops,
+            'position_seconds': round(self.position_seconds, 3),
+            'achieved_speed': round(self.frames / self.fps / elapsed, 2) if elapsed > 0 else None,
+            'finished': self.finished
+        }
@@ -0,0 +1,111 @@
+import time
+import threading
+from datetime import datetime
+
+LIVE_REPORT_LOG_SIZE = 500
+MAX_PAGE = 200
+
+
+class ReportLog:
+    """Bounded in-memory log of reports with monotonically increasing ids.
+
+    Entries live in a fixed ring indexed by id, so appending and reading a
+    page after a cursor cost O(page size) however long the session has run.
+    Ids keep increasing across clear(), so a client's cursor never matches
+    an entry it has not seen.
+    """
+
+    def __init__(self, capacity=LIVE_REPORT_LOG_SIZE):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self._ring = [None] * capacity
+        self._next_id = 1
+        self._oldest_id = 1
+
+    def append(self, report_type, content):
+        """Add a report and return its entry (id, type, content, timestamp)"""
+        with self.lock:
+            entry = {
+                'id': self._next_id,
+                'type': report_type,
+                'content': content,
+                'timestamp': datetime.now().isoformat()
+            }
+            self._ring[self._next_id % self.capacity] = entry
+            self._next_id += 1
+            self._oldest_id = max(self._oldest_id, self._next_id - self.capacity)
+            return entry
+
+    def clear(self):
+        with self.lock:
+            self._ring = [None] * self.capacity
+            self._oldest_id = self._next_id
+
+    @property
+    def last_id(self):
+        return self._next_id - 1
+
+    def page(self, after=None, limit=50):
+        """Entries with id > after, oldest first, at most limit of them.
+
+        Without a cursor, or with one from before a server restart, returns
+        the latest page and reset=True. Returns a dict with the entries, the
+        cursor to send next time and how many entries aged out unseen.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE))
+        with self.lock:
+            reset = after is None or after > self._next_id - 1
+            if reset:
+                start = max(self._oldest_id, self._next_id - limit)
+                missed = 0
+            else:
+                start = max(after + 1, self._oldest_id)
+                missed = start - (after + 1)
+            stop = min(start + limit, self._next_id)
+            entries = [self._ring[entry_id % self.capacity] for entry_id in range(start, stop)]
+            return {
+                'reports': entries,
+                'cursor': stop - 1 if entries else (self._next_id - 1 if reset else after),
+                'more': stop < self._next_id,
+                'missed': missed,
+                'reset': reset
+            }
+
+
+def run_benchmark(checkpoints=(1000, 10000, 100000), polls=1000):
+    """Per-poll cost of the cursor log vs. re-sending the old ever-growing prepended string"""
+    import json
+
+    report = 'LIVE ANALYSIS [12:00:00]\n' + '=' * 40 + '\n' + 'Two people walking past the entrance. ' * 8 + '\n\n'
+    log = ReportLog()
+    rows = []
+    appended = 0
+    for count in checkpoints:
+        while appended < count:
+            log.append('analysis', report)
+            appended += 1
+        # A client polling every few seconds sees one new report per poll
+        cursor = log.last_id
+        started = time.perf_counter()
+        for _ in range(polls):
+            log.append('analysis', report)
+            page = log.page(cursor)
+            body = json.dumps(page)
+            cursor = page['cursor']
+        cursor_ms = (time.perf_counter() - started) * 1000 / polls
+        appended += polls
+
+        # The old endpoint serialised the whole accumulated string on every poll
+        content = report * count
+        started = time.perf_counter()
+        string_body = json.dumps({'success': True, 'reports': content})
+        string_ms = (time.perf_counter() - started) * 1000
+        rows.append((count, len(body), cursor_ms, len(string_body), string_ms))
+    return rows
+
+
+if __name__ == '__main__':
+    print("Live reports polling: response size and server time per poll after N reports")
+    for count, cursor_bytes, cursor_ms, string_bytes, string_ms in run_benchmark():
+        print(f"  {count:>7} reports: cursor {cursor_bytes:>5} B {cursor_ms:.3f} ms   "
+              f"full string {string_bytes / 1e6:6.1f} MB {string_ms:7.1f} ms")
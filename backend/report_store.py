@@ -0,0 +1,505 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+
+REPORT_DB = os.environ.get('REPORT_DB', 'reports.db')
+HOT_REPORTS = 50             # latest reports kept in memory per camera
+MAX_QUERY_LIMIT = 1000
+SEARCH_LIMIT = 100
+RANK_WINDOW = 2000           # relevance ranking considers this many of the newest matches
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    camera TEXT NOT NULL,
+    type TEXT NOT NULL,
+    ts REAL NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_camera_ts ON reports (camera, ts);
+CREATE INDEX IF NOT EXISTS reports_type_ts ON reports (type, ts);
+CREATE INDEX IF NOT EXISTS reports_ts ON reports (ts);
+"""
+
+# Full-text index over report content, kept in step with the reports table by the writer
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+    content, content='reports', content_rowid='id', tokenize='porter unicode61'
+);
+"""
+
+
+def camera_key(camera_id):
+    """Store key of a surveillance camera; the live feed uses 'live'"""
+    return f'camera_{camera_id}'
+
+
+def parse_time(value):
+    """Epoch seconds from an epoch number or an ISO timestamp; raises ValueError"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(value)).timestamp()
+
+
+class ReportStore:
+    """Analysis reports persisted in SQLite, with the latest ones kept in memory.
+
+    add() assigns the report id and returns immediately: rows are queued and
+    a single writer thread commits them in batches, so analysis workers
+    never wait on disk. The database runs in WAL mode, so history queries
+    read concurrently with the writer; a report becomes visible to query()
+    once its batch is committed, normally within flush_interval. recent()
+    is served from a per-camera hot cache of the last hot_size reports,
+    loaded from the database the first time a camera is touched.
+
+    Report content is also indexed with SQLite FTS5 in the same
+    transaction, for search(). If this SQLite build lacks FTS5 the store
+    works without search.
+    """
+
+    def __init__(self, path=None, hot_size=HOT_REPORTS, batch_size=500, flush_interval=0.25):
+        self.path = path or REPORT_DB
+        self.hot_size = hot_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.written = threading.Condition()
+        self._hot = {}
+        self._pending = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.rows_written = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.last_batch_ms = None
+        self._written_id = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Readers share one connection; the writer thread opens its own
+        self._reader = self._connect(check_same_thread=False)
+        self._reader.executescript(SCHEMA)
+        self.search_enabled = self._create_search_index()
+        self._read_lock = threading.Lock()
+        self._next_id = (self._reader.execute('SELECT MAX(id) FROM reports').fetchone()[0] or 0) + 1
+        self._written_id = self._next_id - 1
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def _connect(self, check_same_thread=True):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=check_same_thread)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # With WAL, NORMAL only risks the last commits on power loss, never corruption
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _create_search_index(self):
+        """Create the FTS5 index, indexing existing reports the first time; False if unavailable"""
+        try:
+            exists = self._reader.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'reports_fts'").fetchone() is not None
+            self._reader.executescript(SEARCH_SCHEMA)
+            if not exists:
+                with self._reader:
+                    self._reader.execute("INSERT INTO reports_fts (reports_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"Report search disabled, SQLite has no FTS5: {e}")
+            return False
+
+    @staticmethod
+    def _entry(row):
+        report_id, camera, report_type, ts, content = row
+        return {
+            'id': report_id,
+            'camera': camera,
+            'type': report_type,
+            'content': content,
+            'timestamp': datetime.fromtimestamp(ts).isoformat()
+        }
+
+    def _hot_cache(self, camera):
+        """Hot cache of one camera, loaded from the database on first use; call under lock"""
+        cache = self._hot.get(camera)
+        if cache is None:
+            with self._read_lock:
+                rows = self._reader.execute(
+                    'SELECT id, camera, type, ts, content FROM reports WHERE camera = ? '
+                    'ORDER BY ts DESC, id DESC LIMIT ?', (camera, self.hot_size)).fetchall()
+            cache = self._hot[camera] = deque((self._entry(row) for row in rows), maxlen=self.hot_size)
+        return cache
+
+    def add(self, camera, report_type, content, timestamp=None):
+        """Queue a report for writing and return its entry (id, camera, type, content, timestamp)"""
+        ts = time.time() if timestamp is None else timestamp
+        with self.lock:
+            row = (self._next_id, camera, report_type, ts, content)
+            self._next_id += 1
+            entry = self._entry(row)
+            self._hot_cache(camera).appendleft(entry)
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+        return entry
+
+    def recent(self, camera, limit=None):
+        """Newest-first reports of a camera from memory"""
+        with self.lock:
+            reports = list(self._hot_cache(camera))
+        return reports[:limit] if limit else reports
+
+    def hot_count(self, camera):
+        with self.lock:
+            return len(self._hot_cache(camera))
+
+    def forget(self, camera):
+        """Drop a camera's hot cache; its history stays in the database"""
+        with self.lock:
+            self._hot.pop(camera, None)
+
+    def query(self, camera=None, report_type=None, since=None, until=None, limit=100):
+        """Newest-first reports matching the filters; since/until are epoch seconds"""
+        clauses, params = [], []
+        if camera is not None:
+            clauses.append('camera = ?')
+            params.append(camera)
+        if report_type is not None:
+            clauses.append('type = ?')
+            params.append(report_type)
+        if since is not None:
+            clauses.append('ts >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('ts < ?')
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ''
+        params.append(max(1, min(int(limit), MAX_QUERY_LIMIT)))
+        with self._read_lock:
+            rows = self._reader.execute(
+                f'SELECT id, camera, type, ts, content FROM reports {where}ORDER BY ts DESC LIMIT ?',
+                params).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def scan(self, since=None, report_types=None, batch=1000):
+        """Yield committed reports oldest first, a batch per query so writers are not held up"""
+        clauses, params = ['id > ?'], []
+        if since is not None:
+            clauses.append('ts >= ?')
+            params.append(since)
+        if report_types:
+            clauses.append(f"type IN ({', '.join('?' * len(report_types))})")
+            params.extend(report_types)
+        last_id = 0
+        while True:
+            with self._read_lock:
+                rows = self._reader.execute(
+                    f"SELECT id, camera, type, ts, content FROM reports WHERE {' AND '.join(clauses)} "
+                    'ORDER BY id LIMIT ?', [last_id, *params, batch]).fetchall()
+            for row in rows:
+                yield self._entry(row) | {'ts': row[3]}
+            if len(rows) < batch:
+                return
+            last_id = rows[-1][0]
+
+    def search(self, text, camera=None, report_type=None, since=None, until=None,
+               limit=20, order='rank', marks=('<mark>', '</mark>')):
+        """Reports containing the words of `text`, with a highlighted snippet each.
+
+        Words are stemmed, so 'ladders' finds 'ladder'. Reports with every
+        word are returned; if there are none, reports with any of them.
+        order is 'rank' (BM25 relevance) or 'recent' (newest first). Ranking
+        every match of a common word over a year of reports is too slow, so
+        only the newest RANK_WINDOW matches are ranked. Committed reports
+        only, like query().
+        """
+        if not self.search_enabled:
+            return []
+        terms = re.findall(r'\w+', str(text).lower())
+        # Single letters ('a', 'i') match nearly every report and only dilute the ranking
+        terms = [term for term in terms if len(term) > 1] or terms
+        if not terms:
+            return []
+        clauses, params = [], []
+        if camera is not None:
+            clauses.append('r.camera = ?')
+            params.append(camera)
+        if report_type is not None:
+            clauses.append('r.type = ?')
+            params.append(report_type)
+        if since is not None:
+            clauses.append('r.ts >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('r.ts < ?')
+            params.append(until)
+        with self._read_lock:
+            # Ids are assigned in time order, so a time window is also a rowid range the
+            # full-text index can skip to instead of filtering every match
+            if since is not None:
+                first = self._reader.execute('SELECT id FROM reports WHERE ts >= ? ORDER BY ts LIMIT 1',
+                                             (since,)).fetchone()
+                clauses.append('reports_fts.rowid >= ?')
+                params.append(first[0] if first else self._next_id)
+            if until is not None:
+                last = self._reader.execute('SELECT id FROM reports WHERE ts < ? ORDER BY ts DESC LIMIT 1',
+                                            (until,)).fetchone()
+                clauses.append('reports_fts.rowid <= ?')
+                params.append(last[0] if last else 0)
+        filters = ''.join(f' AND {clause}' for clause in clauses)
+        # CROSS JOIN keeps the full-text index as the outer loop; driving from the camera
+        # index instead probes the index once per report of that camera
+        source = 'FROM reports_fts CROSS JOIN reports r ON r.id = reports_fts.rowid WHERE reports_fts MATCH ?'
+        limit = max(1, min(int(limit), SEARCH_LIMIT))
+
+        for operator in (' AND ', ' OR '):
+            match = operator.join(f'"{term}"' for term in terms)
+            window, window_params = '', []
+            with self._read_lock:
+                if order != 'recent':
+                    # Walking matches newest-first is cheap; this finds where the ranked window starts
+                    oldest = self._reader.execute(
+                        f'SELECT reports_fts.rowid {source}{filters} ORDER BY reports_fts.rowid DESC LIMIT 1 OFFSET ?',
+                        [match, *params, RANK_WINDOW - 1]).fetchone()
+                    if oldest:
+                        window, window_params = ' AND reports_fts.rowid >= ?', [oldest[0]]
+                rows = self._reader.execute(
+                    'SELECT r.id, r.camera, r.type, r.ts, r.content, '
+                    f"snippet(reports_fts, 0, ?, ?, '…', 16), rank {source}{filters}{window} "
+                    f"ORDER BY {'reports_fts.rowid DESC' if order == 'recent' else 'rank'} LIMIT ?",
+                    [marks[0], marks[1], match, *params, *window_params, limit]).fetchall()
+            if rows or len(terms) == 1:
+                break
+
+        results = []
+        for row in rows:
+            entry = self._entry(row[:5])
+            entry['snippet'] = row[5]
+            entry['score'] = round(-row[6], 3)
+            results.append(entry)
+        return results
+
+    def count(self, camera=None):
+        with self._read_lock:
+            if camera is None:
+                return self._reader.execute('SELECT COUNT(*) FROM reports').fetchone()[0]
+            return self._reader.execute('SELECT COUNT(*) FROM reports WHERE camera = ?', (camera,)).fetchone()[0]
+
+    def _writer(self):
+        conn = self._connect()
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            with self.lock:
+                batch, self._pending = self._pending, []
+            if batch:
+                started = time.perf_counter()
+                try:
+                    with conn:
+                        conn.executemany('INSERT INTO reports (id, camera, type, ts, content) '
+                                         'VALUES (?, ?, ?, ?, ?)', batch)
+                        if self.search_enabled:
+                            conn.executemany('INSERT INTO reports_fts (rowid, content) VALUES (?, ?)',
+                                             [(row[0], row[4]) for row in batch])
+                    self.rows_written += len(batch)
+                    self.batches += 1
+                except sqlite3.Error as e:
+                    # Reports stay in the hot cache; only their history is lost
+                    self.write_errors += 1
+                    print(f"Error writing {len(batch)} reports: {e}")
+                self.last_batch_ms = (time.perf_counter() - started) * 1000
+                with self.written:
+                    self._written_id = batch[-1][0]
+                    self.written.notify_all()
+            elif self._stop.is_set():
+                break
+        conn.close()
+
+    def flush(self, timeout=10.0):
+        """Wait until every report added so far has been committed"""
+        with self.lock:
+            target = self._next_id - 1
+        self._wake.set()
+        with self.written:
+            return self.written.wait_for(lambda: self._written_id >= target, timeout)
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(10)
+        with self._read_lock:
+            self._reader.close()
+
+    def to_dict(self):
+        with self.lock:
+            pending = len(self._pending)
+            cameras = len(self._hot)
+        return {
+            'path': self.path,
+            'rows_written': self.rows_written,
+            'batches': self.batches,
+            'avg_batch_size': round(self.rows_written / self.batches, 1) if self.batches else None,
+            'last_batch_ms': round(self.last_batch_ms, 2) if self.last_batch_ms is not None else None,
+            'pending': pending,
+            'write_errors': self.write_errors,
+            'hot_cameras': cameras,
+            'search_enabled': self.search_enabled
+        }
+
+
+def run_benchmark(rows=1000000, cameras=32, path=None, queries=200):
+    """Insert throughput and query latency of a store filled with `rows` reports"""
+    import random
+    import tempfile
+
+    directory = None
+    if path is None:
+        directory = tempfile.mkdtemp(prefix='report_store_')
+        path = os.path.join(directory, 'reports.db')
+    store = ReportStore(path, batch_size=5000)
+    types = ['Analysis', 'Anomaly Detection', 'Background Scan', 'auto_analysis', 'auto_anomaly']
+    content = ('CAMERA ANOMALY CHECK\n' + '=' * 35 + '\nStatus: NORMAL\n\n'
+               'No significant anomalies detected. Two vehicles waiting at the junction, '
+               'pedestrians on the crossing, traffic flowing normally.')
+    # One report per camera every ~30 s, ending now
+    start_ts = time.time() - rows * 30.0 / cameras
+
+    started = time.perf_counter()
+    for n in range(rows):
+        store.add(camera_key(n % cameras), types[n % len(types)], content, start_ts + n * 30.0 / cameras)
+    queued = time.perf_counter() - started
+    store.flush(timeout=None)
+    committed = time.perf_counter() - started
+
+    def timed(fn):
+        samples = []
+        for _ in range(queries):
+            t = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - t) * 1000)
+        samples.sort()
+        return {'p50_ms': round(samples[len(samples) // 2], 3), 'p95_ms': round(samples[int(len(samples) * 0.95)], 3)}
+
+    end_ts = start_ts + rows * 30.0 / cameras
+    day = 86400.0
+
+    def random_window(span):
+        since = random.uniform(start_ts, max(start_ts, end_ts - span))
+        return since, since + span
+
+    results = {
+        'rows': rows,
+        'cameras': cameras,
+        'queue_rate_per_s': round(rows / queued),
+        'insert_rate_per_s': round(rows / committed),
+        'db_size_mb': round(os.path.getsize(path) / 1e6, 1),
+        'recent_hot': timed(lambda: store.recent(camera_key(random.randrange(cameras)), 10)),
+        'latest_camera': timed(lambda: store.query(camera=camera_key(random.randrange(cameras)), limit=50)),
+        'camera_day': timed(lambda: store.query(camera_key(random.randrange(cameras)), None, *random_window(day), 100)),
+        'type_hour': timed(lambda: store.query(None, random.choice(types), *random_window(3600.0), 100)),
+        'camera_type_week': timed(lambda: store.query(camera_key(random.randrange(cameras)), random.choice(types),
+                                                      *random_window(7 * day), 100))
+    }
+    store.close()
+    if directory:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.rmdir(directory)
+    return results
+
+
+SEARCH_SCENES = [
+    'a person is standing on a ladder near the loading dock',
+    'two vehicles are waiting at the junction while pedestrians cross',
+    'a delivery van is parked in the fire lane with hazard lights on',
+    'a cyclist rides along the pavement past the entrance',
+    'a group of people is gathered near the bus stop',
+    'a person is loitering near the entrance and looking into parked cars',
+    'smoke is visible near the rear of the warehouse',
+    'a forklift is moving pallets across the yard',
+    'the car park is empty and the lighting is dim',
+    'a dog is running across the lawn without a leash'
+]
+SEARCH_QUERIES = ['ladder', 'someone on a ladder', 'smoke warehouse', 'forklift pallets',
+                  'dog leash', 'loitering entrance', 'person']
+
+
+def run_search_benchmark(rows=1000000, sources=4, path=None, queries=50):
+    """Full-text search latency over about a year of reports from `sources` cameras"""
+    import random
+    import tempfile
+
+    directory = None
+    if path is None:
+        directory = tempfile.mkdtemp(prefix='report_search_')
+        path = os.path.join(directory, 'reports.db')
+    store = ReportStore(path, batch_size=5000)
+    rng = random.Random(1)
+    span = 365 * 86400.0
+    start_ts = time.time() - span
+    started = time.perf_counter()
+    for n in range(rows):
+        scenes = rng.sample(SEARCH_SCENES, 2)
+        status = 'ANOMALIES DETECTED' if 'loitering' in scenes[0] or 'smoke' in scenes[0] else 'NORMAL'
+        content = (f'CAMERA ANOMALY CHECK\nStatus: {status}\n\nDetection Results:\n'
+                   f'{scenes[0].capitalize()}. In the background, {scenes[1]}.')
+        store.add(camera_key(n % sources), 'Anomaly Detection', content, start_ts + n * span / rows)
+    store.flush(timeout=None)
+    indexed = time.perf_counter() - started
+
+    def timed(**kwargs):
+        samples = []
+        for _ in range(queries):
+            t = time.perf_counter()
+            found = store.search(rng.choice(SEARCH_QUERIES), **kwargs)
+            samples.append((time.perf_counter() - t) * 1000)
+        samples.sort()
+        return {'p50_ms': round(samples[len(samples) // 2], 1), 'p95_ms': round(samples[int(len(samples) * 0.95)], 1),
+                'max_ms': round(samples[-1], 1), 'last_hits': len(found)}
+
+    now = time.time()
+    results = {
+        'rows': rows,
+        'index_rate_per_s': round(rows / indexed),
+        'db_size_mb': round(os.path.getsize(path) / 1e6, 1),
+        'ranked': timed(),
+        'recent': timed(order='recent'),
+        'ranked_camera': timed(camera=camera_key(1)),
+        'recent_camera': timed(camera=camera_key(1), order='recent'),
+        'ranked_camera_week': timed(camera=camera_key(1), since=now - 7 * 86400),
+        'recent_camera_week': timed(camera=camera_key(1), since=now - 7 * 86400, order='recent')
+    }
+    store.close()
+    if directory:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.rmdir(directory)
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the SQLite report store')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--cameras', type=int, default=32)
+    parser.add_argument('--search', action='store_true', help='benchmark full-text search instead')
+    args = parser.parse_args()
+
+    if args.search:
+        print(f"Report search benchmark: {args.rows} reports over a year")
+        results = run_search_benchmark(args.rows)
+    else:
+        print(f"Report store benchmark: {args.rows} reports over {args.cameras} cameras")
+        results = run_benchmark(args.rows, args.cameras)
+    for key, value in results.items():
+        print(f"  {key}: {value}")
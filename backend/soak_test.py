@@ -0,0 +1,342 @@
+import os
+import json
+import time
+import random
+import resource
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANOMALY = ("ANOMALY DETECTED: A person is loitering near the entrance and repeatedly "
+                "looking into parked vehicles. Risk level: medium.")
+STUB_NORMAL = "No significant anomalies detected. Normal activity observed in the monitored area."
+
+
+def use_scratch_dirs():
+    """Point reports, evidence clips and recordings at scratch space, not the dashboard's history.
+
+    Must run before app is imported; settings already in the environment win.
+    """
+    scratch_dir = tempfile.mkdtemp(prefix='soak_')
+    os.environ.setdefault('REPORT_DB', os.path.join(scratch_dir, 'reports.db'))
+    os.environ.setdefault('EVIDENCE_DIR', os.path.join(scratch_dir, 'evidence'))
+    os.environ.setdefault('RECORDINGS_DIR', os.path.join(scratch_dir, 'recordings'))
+    return scratch_dir
+
+
+class StubVlmHandler(BaseHTTPRequestHandler):
+    """Answers VILA chat-completion requests after a log-normal delay"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        # Drain the (base64 frame) payload like the real API would
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(random.lognormvariate(0, stub.latency_sigma) * stub.median_latency)
+        stub.record()
+        content = STUB_ANOMALY if random.random() < stub.anomaly_rate else STUB_NORMAL
+        body = json.dumps({'choices': [{'message': {'role': 'assistant', 'content': content}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubVlm:
+    """Local stand-in for the VILA endpoint so soak runs cost nothing and never rate-limit"""
+
+    def __init__(self, median_latency=1.5, latency_sigma=0.4, anomaly_rate=0.1):
+        self.median_latency = median_latency
+        self.latency_sigma = latency_sigma
+        self.anomaly_rate = anomaly_rate
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._server = None
+
+    def record(self):
+        with self.lock:
+            self.requests += 1
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), StubVlmHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f'http://127.0.0.1:{self._server.server_address[1]}/v1/vlm/nvidia/vila'
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def percentiles(values, points=(0.5, 0.95, 0.99)):
+    """{'p50': ..., 'p95': ..., 'p99': ...} in milliseconds, or None when empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {f'p{int(point * 100)}': round(ordered[min(len(ordered) - 1, int(point * len(ordered)))] * 1000, 1)
+            for point in points}
+
+
+def current_rss_mb():
+    """Resident set size now (Linux), falling back to the peak elsewhere"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def camera_urls(count, transport, simulator=None):
+    """Mixed fleet: every camera has periodic motion, one in four stalls, one in four drops"""
+    urls = []
+    for index in range(1, count + 1):
+        options = {'fps': 10, 'motion_every': 30, 'motion_seconds': 5}
+        if index % 4 == 2:
+            options.update({'stall_every': 240, 'stall_seconds': 20})
+        elif index % 4 == 3:
+            options['disconnect_after'] = 600
+        if transport == 'http':
+            urls.append(simulator.url(index, **options))
+        else:
+            query = '&'.join(f'{key}={value}' for key, value in options.items())
+            urls.append(f'synthetic://{index}?{query}')
+    return urls
+
+
+def run_soak(cameras=8, duration=3600.0, report_every=60.0, transport='synthetic', viewers=2,
+             vlm_latency=1.5, anomaly_rate=0.1, anomaly_interval=20, trace_memory=False, record=False):
+    """Run the full surveillance pipeline against simulated cameras and a stub VLM.
+
+    Cameras are started through the real API, the background scanner
+    performs the anomaly checks and `viewers` clients poll every camera's
+    preview; with record every camera is also recorded continuously.
+    Prints a progress line every report_every seconds and returns the
+    final report.
+    """
+    import tracemalloc
+    import app as backend
+    from camera_simulator import CameraSimulator
+    from synthetic_camera import allow_synthetic
+
+    allow_synthetic()
+    if trace_memory:
+        tracemalloc.start()
+
+    stub = StubVlm(vlm_latency, anomaly_rate=anomaly_rate)
+    backend.video_processor.VILA_API_URL = stub.start()
+    simulator = CameraSimulator(port=0).start() if transport == 'http' else None
+    client = backend.app.test_client()
+
+    for camera_id, url in enumerate(camera_urls(cameras, transport, simulator), start=1):
+        if camera_id not in backend.camera_registry:
+            client.post('/api/surveillance/cameras', json={'camera_id': camera_id})
+        client.patch(f'/api/surveillance/cameras/{camera_id}', json={
+            'analysis_profile': {'anomaly': {'base_interval': anomaly_interval, 'min_interval': 5}}
+        })
+        client.post(f'/api/surveillance/recording/{camera_id}', json={'enabled': record})
+        response = client.post('/api/surveillance/start', json={'camera_id': camera_id, 'camera_url': url})
+        if response.status_code != 200:
+            raise RuntimeError(f"Camera {camera_id} failed to start: {response.get_json()}")
+
+    stop = threading.Event()
+    frame_latencies = []
+    frame_errors = [0]
+
+    def viewer(index):
+        viewer_client = backend.app.test_client()
+        while not stop.is_set():
+            for camera_id in range(1, cameras + 1):
+                started = time.monotonic()
+                response = viewer_client.get(f'/api/surveillance/frame/{camera_id}?client=soak{index}')
+                if response.status_code == 200:
+                    frame_latencies.append(time.monotonic() - started)
+                else:
+                    frame_errors[0] += 1
+            stop.wait(0.2)
+
+    threads = [threading.Thread(target=viewer, args=(index,), daemon=True) for index in range(viewers)]
+    for thread in threads:
+        thread.start()
+
+    # Memory growth is measured from after warm-up, once caches and buffers exist
+    started = time.monotonic()
+    stop.wait(min(30.0, duration / 4))
+    baseline_rss = current_rss_mb()
+    baseline_snapshot = tracemalloc.take_snapshot() if trace_memory else None
+    baseline_at = time.monotonic()
+    samples = []
+
+    try:
+        while time.monotonic() - started < duration:
+            stop.wait(min(report_every, max(0.0, duration - (time.monotonic() - started))))
+            scanner = backend.surveillance_scanner.to_dict()
+            rss = current_rss_mb()
+            samples.append((time.monotonic() - baseline_at, rss))
+            print(f"  {time.monotonic() - started:>7.0f}s  scans {scanner['scans']:>5}  "
+                  f"anomalies {scanner['anomalies']:>4}  {scanner['scans_per_minute']:>3} scans/min  "
+                  f"rss {rss:.1f} MB")
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+    elapsed_hours = max((time.monotonic() - baseline_at) / 3600, 1e-6)
+    scanner = backend.surveillance_scanner.to_dict()
+    status = client.get('/api/surveillance/status').get_json()['status']['cameras']
+    capture = [camera['capture'] for camera in status.values() if camera['active']]
+    connections = [camera['connection'] for camera in status.values() if camera.get('connection')]
+    vila = backend.video_processor.vila_usage
+    final_rss = current_rss_mb()
+
+    report = {
+        'cameras': cameras,
+        'transport': transport,
+        'duration_s': round(time.monotonic() - started),
+        'scans': scanner['scans'],
+        'anomalies': scanner['anomalies'],
+        'failed_scans': scanner['failed'],
+        'scans_per_minute': round(scanner['scans'] / max((time.monotonic() - started) / 60, 1e-6), 1),
+        'vlm_requests': stub.requests,
+        'vlm_latency_ms': {f'p{int(point * 100)}': round((vila.latency_percentile(point) or 0) * 1000, 1)
+                           for point in (0.5, 0.95, 0.99)},
+        'scan_queue_latency_ms': {'avg': scanner['avg_queue_latency_ms'], 'max': scanner['max_queue_latency_ms']},
+        'frame_request_latency_ms': percentiles(frame_latencies),
+        'frame_request_errors': frame_errors[0],
+        'avg_decode_fps_per_camera': round(sum(stats['decode_fps'] for stats in capture) / max(len(capture), 1), 1),
+        'reconnects': sum(conn['reconnects'] for conn in connections),
+        'stalls': sum(conn['stalls'] for conn in connections),
+        'max_staleness_s': max((cam['staleness_seconds'] or 0 for cam in scanner['cameras'].values()), default=None),
+        'rss_baseline_mb': round(baseline_rss, 1),
+        'rss_final_mb': round(final_rss, 1),
+        'rss_growth_mb_per_hour': round((final_rss - baseline_rss) / elapsed_hours, 1)
+    }
+    if record:
+        recorder = backend.continuous_recorder.to_dict()
+        report['recorded_mb'] = recorder['stored_mb']
+        report['recorded_frames'] = recorder['frames_written']
+        report['recording_encode_ms'] = recorder['avg_encode_ms']
+
+    if trace_memory:
+        growth = tracemalloc.take_snapshot().compare_to(baseline_snapshot, 'lineno')[:10]
+        report['top_allocation_growth'] = [str(stat) for stat in growth]
+        tracemalloc.stop()
+
+    for camera_id in range(1, cameras + 1):
+        client.post('/api/surveillance/stop', json={'camera_id': camera_id})
+    if simulator:
+        simulator.stop()
+    stub.stop()
+    return report
+
+
+def write_test_recording(path, seconds=60, fps=15):
+    """Render a synthetic recording with periodic motion events, for replay runs without a camera"""
+    import cv2
+    from synthetic_camera import SyntheticCapture
+
+    source = SyntheticCapture(640, 360, fps, seed=7)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (640, 360))
+    frame = None
+    for index in range(int(seconds * fps)):
+        # The box moves for 6 s out of every 20 s of recording time
+        if (index / fps) % 20 >= 14:
+            source.position += 1
+        _, frame = source.retrieve(frame)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def run_live_replay(path, speed=4.0, vlm_latency=0.5, anomaly_rate=0.2, timeout=600.0):
+    """Play a recording through the live pipeline (capture, workers, reports) against a stub VLM.
+
+    Returns throughput and latency figures for regression tracking; the
+    frames chosen for analysis depend only on the file and the speed.
+    """
+    import replay_source
+    import app as backend
+
+    stub = StubVlm(vlm_latency, anomaly_rate=anomaly_rate)
+    backend.video_processor.VILA_API_URL = stub.start()
+    replay_source.REPLAY_DIR = os.path.dirname(os.path.abspath(path))
+    client = backend.app.test_client()
+
+    response = client.post('/api/live/start', json={'replay': os.path.basename(path), 'speed': speed})
+    if response.status_code != 200:
+        raise RuntimeError(f"Replay failed to start: {response.get_json()}")
+    started = time.monotonic()
+    replay = backend.video_processor.live_replay
+    while not replay.finished and time.monotonic() - started < timeout:
+        time.sleep(0.5)
+    wall = time.monotonic() - started
+
+    analysis = backend.analysis_scheduler.entry('live', 'analysis').gate.to_dict()
+    anomaly = backend.analysis_scheduler.entry('live', 'anomaly').gate.to_dict()
+    capture = backend.video_processor.live_capture_stats.to_dict()
+    vila = backend.video_processor.vila_usage
+    report = {
+        'recording': os.path.basename(path),
+        'speed': speed,
+        'wall_seconds': round(wall, 1),
+        'replay': replay.to_dict(),
+        'analysis_frames_sampled': capture['decoded'],
+        'avg_capture_to_publish_ms': capture['avg_capture_to_publish_ms'],
+        'analyses': analysis['calls_made'],
+        'anomaly_checks': anomaly['calls_made'],
+        'motion_triggered': analysis['motion_triggered'] + anomaly['motion_triggered'],
+        'avg_trigger_to_alert_ms': anomaly['avg_trigger_to_alert_ms'],
+        'vlm_requests': stub.requests,
+        'vlm_latency_ms': {f'p{int(point * 100)}': round((vila.latency_percentile(point) or 0) * 1000, 1)
+                           for point in (0.5, 0.95, 0.99)},
+        'reports': len(backend.report_store.recent('live'))
+    }
+    client.post('/api/live/stop')
+    stub.stop()
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Soak-test the surveillance pipeline against simulated cameras')
+    parser.add_argument('--cameras', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=3600.0, help='seconds')
+    parser.add_argument('--report-every', type=float, default=60.0, help='seconds')
+    parser.add_argument('--transport', choices=('synthetic', 'http'), default='synthetic',
+                        help='in-process synthetic:// sources or MJPEG over HTTP from the simulator')
+    parser.add_argument('--viewers', type=int, default=2)
+    parser.add_argument('--vlm-latency', type=float, default=1.5, help='median stub VLM latency in seconds')
+    parser.add_argument('--anomaly-rate', type=float, default=0.1)
+    parser.add_argument('--anomaly-interval', type=float, default=20.0, help='base anomaly scan interval per camera')
+    parser.add_argument('--trace-memory', action='store_true', help='report the allocation sites that grew')
+    parser.add_argument('--record', action='store_true', help='also record every camera continuously')
+    parser.add_argument('--replay', metavar='FILE', nargs='?', const='',
+                        help='instead of the soak run, replay FILE (or a generated recording) as the live camera')
+    parser.add_argument('--speed', type=float, default=4.0, help='replay speed multiplier')
+    args = parser.parse_args()
+    use_scratch_dirs()
+
+    if args.replay is not None:
+        recording = args.replay or write_test_recording(os.path.join(tempfile.mkdtemp(), 'replay_test.mp4'))
+        print(f"Live replay: {os.path.basename(recording)} at {args.speed:g}x")
+        for key, value in run_live_replay(recording, args.speed, args.vlm_latency, args.anomaly_rate).items():
+            print(f"  {key}: {value}")
+        raise SystemExit(0)
+
+    print(f"Soak test: {args.cameras} cameras over {args.transport} for {args.duration:.0f}s")
+    results = run_soak(args.cameras, args.duration, args.report_every, args.transport, args.viewers,
+                       args.vlm_latency, args.anomaly_rate, args.anomaly_interval, args.trace_memory,
+                       args.record)
+    print("Soak test report")
+    for key, value in results.items():
+        if isinstance(value, list):
+            print(f"  {key}:")
+            for line in value:
+                print(f"    {line}")
+        else:
+            print(f"  {key}: {value}")
@@ -0,0 +1,187 @@
+import time
+import threading
+from collections import deque
+
+ACTIVITY_WEIGHT = 2.0        # cameras with scene activity get twice their share
+DISPATCH_INTERVAL = 0.5      # seconds between checks for due cameras
+
+
+class ScanJob:
+    __slots__ = ('camera_id', 'enqueued', 'trigger_time')
+
+    def __init__(self, camera_id, enqueued, trigger_time=None):
+        self.camera_id = camera_id
+        self.enqueued = enqueued
+        # Set when the scan was triggered by motion, for trigger-to-alert latency
+        self.trigger_time = trigger_time
+
+
+class SurveillanceScanner:
+    """Unattended anomaly scanning across all active surveillance cameras.
+
+    A dispatcher thread asks each camera's ScheduledAnalysis whether a scan is
+    due and queues at most one job per camera. Worker threads (one per
+    allowed concurrent VILA call) take the queued camera with the lowest
+    virtual time: every finished scan advances a camera's virtual time by its
+    duration divided by its weight (priority, doubled while the scene is
+    active), so busy or important cameras get proportionally more scans and
+    no camera is starved.
+    """
+
+    def __init__(self, get_cameras, get_schedule, run_scan, concurrency=2):
+        # get_cameras() -> CameraRegistry
+        self.get_cameras = get_cameras
+        # get_schedule(camera_id) -> ScheduledAnalysis for the camera's anomaly checks
+        self.get_schedule = get_schedule
+        # run_scan(camera_id, trigger_time) -> True if an anomaly was found, None if the camera could not be scanned
+        self.run_scan = run_scan
+        self.concurrency = concurrency
+        self.enabled = True
+        self.lock = threading.Condition()
+        self._queue = {}
+        self._running = set()
+        self._virtual_time = {}
+        self._threads = []
+        self._stop = threading.Event()
+        self.scans = 0
+        self.anomalies = 0
+        self.failed = 0
+        self.last_scan = {}
+        self._completed = deque()
+        self._queue_latency = deque(maxlen=100)
+
+    def start(self):
+        """Start the dispatcher and workers once; later calls are no-ops"""
+        with self.lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            self._threads = [threading.Thread(target=self._dispatch_loop, daemon=True)]
+            self._threads += [threading.Thread(target=self._worker_loop, daemon=True)
+                              for _ in range(self.concurrency)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self.lock:
+            self.lock.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout=5)
+
+    def forget(self, camera_id):
+        """Drop fair-share state for a camera removed from the registry"""
+        with self.lock:
+            self._queue.pop(camera_id, None)
+            self._virtual_time.pop(camera_id, None)
+            self.last_scan.pop(camera_id, None)
+
+    def _weight(self, camera):
+        weight = max(0.1, float(camera.priority))
+        if camera.motion.is_active():
+            weight *= ACTIVITY_WEIGHT
+        return weight
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.enabled:
+                    self._enqueue_due()
+            except Exception as e:
+                print(f"Error in surveillance scan dispatcher: {e}")
+            self._stop.wait(DISPATCH_INTERVAL)
+
+    def _enqueue_due(self):
+        now = time.monotonic()
+        cameras = self.get_cameras()
+        with self.lock:
+            # Cameras that just became active start level with the least-served one
+            floor = min(self._virtual_time.values(), default=0.0)
+            for camera in cameras.active():
+                camera_id = camera.id
+                if camera_id in self._queue or camera_id in self._running:
+                    continue
+                schedule = self.get_schedule(camera_id)
+                if schedule is None:
+                    continue
+                run, _, trigger_time = schedule.due(now)
+                if not run:
+                    continue
+                self._virtual_time[camera_id] = max(self._virtual_time.get(camera_id, floor), floor)
+                self._queue[camera_id] = ScanJob(camera_id, now, trigger_time)
+            if self._queue:
+                self.lock.notify_all()
+
+    def _next_job(self):
+        with self.lock:
+            while not self._queue and not self._stop.is_set():
+                self.lock.wait(1.0)
+            if self._stop.is_set():
+                return None
+            camera_id = min(self._queue, key=lambda cam: self._virtual_time.get(cam, 0.0))
+            job = self._queue.pop(camera_id)
+            self._running.add(camera_id)
+            self._queue_latency.append(time.monotonic() - job.enqueued)
+            return job
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            job = self._next_job()
+            if job is None:
+                return
+
+            started = time.monotonic()
+            try:
+                found = self.run_scan(job.camera_id, job.trigger_time)
+            except Exception as e:
+                print(f"Error scanning camera {job.camera_id}: {e}")
+                found = None
+            finished = time.monotonic()
+
+            camera = self.get_cameras().get(job.camera_id)
+            with self.lock:
+                self._running.discard(job.camera_id)
+                weight = self._weight(camera) if camera else 1.0
+                self._virtual_time[job.camera_id] = (
+                    self._virtual_time.get(job.camera_id, 0.0) + (finished - started) / weight
+                )
+                if found is None:
+                    self.failed += 1
+                    continue
+                self.scans += 1
+                self.anomalies += 1 if found else 0
+                self.last_scan[job.camera_id] = finished
+                self._completed.append(finished)
+
+    def to_dict(self):
+        now = time.monotonic()
+        cameras = self.get_cameras()
+        with self.lock:
+            while self._completed and now - self._completed[0] > 60:
+                self._completed.popleft()
+            latencies = list(self._queue_latency)
+            per_camera = {}
+            for camera_id, camera in cameras.items():
+                last = self.last_scan.get(camera_id)
+                per_camera[camera_id] = {
+                    'active': camera.active,
+                    'priority': camera.priority,
+                    'weight': round(self._weight(camera), 2),
+                    'state': 'running' if camera_id in self._running else 'queued' if camera_id in self._queue else 'idle',
+                    'staleness_seconds': round(now - last, 1) if last else None,
+                    'virtual_time': round(self._virtual_time.get(camera_id, 0.0), 2)
+                }
+            return {
+                'enabled': self.enabled,
+                'running': bool(self._threads),
+                'concurrency': self.concurrency,
+                'scans': self.scans,
+                'anomalies': self.anomalies,
+                'failed': self.failed,
+                'scans_per_minute': len(self._completed),
+                'queued': len(self._queue),
+                'avg_queue_latency_ms': round(sum(latencies) * 1000 / len(latencies), 1) if latencies else None,
+                'max_queue_latency_ms': round(max(latencies) * 1000, 1) if latencies else None,
+                'cameras': per_camera
+            }
@@ -0,0 +1,222 @@
+import os
+import cv2
+import time
+import numpy as np
+from urllib.parse import urlparse, parse_qs
+
+from replay_source import resolve_replay_path
+
+SCHEME = 'synthetic://'
+JPEG_CYCLE = 30              # pre-encoded frames replayed in jpeg mode
+# synthetic:// URLs are for the test and benchmark tools; the server only opens them when this is set to 1
+ALLOW_ENV = 'ALLOW_SYNTHETIC_CAMERAS'
+MAX_WIDTH, MAX_HEIGHT = 3840, 2160
+MAX_FPS = 60.0
+
+# Opens attempted per synthetic URL, for sources configured to refuse the first few
+_open_attempts = {}
+
+
+class SyntheticCapture:
+    """cv2.VideoCapture stand-in producing a generated live stream.
+
+    grab() blocks until the next frame is due at the configured fps, like a
+    network camera; retrieve() renders a static gradient with a moving box,
+    writing into the caller's buffer when one is given. With jpeg_quality
+    set, retrieve() decodes pre-encoded JPEG frames instead, which costs
+    about as much CPU as decoding a real MJPEG camera. With a file, the
+    recording is looped at the stream's fps and the box is drawn over it.
+    Used by scale tests and anywhere a real camera is not available.
+
+    With motion_every set the box only moves for motion_seconds out of every
+    motion_every seconds, so the scene alternates between static and active.
+    Faults can be injected to exercise reconnect handling: the stream drops
+    for good disconnect_after seconds after opening, and every stall_every
+    seconds grab() hangs for stall_seconds like a dead RTSP session.
+    """
+
+    def __init__(self, width=640, height=360, fps=15, seed=0, jpeg_quality=None, file=None,
+                 motion_every=None, motion_seconds=3.0,
+                 disconnect_after=None, stall_every=None, stall_seconds=0.0):
+        self._file = None
+        if file:
+            self._file = cv2.VideoCapture(file)
+            if not self._file.isOpened():
+                raise ValueError(f'Cannot open recording {file}')
+            width = int(self._file.get(cv2.CAP_PROP_FRAME_WIDTH)) or width
+            height = int(self._file.get(cv2.CAP_PROP_FRAME_HEIGHT)) or height
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.seed = seed
+        self.motion_every = motion_every
+        self.motion_seconds = motion_seconds
+        self.disconnect_after = disconnect_after
+        self.stall_every = stall_every
+        self.stall_seconds = stall_seconds
+        self.frames = 0
+        self.position = 0
+        self._opened = True
+        self._opened_at = time.monotonic()
+        self._next_stall = self._opened_at + stall_every if stall_every else None
+        self._next_frame = self._opened_at
+        rows = np.linspace(0, 255, height, dtype=np.uint8)[:, None]
+        cols = np.linspace(0, 255, width, dtype=np.uint8)[None, :]
+        self._background = np.dstack([
+            np.broadcast_to(rows, (height, width)),
+            np.broadcast_to(cols, (height, width)),
+            np.full((height, width), (seed * 37) % 256, dtype=np.uint8)
+        ])
+        self._encoded = None
+        if jpeg_quality and self._file is None:
+            frame = np.empty_like(self._background)
+            self._encoded = []
+            for index in range(JPEG_CYCLE):
+                self.position = index
+                self._render(frame)
+                self._encoded.append(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)])[1])
+            self.position = 0
+
+    @classmethod
+    def from_url(cls, url):
+        """Build a source from synthetic://<seed>?width=640&height=360&fps=15&jpeg=80.
+
+        Also accepts file (a recording to loop), motion_every/motion_seconds,
+        and the fault parameters disconnect_after, stall_every and stall_seconds.
+        Sizes and rates are clamped, and file must name a recording in the
+        replay directory; raises ValueError otherwise.
+        """
+        parsed = urlparse(url)
+        params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+        def optional(key):
+            return float(params[key]) if params.get(key) else None
+
+        return cls(
+            width=max(16, min(int(params.get('width', 640)), MAX_WIDTH)),
+            height=max(16, min(int(params.get('height', 360)), MAX_HEIGHT)),
+            fps=max(1.0, min(float(params.get('fps', 15)), MAX_FPS)),
+            seed=int(parsed.netloc or 0),
+            jpeg_quality=int(params['jpeg']) if params.get('jpeg') else None,
+            file=resolve_replay_path(params['file']) if params.get('file') else None,
+            motion_every=optional('motion_every'),
+            motion_seconds=optional('motion_seconds') or 3.0,
+            disconnect_after=optional('disconnect_after'),
+            stall_every=optional('stall_every'),
+            stall_seconds=optional('stall_seconds') or 0.0
+        )
+
+    def isOpened(self):
+        return self._opened
+
+    def motion_active(self, now=None):
+        if self.motion_every is None:
+            return True
+        now = time.monotonic() if now is None else now
+        return (now - self._opened_at) % self.motion_every >= self.motion_every - self.motion_seconds
+
+    def grab(self):
+        if not self._opened:
+            return False
+        now = time.monotonic()
+        if self.disconnect_after is not None and now - self._opened_at >= self.disconnect_after:
+            self._opened = False
+            return False
+        if self._next_stall is not None and now >= self._next_stall:
+            time.sleep(self.stall_seconds)
+            self._next_stall = time.monotonic() + self.stall_every
+            self._next_frame = time.monotonic()
+        delay = self._next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_frame = max(self._next_frame + 1.0 / self.fps, time.monotonic() - 1.0 / self.fps)
+        self.frames += 1
+        if self.motion_active():
+            self.position += 1
+        return True
+
+    def _draw_box(self, frame):
+        size = self.height // 6
+        x = (self.position * 4 + self.seed * 50) % max(1, self.width - size)
+        y = (self.height - size) // 2
+        frame[y:y + size, x:x + size] = (255, 255, 255)
+
+    def _render(self, frame):
+        np.copyto(frame, self._background)
+        self._draw_box(frame)
+
+    def _read_file(self, frame):
+        ok, recorded = self._file.read()
+        if not ok:
+            # Loop the recording
+            self._file.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, recorded = self._file.read()
+        if ok:
+            np.copyto(frame, recorded)
+        if self.motion_every is not None and self.motion_active():
+            self._draw_box(frame)
+
+    def retrieve(self, image=None):
+        if not self._opened:
+            return False, None
+        frame = image
+        if frame is None or frame.shape != self._background.shape:
+            frame = np.empty_like(self._background)
+        if self._file is not None:
+            self._read_file(frame)
+        elif self._encoded is not None:
+            np.copyto(frame, cv2.imdecode(self._encoded[self.position % JPEG_CYCLE], cv2.IMREAD_COLOR))
+        else:
+            self._render(frame)
+        return True, frame
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        # Live sources report no position, so CameraCapture does not pace them
+        return 0.0
+
+    def set(self, prop, value):
+        return True
+
+    def release(self):
+        self._opened = False
+        if self._file is not None:
+            self._file.release()
+
+
+def allow_synthetic():
+    """Let open_capture() open synthetic:// URLs in this process and the capture workers it starts"""
+    os.environ[ALLOW_ENV] = '1'
+
+
+def open_capture(url):
+    """cv2.VideoCapture for camera URLs, SyntheticCapture for synthetic:// ones.
+
+    Synthetic URLs may add open_failures=N (refuse the first N opens) and
+    open_delay=S (take S seconds to open, like an unreachable host). They
+    raise ValueError unless ALLOW_SYNTHETIC_CAMERAS=1, so clients of the
+    server cannot ask it for simulated sources.
+    """
+    if not url.startswith(SCHEME):
+        return cv2.VideoCapture(url)
+    if os.environ.get(ALLOW_ENV) != '1':
+        raise ValueError(f'synthetic:// cameras are disabled; set {ALLOW_ENV}=1 to use them')
+
+    params = {key: values[-1] for key, values in parse_qs(urlparse(url).query).items()}
+    if params.get('open_delay'):
+        time.sleep(float(params['open_delay']))
+    attempt = _open_attempts[url] = _open_attempts.get(url, 0) + 1
+    capture = SyntheticCapture.from_url(url)
+    if attempt <= int(params.get('open_failures', 0)):
+        capture.release()
+    return capture
@@ -8,8 +8,14 @@ from io import BytesIO
 from PIL import Image
 import ssl
 import urllib3
+import threading
 from datetime import datetime
 import os
+from camera_capture import CameraCapture, CaptureDemand, CaptureStats
+from frame_slot import FrameSlot
+from motion import MotionDetector
+from analysis_scheduler import VilaUsage
+from replay_source import ReplayCapture
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -23,13 +29,28 @@ class VideoProcessor:
         
         # Live tracking state
         self.live_cap = None
+        # Set while the live feed is a recording played back by ReplayCapture
+        self.live_replay = None
+        self.last_sample_position = None
         self.live_tracking_active = False
+        # Set when the live source ended by itself (a recording played to its end)
+        self.live_finished = False
+        # Called from the capture thread when the live source ends by itself
+        self.on_live_finished = None
         self.frame_accumulator = []
         self.current_live_frame = None
         
-        # Performance optimization
-        self.frame_skip_counter = 0
-        self.frame_skip_rate = 5  # Only process every 5th frame for live display
+        # Latest-frame publisher for the live camera, fed by a capture thread
+        self.live_slot = FrameSlot()
+        self.live_demand = CaptureDemand(display_fps=15, analysis_fps=2)
+        self.live_capture_stats = CaptureStats()
+        self.live_capture_thread = None
+        
+        # Scene-change detector that gates the periodic live VILA calls
+        self.live_motion = MotionDetector()
+        
+        # Latency and call rate of every VILA request made by this processor
+        self.vila_usage = VilaUsage()
         
     def encode_frame_to_base64(self, frame):
         """Convert OpenCV frame to base64 string for API"""
@@ -51,6 +72,8 @@ class VideoProcessor:
 
     def make_vila_request(self, payload):
         """Make request to VILA API with error handling"""
+        started = time.monotonic()
+        ok = False
         try:
             headers = {
                 "Authorization": f"Bearer {self.NVIDIA_API_KEY}",
@@ -60,9 +83,13 @@ class VideoProcessor:
             session = requests.Session()
             session.verify = False
             
-            response = session.post(self.VILA_API_URL, headers=headers, json=payload, timeout=120)
+            # Global limit on concurrent VILA calls (live workers, scanner, manual requests)
+            with self.vila_usage.slot():
+                started = time.monotonic()
+                response = session.post(self.VILA_API_URL, headers=headers, json=payload, timeout=120)
             
             if response.status_code == 200:
+                ok = True
                 result = response.json()
                 return result['choices'][0]['message']['content'].strip()
             else:
@@ -78,6 +105,9 @@ class VideoProcessor:
         except Exception as e:
             print(f"Error in VILA request: {e}")
             return f"Request Error: {str(e)}"
+        finally:
+            # Latency and call rate feed the adaptive analysis scheduler
+            self.vila_usage.record(time.monotonic() - started, ok)
 
     def extract_key_frames(self, cap, total_frames, num_frames=12):
         """Extract key frames evenly distributed throughout the video"""
@@ -430,7 +460,10 @@ Keep response brief and focused on WHAT happened."""
                 'summary': summary,
                 'output_video': f'/api/video/{output_filename}',
                 'key_frames': key_frames,
-                'processing_time': processing_time
+                'processing_time': processing_time,
+                # VILA's own answer, for parse_anomaly_response
+                'anomaly_report': anomaly_report,
+                'duration': duration
             }
             
         except Exception as e:
@@ -441,12 +474,22 @@ Keep response brief and focused on WHAT happened."""
             }
 
     # Live monitoring methods with optimized performance
-    def start_live_tracking(self):
-        """Start live video tracking with camera"""
+    def start_live_tracking(self, replay_path=None, speed=1.0, loop=False):
+        """Start live video tracking with camera, or replay a recording as the live feed"""
         try:
-            # Try different camera indices
-            camera_indices = [0, 1, 2]
             self.live_cap = None
+            self.live_replay = None
+            self.last_sample_position = None
+            
+            if replay_path:
+                replay = ReplayCapture(replay_path, speed, loop)
+                if not replay.isOpened():
+                    replay.release()
+                    return False, f"Error: Could not open recording {os.path.basename(replay_path)}"
+                self.live_cap = self.live_replay = replay
+            
+            # Try different camera indices
+            camera_indices = [] if replay_path else [0, 1, 2]
             
             for idx in camera_indices:
                 test_cap = cv2.VideoCapture(idx)
@@ -471,9 +514,16 @@ Keep response brief and focused on WHAT happened."""
             self.live_cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce buffer size for lower latency
             
             self.live_tracking_active = True
+            self.live_finished = False
             self.frame_accumulator = []
             self.current_live_frame = None
-            self.frame_skip_counter = 0
+            self.live_slot = FrameSlot()
+            self.live_capture_stats = CaptureStats()
+            self.live_motion.reset()
+            
+            # Capture runs in the background so frame polls never touch the device
+            self.live_capture_thread = threading.Thread(target=self._live_capture_worker, daemon=True)
+            self.live_capture_thread.start()
             
             return True, "Live tracking started successfully"
             
@@ -485,6 +535,11 @@ Keep response brief and focused on WHAT happened."""
         print("Stopping live video tracking...")
         self.live_tracking_active = False
         
+        thread = self.live_capture_thread
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=2)
+        self.live_capture_thread = None
+        
         if self.live_cap is not None:
             self.live_cap.release()
             self.live_cap = None
@@ -492,42 +547,78 @@ Keep response brief and focused on WHAT happened."""
         
         self.current_live_frame = None
         self.frame_accumulator = []
-        self.frame_skip_counter = 0
 
-# Replace get_current_frame() in video_processor.py
-    def get_current_frame(self):
-        """Get current frame from live camera - OPTIMIZED for real-time display"""
-        if not self.live_tracking_active or self.live_cap is None:
-            return None
+    def _live_capture_worker(self):
+        """Background capture for the live camera, publishing into live_slot"""
+        capture = CameraCapture(
+            self.live_cap,
+            demand=self.live_demand,
+            stats=self.live_capture_stats,
+            frame_slot=self.live_slot,
+            clock=self.live_replay.clock if self.live_replay else None
+        )
+        
+        def collect_frame(frame, for_display, for_analysis, capture_time):
+            # Sampled at most every 0.2 s by the detector itself
+            self.live_motion.update(frame)
+            
+            # Analysis samples share the published (read-only) frame
+            if for_analysis:
+                if self.live_replay:
+                    self.last_sample_position = self.live_replay.position_seconds
+                self.frame_accumulator.append(frame)
+                # Keep only last 30 frames (about 15 seconds of samples)
+                if len(self.frame_accumulator) > 30:
+                    self.frame_accumulator = self.frame_accumulator[-30:]
         
         try:
-            # Clear buffer to get latest frame (reduces lag significantly)
-            self.live_cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            
-            ret, frame = self.live_cap.read()
-            if ret and frame is not None:
-                # Only do essential processing for display
-                display_frame = frame.copy()
-                
-                # Simple timestamp overlay (much faster than complex text)
-                cv2.putText(display_frame, f"LIVE {datetime.now().strftime('%H:%M:%S')}", 
-                        (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 1)
-                
-                # Update accumulator ONLY occasionally (every 15 frames for analysis)
-                self.frame_skip_counter += 1
-                if self.frame_skip_counter % 15 == 0:  # Reduced frequency
-                    self.frame_accumulator.append(frame.copy())
-                    # Keep only last 30 frames (5 seconds worth)
-                    if len(self.frame_accumulator) > 30:
-                        self.frame_accumulator = self.frame_accumulator[-30:]
-                
-                self.current_live_frame = display_frame
-                return display_frame
-                
+            if capture.run(lambda: self.live_tracking_active, collect_frame):
+                return
+            print("Live recording finished" if self.live_replay else "Live camera stopped delivering frames")
         except Exception as e:
-            print(f"Error getting current frame: {e}")
+            print(f"Error in live capture worker: {e}")
+        if not self.live_tracking_active:
+            return
+        
+        # The source is gone: drop its stale samples so nothing analyzes them again
+        self.live_finished = True
+        self.frame_accumulator = []
+        if self.on_live_finished:
+            self.on_live_finished()
+
+    def live_source_label(self):
+        """'Live feed', or the recording and source time of the latest analysis sample"""
+        if not self.live_replay:
+            return "Live feed"
+        position = self.last_sample_position or 0.0
+        return (f"Replay of {os.path.basename(self.live_replay.path)} at "
+                f"{int(position // 60):02d}:{position % 60:06.3f} ({self.live_replay.speed:g}x)")
+
+    def live_source_status(self):
+        """Live source details for status endpoints"""
+        if not self.live_replay:
+            return {'type': 'camera'}
+        return dict(self.live_replay.to_dict(), type='replay')
+
+    def draw_live_overlay(self, frame):
+        """Simple timestamp overlay for live display frames"""
+        cv2.putText(frame, f"LIVE {datetime.now().strftime('%H:%M:%S')}", 
+                (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 1)
+
+    def get_current_frame(self):
+        """Get the latest live frame with overlay (a private, writable copy)"""
+        if not self.live_tracking_active:
+            return None
+        
+        self.live_demand.touch_viewer()
+        _, frame, _ = self.live_slot.read()
+        if frame is None:
+            return None
         
-        return None
+        display_frame = frame.copy()
+        self.draw_live_overlay(display_frame)
+        self.current_live_frame = display_frame
+        return display_frame
 
     def analyze_live_feed(self):
         """Analyze current live feed with reduced frequency"""
@@ -545,7 +636,7 @@ Keep response brief and focused on WHAT happened."""
                    "=" * 40 + "\n" + \
                    f"Frames analyzed: {len(recent_frames)}\n" + \
                    f"Sample duration: ~{len(recent_frames)/6.0:.1f}s\n" + \
-                   f"Camera: Live feed\n\n" + \
+                   f"Camera: {self.live_source_label()}\n\n" + \
                    "Analysis:\n" + \
                    "-" * 20 + "\n" + \
                    analysis_result
@@ -569,7 +660,7 @@ Keep response brief and focused on WHAT happened."""
                    "=" * 40 + "\n" + \
                    f"Frames analyzed: {len(recent_frames)}\n" + \
                    f"Sample duration: ~{len(recent_frames)/6.0:.1f}s\n" + \
-                   f"Camera: Live feed\n\n" + \
+                   f"Camera: {self.live_source_label()}\n\n" + \
                    "Anomaly Detection Results:\n" + \
                    "-" * 30 + "\n" + \
                    anomaly_result
@@ -5,6 +5,9 @@
         let liveTrackingActive = false;
         let liveFrameInterval = null;
         let liveReportsInterval = null;
+        let liveReportsCursor = null;   // id of the newest live report received
+        let liveReportEntries = [];     // newest first, capped at MAX_LIVE_REPORTS
+        const MAX_LIVE_REPORTS = 100;
         let selectedVideoFile = null;
         let processingInterval = 15; // Default 15 seconds
 
@@ -53,8 +56,12 @@
                     updateLiveStatus(true);
                     updateLiveButtons(true);
                     
-                    // Start polling for live frame updates
-                    liveFrameInterval = setInterval(updateLiveFrame, 100); // 10 FPS display
+                    // The server starts a fresh report log for each session
+                    liveReportsCursor = null;
+                    liveReportEntries = [];
+                    
+                    // Stream live frames over MJPEG (10 FPS cap) instead of polling
+                    updateLiveFrame();
                     liveReportsInterval = setInterval(updateLiveReports, processingInterval * 1000); // User-defined interval
                     
                     showMessage('Live tracking started successfully!');
@@ -111,29 +118,32 @@
             }
         }
 
-        async function updateLiveFrame() {
+        function updateLiveFrame() {
             if (!liveTrackingActive) return;
             
-            try {
-                const response = await fetch(`${API_BASE}/live-frame`);
-                const data = await response.json();
-                
-                if (data.success && data.frame) {
-                    const container = document.getElementById('live-video-container');
-                    container.innerHTML = `<img src="${data.frame}" alt="Live feed">`;
-                }
-            } catch (error) {
-                console.error('Failed to update live frame:', error);
-            }
+            // One long-lived multipart/x-mixed-replace response replaces per-frame polling
+            const container = document.getElementById('live-video-container');
+            container.innerHTML = `<img src="${API_BASE}/live-stream?fps=10&t=${Date.now()}" alt="Live feed">`;
         }
 
         async function updateLiveReports() {
             try {
-                const response = await fetch(`${API_BASE}/live-reports`);
-                const data = await response.json();
-                
-                if (data.success) {
-                    document.getElementById('live-reports').textContent = data.reports;
+                // Only fetch reports newer than the ones already shown
+                let more = true;
+                while (more) {
+                    const query = liveReportsCursor === null ? '' : `?after=${liveReportsCursor}`;
+                    const response = await fetch(`${API_BASE}/live-reports${query}`);
+                    const data = await response.json();
+                    if (!data.success) return;
+                    
+                    if (data.reset) liveReportEntries = [];
+                    liveReportEntries = data.reports.slice().reverse().concat(liveReportEntries).slice(0, MAX_LIVE_REPORTS);
+                    liveReportsCursor = data.cursor;
+                    more = data.more;
+                    
+                    document.getElementById('live-reports').textContent = liveReportEntries.length
+                        ? liveReportEntries.map(entry => entry.content).join('')
+                        : `📋 Live analysis reports will appear here...\n\n🔄 Automatic reports every ${data.interval_seconds} seconds\n🚨 Anomaly alerts as they happen\n📊 Manual analysis reports on demand\n💬 Chat available for contextual queries`;
                 }
             } catch (error) {
                 console.error('Failed to update live reports:', error);
@@ -153,7 +163,7 @@
                 hideLoading('live-reports');
                 
                 if (data.success) {
-                    document.getElementById('live-reports').textContent = data.analysis;
+                    await updateLiveReports();
                 } else {
                     showError(data.error);
                 }
@@ -186,7 +196,7 @@
                         console.log('Custom anomalies were detected and reported');
                     }
                     
-                    document.getElementById('live-reports' || 'video-results').textContent = displayText;
+                    await updateLiveReports();
                 }
                 
                 else {
@@ -1,15 +1,103 @@
 // Main App JavaScript - Multi-page navigation with Surveillance support
+
+// One WebSocket per page for pushed JPEG frames and report/notification/status events.
+// Modules keep their polling timers as a fallback and skip them while this is open.
+class PushChannel {
+    constructor(url) {
+        this.url = url;
+        this.socket = null;
+        this.handlers = {};
+        this.frameHandlers = {};
+        this.cameraSubscriptions = {};
+        this.reconnectDelay = 1000;
+    }
+
+    connect() {
+        if (typeof WebSocket === 'undefined') return;
+
+        this.socket = new WebSocket(this.url);
+        this.socket.binaryType = 'arraybuffer';
+
+        this.socket.onopen = () => {
+            this.reconnectDelay = 1000;
+            // Restore camera subscriptions after a reconnect
+            Object.entries(this.cameraSubscriptions).forEach(([cameraId, fps]) => {
+                this.send({ action: 'subscribe', camera: Number(cameraId), fps });
+            });
+        };
+
+        this.socket.onmessage = (message) => {
+            if (message.data instanceof ArrayBuffer) {
+                this.handleFrame(message.data);
+                return;
+            }
+            const data = JSON.parse(message.data);
+            if (data.type === 'event') {
+                (this.handlers[data.topic] || []).forEach(handler => handler(data.data));
+            }
+        };
+
+        this.socket.onclose = () => {
+            this.socket = null;
+            setTimeout(() => this.connect(), this.reconnectDelay);
+            this.reconnectDelay = Math.min(this.reconnectDelay * 2, 30000);
+        };
+    }
+
+    // Binary frame: type (1 byte), camera id (2 bytes), frame seq (4 bytes), JPEG bytes
+    handleFrame(buffer) {
+        const view = new DataView(buffer);
+        if (view.getUint8(0) !== 1) return;
+        const cameraId = view.getUint16(1);
+        const handler = this.frameHandlers[cameraId];
+        if (handler) {
+            handler(new Blob([buffer.slice(7)], { type: 'image/jpeg' }));
+        }
+    }
+
+    isOpen() {
+        return this.socket !== null && this.socket.readyState === WebSocket.OPEN;
+    }
+
+    send(message) {
+        if (this.isOpen()) {
+            this.socket.send(JSON.stringify(message));
+        }
+    }
+
+    on(topic, handler) {
+        (this.handlers[topic] = this.handlers[topic] || []).push(handler);
+    }
+
+    subscribeCamera(cameraId, fps, onFrame) {
+        this.cameraSubscriptions[cameraId] = fps;
+        this.frameHandlers[cameraId] = onFrame;
+        this.send({ action: 'subscribe', camera: cameraId, fps });
+    }
+
+    unsubscribeCamera(cameraId) {
+        delete this.cameraSubscriptions[cameraId];
+        delete this.frameHandlers[cameraId];
+        this.send({ action: 'unsubscribe', camera: cameraId });
+    }
+}
+
 class VideoAnalysisDashboard {
     constructor() {
         this.apiBaseUrl = 'http://localhost:5000/api';
+        this.pushChannel = new PushChannel(this.apiBaseUrl.replace(/^http/, 'ws') + '/ws');
         this.currentPage = this.getCurrentPageFromURL();
         this.isLiveActive = false;
         this.videoContext = null;
+        this.snapshot = null;
+        this.snapshotTime = 0;
+        this.snapshotRequest = null;
         
         this.init();
     }
 
     init() {
+        this.pushChannel.connect();
         this.setupEventListeners();
         this.setupNavigation();
         this.setupFileUpload();
@@ -281,6 +369,26 @@ class VideoAnalysisDashboard {
         }
     }
 
+    // Dashboard snapshot shared by every module: callers within maxAge of each other share one
+    // request, and an unchanged snapshot is revalidated by ETag (304) instead of re-sent
+    async getSnapshot(maxAge = 1000) {
+        if (this.snapshot && Date.now() - this.snapshotTime < maxAge) {
+            return this.snapshot;
+        }
+        if (!this.snapshotRequest) {
+            this.snapshotRequest = this.apiRequest('/dashboard/snapshot', { cache: 'no-cache' })
+                .then(snapshot => {
+                    this.snapshot = snapshot;
+                    this.snapshotTime = Date.now();
+                    return snapshot;
+                })
+                .finally(() => {
+                    this.snapshotRequest = null;
+                });
+        }
+        return this.snapshotRequest;
+    }
+
     async uploadAndAnalyzeVideo(analysisType = 'analyze') {
         if (!this.selectedFile) {
             this.showToast('Please select a video file first', 'error');
@@ -378,15 +486,15 @@ class VideoAnalysisDashboard {
     // Dashboard Methods
     async updateDashboardStats() {
         try {
-            const stats = await this.apiRequest('/status');
+            const stats = (await this.getSnapshot()).status;
             
             const accidentsCount = document.getElementById('accidentsCount');
             const camerasCount = document.getElementById('camerasCount');
             const learningCount = document.getElementById('learningCount');
 
             if (accidentsCount) accidentsCount.textContent = stats.accidents || '0';
-            if (camerasCount) camerasCount.textContent = stats.active_cameras || '24';
-            if (learningCount) learningCount.textContent = stats.ai_scanned || '4,294';
+            if (camerasCount) camerasCount.textContent = stats.active_cameras || '0';
+            if (learningCount) learningCount.textContent = (stats.ai_scanned || 0).toLocaleString();
 
         } catch (error) {
             console.error('Failed to update dashboard stats:', error);
@@ -395,11 +503,11 @@ class VideoAnalysisDashboard {
 
     async loadRecentActivity() {
         try {
-            const activity = await this.apiRequest('/activity');
+            const activity = (await this.getSnapshot()).activity;
             const activityList = document.getElementById('activityList');
             
-            if (activityList && activity.items) {
-                activityList.innerHTML = activity.items.map(item => `
+            if (activityList && activity) {
+                activityList.innerHTML = activity.map(item => `
                     <div class="activity-item">
                         <div class="activity-icon ${item.type}">
                             <i class="${item.icon}"></i>
@@ -584,7 +692,7 @@ class VideoAnalysisDashboard {
 
     startPeriodicUpdates() {
         setInterval(() => {
-            if (this.currentPage === 'dashboard') {
+            if (this.currentPage === 'dashboard' && !this.pushChannel.isOpen()) {
                 this.updateDashboardStats();
                 this.loadRecentActivity();
             }
@@ -107,15 +107,21 @@ class ChatModule {
     }
 
     startContextMonitoring() {
-        // Monitor context status every 3 seconds
+        // Context only changes when reports or live status change, which are pushed
+        this.dashboard.pushChannel.on('report', () => this.checkContextStatus());
+        this.dashboard.pushChannel.on('status', () => this.checkContextStatus());
+
+        // Monitor context status every 3 seconds when the push channel is down
         setInterval(() => {
-            this.checkContextStatus();
+            if (!this.dashboard.pushChannel.isOpen()) {
+                this.checkContextStatus();
+            }
         }, 3000);
     }
 
     async checkContextStatus() {
         try {
-            const response = await this.dashboard.apiRequest('/chat/context');
+            const response = (await this.dashboard.getSnapshot()).context;
             
             if (response) {
                 const newContextSource = response.current_context_source;
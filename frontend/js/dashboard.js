@@ -14,6 +14,8 @@ class DashboardModule {
         this.accidentsCount = document.getElementById('accidentsCount');
         this.camerasCount = document.getElementById('camerasCount');
         this.learningCount = document.getElementById('learningCount');
+        this.camerasTotal = document.getElementById('camerasTotal');
+        this.uptimeValue = document.getElementById('uptimeValue');
         this.activityList = document.getElementById('activityList');
         this.cameraGrid = document.getElementById('cameraGrid');
         this.markAllReadBtn = document.getElementById('markAllRead');
@@ -45,30 +47,40 @@ class DashboardModule {
         await this.loadRecentActivity();
         this.loadCameraOverview();
         this.initializeChart();
+        this.updateChart();
         this.startPeriodicUpdates();
     }
 
     async updateDashboardStats() {
         try {
-            const stats = await this.dashboard.apiRequest('/status');
+            const snapshot = await this.dashboard.getSnapshot();
+            const stats = snapshot.status;
             
             if (this.accidentsCount) {
                 this.animateCounter(this.accidentsCount, parseInt(this.accidentsCount.textContent) || 0, stats.accidents || 0);
             }
             
             if (this.camerasCount) {
-                this.animateCounter(this.camerasCount, parseInt(this.camerasCount.textContent) || 24, stats.active_cameras || 24);
+                this.animateCounter(this.camerasCount, parseInt(this.camerasCount.textContent) || 0, stats.active_cameras || 0);
+            }
+
+            if (this.camerasTotal && stats.total_cameras !== undefined) {
+                this.camerasTotal.textContent = `/ ${stats.total_cameras} total`;
             }
             
             if (this.learningCount) {
-                this.animateCounter(this.learningCount, parseInt(this.learningCount.textContent.replace(/,/g, '')) || 4294, stats.ai_scanned || 4294);
+                this.animateCounter(this.learningCount, parseInt(this.learningCount.textContent.replace(/,/g, '')) || 0, stats.ai_scanned || 0);
+            }
+
+            if (this.uptimeValue) {
+                this.uptimeValue.textContent = stats.uptime === null || stats.uptime === undefined ? '--' : `${stats.uptime}%`;
             }
 
             // Update notification badge
-            const notifications = await this.dashboard.apiRequest('/notifications');
-            if (this.notificationBadge && notifications.count !== undefined) {
-                this.notificationBadge.textContent = notifications.count;
-                this.notificationBadge.style.display = notifications.count > 0 ? 'flex' : 'none';
+            const notifications = snapshot.notifications;
+            if (this.notificationBadge && notifications) {
+                this.notificationBadge.textContent = notifications.unread;
+                this.notificationBadge.style.display = notifications.unread > 0 ? 'flex' : 'none';
             }
 
         } catch (error) {
@@ -109,10 +121,10 @@ class DashboardModule {
 
     async loadRecentActivity() {
         try {
-            const response = await this.dashboard.apiRequest('/activity');
+            const activity = (await this.dashboard.getSnapshot()).activity;
             
-            if (this.activityList && response.items) {
-                this.activityList.innerHTML = response.items.map(item => `
+            if (this.activityList && activity) {
+                this.activityList.innerHTML = activity.map(item => `
                     <div class="activity-item ${item.read ? 'read' : 'unread'}" data-id="${item.id}">
                         <div class="activity-icon ${item.type}">
                             <i class="${item.icon}"></i>
@@ -174,7 +186,7 @@ class DashboardModule {
 
     async markAllActivitiesRead() {
         try {
-            await this.dashboard.apiRequest('/notifications/clear', {
+            await this.dashboard.apiRequest('/notifications/read', {
                 method: 'POST'
             });
 
@@ -323,18 +335,10 @@ class DashboardModule {
         const ctx = document.getElementById('incidentsChart');
         if (!ctx) return;
 
-        // Generate sample data for the last 7 days
-        const today = new Date();
+        // Filled from the daily anomaly rollups by updateChart()
         const days = [];
         const incidents = [];
 
-        for (let i = 6; i >= 0; i--) {
-            const date = new Date(today);
-            date.setDate(date.getDate() - i);
-            days.push(date.toLocaleDateString('en-US', { weekday: 'short' }));
-            incidents.push(Math.floor(Math.random() * 15) + 1); // Random incidents 1-15
-        }
-
         this.incidentsChart = new Chart(ctx, {
             type: 'line',
             data: {
@@ -408,33 +412,34 @@ class DashboardModule {
         });
     }
 
-    updateChart() {
+    async updateChart() {
         if (!this.incidentsChart) return;
 
-        // Add new data point (simulate real-time update)
-        const data = this.incidentsChart.data;
-        const newValue = Math.floor(Math.random() * 15) + 1;
-        
-        // Remove first point, add new one
-        data.labels.shift();
-        data.labels.push(new Date().toLocaleDateString('en-US', { weekday: 'short' }));
-        
-        data.datasets[0].data.shift();
-        data.datasets[0].data.push(newValue);
-        
-        this.incidentsChart.update('none');
+        try {
+            // Incidents per day for the last 7 days
+            const chart = (await this.dashboard.getSnapshot()).chart;
+            const data = this.incidentsChart.data;
+            data.labels = chart.map(day =>
+                new Date(day.time).toLocaleDateString('en-US', { weekday: 'short' }));
+            data.datasets[0].data = chart.map(day => day.anomalies);
+            this.incidentsChart.update('none');
+        } catch (error) {
+            console.error('Failed to load incident chart:', error);
+        }
     }
 
     startPeriodicUpdates() {
+        // Pushed notification/status events refresh the stats as they happen
+        this.dashboard.pushChannel.on('notification', () => this.refresh());
+        this.dashboard.pushChannel.on('status', () => this.updateDashboardStats());
+
         // Update dashboard every 30 seconds
         this.updateInterval = setInterval(async () => {
+            if (this.dashboard.pushChannel.isOpen()) return;
             await this.updateDashboardStats();
             await this.loadRecentActivity();
             
-            // Occasionally update chart (every 5 minutes)
-            if (Math.random() < 0.1) {
-                this.updateChart();
-            }
+            await this.updateChart();
         }, 30000);
     }
 
@@ -449,6 +454,7 @@ class DashboardModule {
     async refresh() {
         await this.updateDashboardStats();
         await this.loadRecentActivity();
+        await this.updateChart();
         this.loadCameraOverview();
     }
 
@@ -438,9 +438,17 @@ class LiveMonitor {
             }
         }, 1000);
 
-        // Refresh reports every 5 seconds
+        // Refresh reports every 5 seconds unless they are pushed
+        if (!this.pushHandlerRegistered) {
+            this.dashboard.pushChannel.on('report', (event) => {
+                if (this.isActive && event.source === 'live') {
+                    this.refreshLiveReports();
+                }
+            });
+            this.pushHandlerRegistered = true;
+        }
         this.reportsRefreshInterval = setInterval(() => {
-            if (this.isActive) {
+            if (this.isActive && !this.dashboard.pushChannel.isOpen()) {
                 this.refreshLiveReports();
             } else {
                 console.log('Stopping reports refresh - not active');
@@ -461,28 +461,17 @@ class SurveillanceModule {
         // Clear any existing intervals
         this.stopCameraAutoRefresh(cameraId);
         
-        // Refresh camera frame every 2 seconds
-        this.cameras[cameraId].frameRefreshInterval = setInterval(async () => {
-            if (this.cameras[cameraId].active) {
-                try {
-                    const response = await this.dashboard.apiRequest(`/surveillance/frame/${cameraId}`);
-                    if (response.success && response.frame) {
-                        this.displayCameraFrame(cameraId, response.frame);
-                        this.updateFeedOverlay(cameraId, '1080p', '30');
-                    }
-                } catch (error) {
-                    // Only log errors occasionally
-                    if (Math.random() < 0.1) {
-                        console.warn(`Frame refresh error for camera ${cameraId}:`, error.message);
-                    }
-                }
-            } else {
-                this.stopCameraAutoRefresh(cameraId);
-            }
-        }, 2000);
+        // Stream camera frames over MJPEG instead of polling base64 JSON;
+        // the server caps the frame rate and drops frames for slow clients
+        this.displayCameraFrame(cameraId, `${this.apiBaseUrl}/surveillance/stream/${cameraId}?fps=10`);
+        this.updateFeedOverlay(cameraId, '1080p', '10');
 
-        // Refresh reports every 10 seconds
+        // Refresh reports every 10 seconds unless new reports are pushed
+        this.registerReportPushHandler();
         this.cameras[cameraId].reportsRefreshInterval = setInterval(async () => {
+            if (this.cameras[cameraId].active && this.dashboard.pushChannel.isOpen()) {
+                return;
+            }
             if (this.cameras[cameraId].active) {
                 try {
                     const response = await this.dashboard.apiRequest(`/surveillance/reports/${cameraId}`);
@@ -498,10 +487,30 @@ class SurveillanceModule {
         }, 10000);
     }
 
+    registerReportPushHandler() {
+        if (this.reportPushHandlerRegistered) return;
+        this.reportPushHandlerRegistered = true;
+
+        this.dashboard.pushChannel.on('report', async (event) => {
+            const camera = this.cameras[event.camera_id];
+            if (event.source !== 'surveillance' || !camera || !camera.active) return;
+            try {
+                const response = await this.dashboard.apiRequest(`/surveillance/reports/${event.camera_id}`);
+                if (response.success && response.reports) {
+                    this.updateCameraReportsDisplay(event.camera_id, response.reports);
+                }
+            } catch (error) {
+                // Silently handle report refresh errors
+            }
+        });
+    }
+
     stopCameraAutoRefresh(cameraId) {
-        if (this.cameras[cameraId].frameRefreshInterval) {
-            clearInterval(this.cameras[cameraId].frameRefreshInterval);
-            this.cameras[cameraId].frameRefreshInterval = null;
+        // Close the MJPEG connection by detaching the stream from its image
+        const feedImage = document.querySelector(`#feed-${cameraId} img`);
+        if (feedImage) {
+            feedImage.onerror = null;
+            feedImage.src = '';
         }
         
         if (this.cameras[cameraId].reportsRefreshInterval) {